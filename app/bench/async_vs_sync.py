@@ -0,0 +1,114 @@
+"""Porównanie wariantu WSGI (gunicorn gthread) z ASGI (uvicorn) przy dużej współbieżności.
+
+Każdy tryb jest uruchamiany jako osobny serwer (``python -m src.server``)
+z tą samą liczbą procesów, a klient asynchroniczny utrzymuje zadaną
+liczbę jednoczesnych żądań przez ``--duration`` sekund.
+
+    python bench/async_vs_sync.py --concurrency 50 500 2000 --output async.json
+
+Bez ``DATABASE_URL`` używana jest tymczasowa baza SQLite; różnicę widać
+najlepiej na PostgreSQL, gdzie odczyt czeka na sieć, a nie na CPU.
+
+Wariant ASGI nie ma cache odpowiedzi ani cache encji, więc serwer WSGI
+jest domyślnie uruchamiany z wyłączonymi cache - inaczej stałe ścieżki
+byłyby obsługiwane z pamięci i porównanie mierzyłoby cache, nie
+oczekiwanie na bazę. ``--cache`` je włącza.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from sqlalchemy import create_engine, func, insert, select
+
+# Dodaj katalog nadrzędny do ścieżki
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from bench.common import MODES, drive, free_port, start_server, summarize
+from src.models import Product, Task, User, db
+
+# Zerowe rozmiary - każdy wpis jest wypierany od razu; bez współdzielonego Redisa
+NO_CACHE_ENV = {'RESPONSE_CACHE_MAX_ENTRIES': '0', 'ENTITY_CACHE_MAX_ENTRIES': '0',
+                'ENTITY_CACHE_REDIS_URL': ''}
+
+
+def prepare_database(database_url, rows):
+    """Tworzy tabele i wstawia dane, jeśli baza jest pusta."""
+    engine = create_engine(database_url)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(User)).scalar():
+            return
+        conn.execute(insert(User), [
+            {"name": f"Użytkownik {i}", "email": f"bench{i}@example.com"} for i in range(rows)
+        ])
+        conn.execute(insert(Task), [
+            {"title": f"Zadanie {i}", "completed": i % 3 == 0, "user_id": i % rows + 1}
+            for i in range(rows * 5)
+        ])
+        conn.execute(insert(Product), [
+            {"name": f"Produkt {i}", "price": 10.0 + i, "stock": i} for i in range(rows)
+        ])
+    engine.dispose()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare the sync (WSGI) and async (ASGI) servers at high concurrency."
+    )
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 500, 2000])
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help="seconds per mode and concurrency level")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="server processes per mode")
+    parser.add_argument('--rows', type=int, default=1000,
+                        help="users to create when the database is empty")
+    parser.add_argument('--paths', nargs='+',
+                        default=['/users/1', '/products/2', '/tasks?user_id=3&limit=20'])
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--cache', action='store_true',
+                        help="keep the sync server's response and entity caches enabled")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    prepare_database(database_url, args.rows)
+
+    results = []
+    for mode in args.modes:
+        port = free_port()
+        server = start_server(mode, database_url, port, args.workers,
+                              None if args.cache else NO_CACHE_ENV)
+        try:
+            for concurrency in args.concurrency:
+                latencies, errors = asyncio.run(
+                    drive(f'http://127.0.0.1:{port}', args.paths, concurrency, args.duration)
+                )
+                result = {"mode": mode, "concurrency": concurrency,
+                          **summarize(latencies, errors, args.duration)}
+                results.append(result)
+                print(f"{mode:>5} c={concurrency:<5} {result['rps']:>9} req/s  "
+                      f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                      f"p99={result['p99_ms']}ms errors={errors}")
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"workers": args.workers, "duration": args.duration, "cache": args.cache,
+                       "paths": args.paths, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
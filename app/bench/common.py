@@ -0,0 +1,94 @@
+"""Wspólne elementy skryptów w ``bench/``: serwer w podprocesie i klient obciążeniowy.
+
+Klient jest asynchroniczny (httpx), więc jeden proces utrzymuje setki
+jednoczesnych żądań bez wątku na połączenie.
+"""
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    # Wątek na żądanie - współbieżność ograniczona liczbą wątków
+    'sync': {'WEB_THREADS': '32'},
+    'async': {'WEB_MODE': 'asgi'},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, database_url, port, workers, extra_env=None):
+    """Uruchamia ``python -m src.server`` i czeka, aż ``/livez`` odpowie."""
+    env = dict(os.environ, DATABASE_URL=database_url, HOST='127.0.0.1', PORT=str(port),
+               WEB_WORKERS=str(workers), **MODES[mode], **(extra_env or {}))
+    server = subprocess.Popen([sys.executable, '-m', 'src.server'], cwd=APP_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/livez', timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+
+async def drive(base_url, paths, concurrency, duration):
+    """Utrzymuje ``concurrency`` żądań w locie przez ``duration`` sekund.
+
+    ``paths`` to lista ścieżek odpytywanych po kolei. Zwraca (czasy
+    odpowiedzi w sekundach, liczba błędów).
+    """
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        stop_at = time.monotonic() + duration
+
+        async def worker(n):
+            nonlocal errors
+            i = n
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(paths[i % len(paths)])
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+                i += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies, errors
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def summarize(latencies, errors, duration):
+    latencies = sorted(latencies)
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 1),
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+    }
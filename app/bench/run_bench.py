@@ -0,0 +1,181 @@
+"""Powtarzalny benchmark endpointów API z porównaniem do zapisanej linii bazowej.
+
+Skrypt ładuje deterministyczny zbiór danych zadanej wielkości (``seed.loader``),
+uruchamia serwer lokalnie (``python -m src.server``) i odpytuje kolejno
+każdy scenariusz przy każdym poziomie współbieżności. Wynik (req/s,
+p50/p95/p99) trafia do pliku JSON, który może później służyć za linię
+bazową:
+
+    python bench/run_bench.py --tasks 100000 --output bench/baseline.json
+    python bench/run_bench.py --tasks 100000 --baseline bench/baseline.json
+
+Z ``--baseline`` kod wyjścia to 1, gdy któryś scenariusz zwolnił
+(p95 lub req/s) o więcej niż ``--tolerance``. Bez ``DATABASE_URL``
+używana jest tymczasowa baza SQLite.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+# Dodaj katalog nadrzędny do ścieżki
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from bench.common import MODES, drive, free_port, start_server, summarize
+from seed.loader import load_scale
+from seed.run_seed import count_arg
+from src.models import db
+
+# Ile różnych ścieżek (losowych ID) generujemy na scenariusz
+PATHS_PER_SCENARIO = 1000
+
+# Scenariusz -> funkcja (rng, rozmiary danych) -> ścieżka
+SCENARIOS = {
+    'users': lambda rng, n: '/users?limit=100',
+    'users_include_tasks': lambda rng, n: '/users?include=tasks&limit=50',
+    'get_user': lambda rng, n: f"/users/{rng.randint(1, n['users'])}",
+    'user_tasks': lambda rng, n: f"/users/{rng.randint(1, n['users'])}/tasks",
+    'tasks': lambda rng, n: '/tasks?limit=100',
+    'tasks_filtered': lambda rng, n:
+        f"/tasks?user_id={rng.randint(1, n['users'])}&completed=false",
+    'task_detail': lambda rng, n: f"/tasks/{rng.randint(1, n['tasks'])}",
+    'products': lambda rng, n: '/products?limit=100',
+    'get_product': lambda rng, n: f"/products/{rng.randint(1, n['products'])}",
+}
+
+
+def scenario_paths(name, sizes, seed):
+    rng = random.Random(f"{seed}:{name}")
+    return [SCENARIOS[name](rng, sizes) for _ in range(PATHS_PER_SCENARIO)]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=parent_dir,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Lista regresji względem linii bazowej (dopasowanie po scenariuszu i współbieżności)."""
+    previous = {(r['scenario'], r['concurrency']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        base = previous.get((result['scenario'], result['concurrency']))
+        if base is None:
+            continue
+        label = f"{result['scenario']} c={result['concurrency']}"
+        if base['p95_ms'] and result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {base['rps']} -> {result['rps']} req/s")
+        if result['errors'] > base['errors']:
+            regressions.append(f"{label}: errors {base['errors']} -> {result['errors']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Seed a sized dataset, load-test each endpoint locally and "
+                    "compare the results with a stored baseline."
+    )
+    parser.add_argument('--users', type=count_arg, default=1000)
+    parser.add_argument('--tasks', type=count_arg, default=10000)
+    parser.add_argument('--products', type=count_arg, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-seed', action='store_true',
+                        help="reuse the data already in DATABASE_URL (sizes must match)")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS),
+                        default=list(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--duration', type=float, default=5.0,
+                        help="seconds per scenario and concurrency level")
+    parser.add_argument('--warmup', type=float, default=1.0,
+                        help="seconds of unmeasured load before each scenario")
+    parser.add_argument('--workers', type=int, default=1, help="server processes")
+    parser.add_argument('--mode', choices=list(MODES), default='sync')
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed relative slowdown before failing (default 0.2)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    sizes = {'users': args.users, 'tasks': args.tasks, 'products': args.products}
+
+    if not args.skip_seed:
+        engine = create_engine(database_url)
+        db.metadata.create_all(engine)
+        load_scale(engine, seed=args.seed, log=lambda message: None, **sizes)
+        engine.dispose()
+
+    port = free_port()
+    server = start_server(args.mode, database_url, port, args.workers)
+    base_url = f'http://127.0.0.1:{port}'
+    results = []
+    try:
+        for name in args.scenarios:
+            paths = scenario_paths(name, sizes, args.seed)
+            if args.warmup:
+                asyncio.run(drive(base_url, paths, max(args.concurrency), args.warmup))
+            for concurrency in args.concurrency:
+                latencies, errors = asyncio.run(
+                    drive(base_url, paths, concurrency, args.duration)
+                )
+                result = {"scenario": name, "concurrency": concurrency,
+                          **summarize(latencies, errors, args.duration)}
+                results.append(result)
+                print(f"{name:<20} c={concurrency:<4} {result['rps']:>9} req/s  "
+                      f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                      f"p99={result['p99_ms']}ms errors={errors}")
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            "python": platform.python_version(),
+            "database": database_url.split(':', 1)[0],
+            "mode": args.mode,
+            "workers": args.workers,
+            "duration": args.duration,
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
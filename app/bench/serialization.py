@@ -0,0 +1,131 @@
+"""Przepustowość serializacji listy zadań: obiekty ORM vs krotki kolumn, json vs orjson.
+
+Mierzy wiersze/s dla całej tabeli ``tasks`` (domyślnie 100 tys. wierszy):
+
+- ``orm+json`` - obiekty ORM, ``to_dict()``, standardowy ``json`` (stara ścieżka)
+- ``core+json`` - ``select()`` samych kolumn, słowniki z krotek, ``json``
+- ``core+orjson`` - to samo z ``orjson``
+- ``GET /tasks?stream=1`` i przejście wszystkich stron ``/tasks?limit=1000``
+  przez klienta testowego Flaska z dostawcą ``default`` i ``orjson``
+
+    python bench/serialization.py --tasks 100000 --output serialization.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import orjson
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+# Dodaj katalog nadrzędny do ścieżki
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from seed.loader import load_scale
+from seed.run_seed import count_arg
+from src.app import create_app
+from src.models import Task, db, field_columns
+
+BATCH_SIZE = 1000
+
+
+def orm_json(engine):
+    with Session(engine) as session:
+        rows = session.execute(
+            select(Task).order_by(Task.id).execution_options(yield_per=BATCH_SIZE)
+        ).scalars()
+        return json.dumps([task.to_dict() for task in rows])
+
+
+def core_rows(engine):
+    keys = Task.FIELDS
+    with engine.connect() as connection:
+        rows = connection.execute(select(*field_columns(Task)).order_by(Task.id))
+        return [dict(zip(keys, row)) for row in rows]
+
+
+def core_json(engine):
+    return json.dumps(core_rows(engine))
+
+
+def core_orjson(engine):
+    return orjson.dumps(core_rows(engine))
+
+
+def endpoint_stream(client):
+    return client.get('/tasks?stream=1').data
+
+
+def endpoint_pages(client):
+    path, pages = '/tasks?limit=1000', []
+    while path:
+        response = client.get(path)
+        pages.append(response.data)
+        link = response.headers.get('Link')
+        path = link[link.index('/tasks'):link.index('>')] if link else None
+    return pages
+
+
+def measure(func, arg, rows, repeat):
+    """Najlepszy z ``repeat`` przebiegów -> wiersze/s."""
+    best = min(_timed(func, arg) for _ in range(repeat))
+    return round(rows / best)
+
+
+def _timed(func, arg):
+    started = time.perf_counter()
+    func(arg)
+    return time.perf_counter() - started
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure rows/sec of the task list serialization paths."
+    )
+    parser.add_argument('--tasks', type=count_arg, default=100_000)
+    parser.add_argument('--users', type=count_arg, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serialization.db')}"
+
+    engine = create_engine(database_url)
+    db.metadata.create_all(engine)
+    load_scale(engine, users=args.users, tasks=args.tasks, log=lambda message: None)
+
+    results = {
+        'orm+json': measure(orm_json, engine, args.tasks, args.repeat),
+        'core+json': measure(core_json, engine, args.tasks, args.repeat),
+        'core+orjson': measure(core_orjson, engine, args.tasks, args.repeat),
+    }
+    engine.dispose()
+
+    for provider in ('default', 'orjson'):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'JSON_PROVIDER': provider})
+        client = app.test_client()
+        results[f'stream/{provider}'] = measure(endpoint_stream, client, args.tasks, args.repeat)
+        results[f'pages/{provider}'] = measure(endpoint_pages, client, args.tasks, args.repeat)
+
+    baseline = results['orm+json']
+    for name, rows_per_second in results.items():
+        print(f"{name:<16} {rows_per_second:>12,} rows/s  x{rows_per_second / baseline:.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"tasks": args.tasks, "rows_per_second": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Unique product name
+
+Revision ID: 3f2a9c1d7b40
+Revises: e0b88855f468
+Create Date: 2026-10-17 10:12:41.204117
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.env')
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b40'
+down_revision = 'e0b88855f468'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nazwa produktu jest kluczem naturalnym dla seedowania przyrostowego
+    # (INSERT ... ON CONFLICT (name))
+    bind = op.get_bind()
+    existing = sa.inspect(bind).get_unique_constraints('products')
+    if any(c['column_names'] == ['name'] for c in existing):
+        return  # tabela utworzona przez create_all() z unique=True
+
+    # Powtórzone nazwy: najstarszy produkt zostaje, pozostałe dostają
+    # sufiks " #<id>" (z przycięciem do 100 znaków)
+    suffix = "' #' || CAST(id AS VARCHAR(20))"
+    renamed = bind.execute(sa.text(
+        f"UPDATE products SET name = substr(name, 1, 100 - length({suffix})) || {suffix} "
+        f"WHERE id NOT IN (SELECT MIN(id) FROM products GROUP BY name)"
+    )).rowcount
+    if renamed:
+        logger.warning("Renamed %d products with duplicate names", renamed)
+    duplicates = bind.execute(sa.text(
+        "SELECT name FROM products GROUP BY name HAVING COUNT(*) > 1"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"products.name is still not unique after renaming duplicates: {duplicates[:10]}; "
+            f"fix these rows by hand and rerun the migration"
+        )
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_unique_constraint('products_name_key', ['name'])
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_constraint('products_name_key', type_='unique')
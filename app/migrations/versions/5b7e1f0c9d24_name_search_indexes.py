@@ -0,0 +1,61 @@
+"""Name search indexes
+
+Revision ID: 5b7e1f0c9d24
+Revises: 8c4d2e6f1a93
+Create Date: 2026-10-17 14:21:37.902514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e1f0c9d24'
+down_revision = '8c4d2e6f1a93'
+branch_labels = None
+depends_on = None
+
+# Tabele przeszukiwane po nazwie (GET /products/search, /users/search)
+TABLES = ('products', 'users')
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # ILIKE '%q%' i similarity() na indeksie GIN z trigramami
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table in TABLES:
+            op.create_index(f'ix_{table}_name_trgm', table, ['name'], unique=False,
+                            if_not_exists=True,
+                            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+        return
+
+    if op.get_bind().dialect.name == 'sqlite':
+        # FTS5 z tokenizerem trigram nad tabelą źródłową, synchronizowany triggerami
+        for table in TABLES:
+            fts = f'{table}_fts'
+            op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                       f"name, content='{table}', content_rowid='id', tokenize='trigram')")
+            op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                       f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END")
+            op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                       f"INSERT INTO {fts}({fts}, rowid, name) "
+                       f"VALUES ('delete', old.id, old.name); END")
+            op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF name ON {table} BEGIN "
+                       f"INSERT INTO {fts}({fts}, rowid, name) "
+                       f"VALUES ('delete', old.id, old.name); "
+                       f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END")
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in TABLES:
+            op.drop_index(f'ix_{table}_name_trgm', table_name=table)
+        return
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for table in TABLES:
+            # Triggery należą do tabeli źródłowej - usuwamy je jawnie
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
@@ -0,0 +1,36 @@
+"""Task filter indexes
+
+Revision ID: 8c4d2e6f1a93
+Revises: 3f2a9c1d7b40
+Create Date: 2026-10-17 11:04:09.518320
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2e6f1a93'
+down_revision = '3f2a9c1d7b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # if_not_exists: bazy z create_all() mogą już mieć te indeksy (src.schema)
+    # Zadania użytkownika (opcjonalnie z completed), sortowane po id
+    op.create_index('ix_tasks_user_id_completed', 'tasks',
+                    ['user_id', 'completed', 'id'], unique=False, if_not_exists=True)
+    # Otwarte zadania - indeks częściowy, mały i tani w utrzymaniu
+    op.create_index('ix_tasks_open', 'tasks', ['id'], unique=False, if_not_exists=True,
+                    postgresql_where=sa.text('completed = false'),
+                    sqlite_where=sa.text('completed = 0'))
+    # Wyszukiwanie po prefiksie tytułu (LIKE 'abc%')
+    op.create_index('ix_tasks_title_prefix', 'tasks', ['title'], unique=False, if_not_exists=True,
+                    postgresql_ops={'title': 'text_pattern_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_tasks_title_prefix', table_name='tasks')
+    op.drop_index('ix_tasks_open', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_completed', table_name='tasks')
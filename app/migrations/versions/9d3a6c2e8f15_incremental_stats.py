@@ -0,0 +1,263 @@
+"""Incremental stats
+
+Revision ID: 9d3a6c2e8f15
+Revises: 5b7e1f0c9d24
+Create Date: 2026-10-17 16:48:05.113209
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3a6c2e8f15'
+down_revision = '5b7e1f0c9d24'
+branch_labels = None
+depends_on = None
+
+# Triggery i przeliczenie w wersji z tej rewizji (jeden wiersz, id = 1) -
+# zamrożone, nie z src.stats, który zmienia się w kolejnych migracjach
+SQLITE_TRIGGER_NAMES = ('users_ai', 'users_ad', 'tasks_ai', 'tasks_ad', 'tasks_au',
+                        'products_ai', 'products_ad', 'products_au')
+
+SQLITE_TRIGGERS = [
+    ('CREATE TRIGGER IF NOT EXISTS stats_users_ai AFTER INSERT ON users FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET users = users + 1; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_users_ad AFTER DELETE ON users FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET users = users - 1; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_tasks_ai AFTER INSERT ON tasks FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET tasks = tasks + 1, tasks_completed '
+     '= tasks_completed + CASE WHEN new.completed THEN 1 ELSE 0 END; INSERT '
+     'INTO user_task_stats (user_id, tasks, completed) SELECT new.user_id, 1, '
+     'CASE WHEN new.completed THEN 1 ELSE 0 END WHERE new.user_id IS NOT NULL '
+     'ON CONFLICT (user_id) DO UPDATE SET tasks = tasks + excluded.tasks, '
+     'completed = completed + excluded.completed; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_tasks_ad AFTER DELETE ON tasks FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET tasks = tasks - 1, tasks_completed '
+     '= tasks_completed - CASE WHEN old.completed THEN 1 ELSE 0 END; INSERT '
+     'INTO user_task_stats (user_id, tasks, completed) SELECT old.user_id, -1, '
+     '-CASE WHEN old.completed THEN 1 ELSE 0 END WHERE old.user_id IS NOT NULL '
+     'ON CONFLICT (user_id) DO UPDATE SET tasks = tasks + excluded.tasks, '
+     'completed = completed + excluded.completed; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_tasks_au AFTER UPDATE OF completed, '
+     'user_id ON tasks FOR EACH ROW WHEN old.completed IS NOT new.completed OR '
+     'old.user_id IS NOT new.user_id BEGIN UPDATE stats_totals SET '
+     'tasks_completed = tasks_completed + CASE WHEN new.completed THEN 1 ELSE 0 '
+     'END - CASE WHEN old.completed THEN 1 ELSE 0 END; INSERT INTO '
+     'user_task_stats (user_id, tasks, completed) SELECT old.user_id, -1, -CASE '
+     'WHEN old.completed THEN 1 ELSE 0 END WHERE old.user_id IS NOT NULL ON '
+     'CONFLICT (user_id) DO UPDATE SET tasks = tasks + excluded.tasks, '
+     'completed = completed + excluded.completed;INSERT INTO user_task_stats '
+     '(user_id, tasks, completed) SELECT new.user_id, 1, CASE WHEN '
+     'new.completed THEN 1 ELSE 0 END WHERE new.user_id IS NOT NULL ON CONFLICT '
+     '(user_id) DO UPDATE SET tasks = tasks + excluded.tasks, completed = '
+     'completed + excluded.completed; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_products_ai AFTER INSERT ON products '
+     'FOR EACH ROW BEGIN UPDATE stats_totals SET products = products + 1, '
+     'stock_units = stock_units + COALESCE(new.stock, 0), inventory_value = '
+     'inventory_value + COALESCE(new.price * new.stock, 0); END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_products_ad AFTER DELETE ON products '
+     'FOR EACH ROW BEGIN UPDATE stats_totals SET products = products - 1, '
+     'stock_units = stock_units - COALESCE(old.stock, 0), inventory_value = '
+     'inventory_value - COALESCE(old.price * old.stock, 0); END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_products_au AFTER UPDATE OF price, '
+     'stock ON products FOR EACH ROW WHEN old.price IS NOT new.price OR '
+     'old.stock IS NOT new.stock BEGIN UPDATE stats_totals SET stock_units = '
+     'stock_units + COALESCE(new.stock, 0) - COALESCE(old.stock, 0), '
+     'inventory_value = inventory_value + COALESCE(new.price * new.stock, 0) - '
+     'COALESCE(old.price * old.stock, 0); END'),
+]
+
+PG_TRIGGERS = [
+    ('CREATE OR REPLACE FUNCTION stats_users() RETURNS trigger LANGUAGE plpgsql '
+     "AS $$ BEGIN IF TG_OP = 'INSERT' THEN UPDATE stats_totals SET users = "
+     'users + (SELECT COUNT(*) FROM new_rows) WHERE id = 1; ELSIF TG_OP = '
+     "'DELETE' THEN UPDATE stats_totals SET users = users - (SELECT COUNT(*) "
+     'FROM old_rows) WHERE id = 1; ELSE UPDATE stats_totals SET users = 0 WHERE '
+     'id = 1; END IF; RETURN NULL; END $$'),
+    'DROP TRIGGER IF EXISTS stats_users_insert ON users',
+    ('CREATE TRIGGER stats_users_insert AFTER INSERT ON users REFERENCING NEW '
+     'TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_users()'),
+    'DROP TRIGGER IF EXISTS stats_users_delete ON users',
+    ('CREATE TRIGGER stats_users_delete AFTER DELETE ON users REFERENCING OLD '
+     'TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_users()'),
+    'DROP TRIGGER IF EXISTS stats_users_truncate ON users',
+    ('CREATE TRIGGER stats_users_truncate AFTER TRUNCATE ON users FOR EACH '
+     'STATEMENT EXECUTE FUNCTION stats_users()'),
+    ('CREATE OR REPLACE FUNCTION stats_tasks() RETURNS trigger LANGUAGE plpgsql '
+     "AS $$ BEGIN IF TG_OP = 'INSERT' THEN WITH delta AS (SELECT user_id, 1 AS "
+     'tasks, CASE WHEN n.completed THEN 1 ELSE 0 END AS completed FROM new_rows '
+     'n) UPDATE stats_totals SET tasks = stats_totals.tasks + d.tasks, '
+     'tasks_completed = stats_totals.tasks_completed + d.completed FROM (SELECT '
+     'COALESCE(SUM(tasks), 0) AS tasks, COALESCE(SUM(completed), 0) AS '
+     'completed FROM delta) d WHERE stats_totals.id = 1; WITH delta AS (SELECT '
+     'user_id, 1 AS tasks, CASE WHEN n.completed THEN 1 ELSE 0 END AS completed '
+     'FROM new_rows n) INSERT INTO user_task_stats (user_id, tasks, completed) '
+     'SELECT user_id, SUM(tasks), SUM(completed) FROM delta WHERE user_id IS '
+     'NOT NULL GROUP BY user_id HAVING SUM(tasks) <> 0 OR SUM(completed) <> 0 '
+     'ORDER BY user_id ON CONFLICT (user_id) DO UPDATE SET tasks = '
+     'user_task_stats.tasks + excluded.tasks, completed = '
+     "user_task_stats.completed + excluded.completed; ELSIF TG_OP = 'DELETE' "
+     'THEN WITH delta AS (SELECT user_id, -1 AS tasks, -CASE WHEN o.completed '
+     'THEN 1 ELSE 0 END AS completed FROM old_rows o) UPDATE stats_totals SET '
+     'tasks = stats_totals.tasks + d.tasks, tasks_completed = '
+     'stats_totals.tasks_completed + d.completed FROM (SELECT '
+     'COALESCE(SUM(tasks), 0) AS tasks, COALESCE(SUM(completed), 0) AS '
+     'completed FROM delta) d WHERE stats_totals.id = 1; WITH delta AS (SELECT '
+     'user_id, -1 AS tasks, -CASE WHEN o.completed THEN 1 ELSE 0 END AS '
+     'completed FROM old_rows o) INSERT INTO user_task_stats (user_id, tasks, '
+     'completed) SELECT user_id, SUM(tasks), SUM(completed) FROM delta WHERE '
+     'user_id IS NOT NULL GROUP BY user_id HAVING SUM(tasks) <> 0 OR '
+     'SUM(completed) <> 0 ORDER BY user_id ON CONFLICT (user_id) DO UPDATE SET '
+     'tasks = user_task_stats.tasks + excluded.tasks, completed = '
+     "user_task_stats.completed + excluded.completed; ELSIF TG_OP = 'UPDATE' "
+     'THEN WITH delta AS (SELECT user_id, 1 AS tasks, CASE WHEN n.completed '
+     'THEN 1 ELSE 0 END AS completed FROM new_rows n UNION ALL SELECT user_id, '
+     '-1 AS tasks, -CASE WHEN o.completed THEN 1 ELSE 0 END AS completed FROM '
+     'old_rows o) UPDATE stats_totals SET tasks = stats_totals.tasks + d.tasks, '
+     'tasks_completed = stats_totals.tasks_completed + d.completed FROM (SELECT '
+     'COALESCE(SUM(tasks), 0) AS tasks, COALESCE(SUM(completed), 0) AS '
+     'completed FROM delta) d WHERE stats_totals.id = 1; WITH delta AS (SELECT '
+     'user_id, 1 AS tasks, CASE WHEN n.completed THEN 1 ELSE 0 END AS completed '
+     'FROM new_rows n UNION ALL SELECT user_id, -1 AS tasks, -CASE WHEN '
+     'o.completed THEN 1 ELSE 0 END AS completed FROM old_rows o) INSERT INTO '
+     'user_task_stats (user_id, tasks, completed) SELECT user_id, SUM(tasks), '
+     'SUM(completed) FROM delta WHERE user_id IS NOT NULL GROUP BY user_id '
+     'HAVING SUM(tasks) <> 0 OR SUM(completed) <> 0 ORDER BY user_id ON '
+     'CONFLICT (user_id) DO UPDATE SET tasks = user_task_stats.tasks + '
+     'excluded.tasks, completed = user_task_stats.completed + '
+     'excluded.completed; ELSE UPDATE stats_totals SET tasks = 0, '
+     'tasks_completed = 0 WHERE id = 1; DELETE FROM user_task_stats; END IF; '
+     'RETURN NULL; END $$'),
+    'DROP TRIGGER IF EXISTS stats_tasks_insert ON tasks',
+    ('CREATE TRIGGER stats_tasks_insert AFTER INSERT ON tasks REFERENCING NEW '
+     'TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_tasks()'),
+    'DROP TRIGGER IF EXISTS stats_tasks_update ON tasks',
+    ('CREATE TRIGGER stats_tasks_update AFTER UPDATE ON tasks REFERENCING OLD '
+     'TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE '
+     'FUNCTION stats_tasks()'),
+    'DROP TRIGGER IF EXISTS stats_tasks_delete ON tasks',
+    ('CREATE TRIGGER stats_tasks_delete AFTER DELETE ON tasks REFERENCING OLD '
+     'TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_tasks()'),
+    'DROP TRIGGER IF EXISTS stats_tasks_truncate ON tasks',
+    ('CREATE TRIGGER stats_tasks_truncate AFTER TRUNCATE ON tasks FOR EACH '
+     'STATEMENT EXECUTE FUNCTION stats_tasks()'),
+    ('CREATE OR REPLACE FUNCTION stats_products() RETURNS trigger LANGUAGE '
+     "plpgsql AS $$ BEGIN IF TG_OP = 'INSERT' THEN WITH delta AS (SELECT 1 AS "
+     'products, COALESCE(n.stock, 0) AS stock_units, COALESCE(n.price * '
+     'n.stock, 0) AS inventory_value FROM new_rows n) UPDATE stats_totals SET '
+     'products = stats_totals.products + d.products, stock_units = '
+     'stats_totals.stock_units + d.stock_units, inventory_value = '
+     'stats_totals.inventory_value + d.inventory_value FROM (SELECT '
+     'COALESCE(SUM(products), 0) AS products, COALESCE(SUM(stock_units), 0) AS '
+     'stock_units, COALESCE(SUM(inventory_value), 0) AS inventory_value FROM '
+     "delta) d WHERE stats_totals.id = 1; ELSIF TG_OP = 'DELETE' THEN WITH "
+     'delta AS (SELECT -1 AS products, -COALESCE(o.stock, 0) AS stock_units, '
+     '-COALESCE(o.price * o.stock, 0) AS inventory_value FROM old_rows o) '
+     'UPDATE stats_totals SET products = stats_totals.products + d.products, '
+     'stock_units = stats_totals.stock_units + d.stock_units, inventory_value = '
+     'stats_totals.inventory_value + d.inventory_value FROM (SELECT '
+     'COALESCE(SUM(products), 0) AS products, COALESCE(SUM(stock_units), 0) AS '
+     'stock_units, COALESCE(SUM(inventory_value), 0) AS inventory_value FROM '
+     "delta) d WHERE stats_totals.id = 1; ELSIF TG_OP = 'UPDATE' THEN WITH "
+     'delta AS (SELECT 1 AS products, COALESCE(n.stock, 0) AS stock_units, '
+     'COALESCE(n.price * n.stock, 0) AS inventory_value FROM new_rows n UNION '
+     'ALL SELECT -1 AS products, -COALESCE(o.stock, 0) AS stock_units, '
+     '-COALESCE(o.price * o.stock, 0) AS inventory_value FROM old_rows o) '
+     'UPDATE stats_totals SET products = stats_totals.products + d.products, '
+     'stock_units = stats_totals.stock_units + d.stock_units, inventory_value = '
+     'stats_totals.inventory_value + d.inventory_value FROM (SELECT '
+     'COALESCE(SUM(products), 0) AS products, COALESCE(SUM(stock_units), 0) AS '
+     'stock_units, COALESCE(SUM(inventory_value), 0) AS inventory_value FROM '
+     'delta) d WHERE stats_totals.id = 1; ELSE UPDATE stats_totals SET products '
+     '= 0, stock_units = 0, inventory_value = 0 WHERE id = 1; END IF; RETURN '
+     'NULL; END $$'),
+    'DROP TRIGGER IF EXISTS stats_products_insert ON products',
+    ('CREATE TRIGGER stats_products_insert AFTER INSERT ON products REFERENCING '
+     'NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_products()'),
+    'DROP TRIGGER IF EXISTS stats_products_update ON products',
+    ('CREATE TRIGGER stats_products_update AFTER UPDATE ON products REFERENCING '
+     'OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE '
+     'FUNCTION stats_products()'),
+    'DROP TRIGGER IF EXISTS stats_products_delete ON products',
+    ('CREATE TRIGGER stats_products_delete AFTER DELETE ON products REFERENCING '
+     'OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_products()'),
+    'DROP TRIGGER IF EXISTS stats_products_truncate ON products',
+    ('CREATE TRIGGER stats_products_truncate AFTER TRUNCATE ON products FOR '
+     'EACH STATEMENT EXECUTE FUNCTION stats_products()'),
+]
+
+REBUILD = [
+    'DELETE FROM user_task_stats',
+    ('INSERT INTO user_task_stats (user_id, tasks, completed) SELECT user_id, '
+     'COUNT(*), SUM(CASE WHEN tasks.completed THEN 1 ELSE 0 END) FROM tasks '
+     'WHERE user_id IS NOT NULL GROUP BY user_id'),
+    'DELETE FROM stats_totals',
+    ('INSERT INTO stats_totals (id, users, tasks, tasks_completed, products, '
+     'stock_units, inventory_value) SELECT 1, (SELECT COUNT(*) FROM users), '
+     '(SELECT COUNT(*) FROM tasks), (SELECT COALESCE(SUM(CASE WHEN '
+     'tasks.completed THEN 1 ELSE 0 END), 0) FROM tasks), (SELECT COUNT(*) FROM '
+     'products), (SELECT COALESCE(SUM(COALESCE(products.stock, 0)), 0) FROM '
+     'products), (SELECT COALESCE(SUM(COALESCE(products.price * products.stock, '
+     '0)), 0) FROM products)'),
+]
+
+
+def install(connection, sqlite_triggers, pg_triggers):
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        statements = pg_triggers
+    elif dialect == 'sqlite':
+        statements = sqlite_triggers
+    else:
+        raise ValueError(f"incremental stats are not supported on {dialect!r}")
+    for statement in statements:
+        op.execute(statement)
+
+
+def rebuild(connection, statements):
+    if connection.dialect.name == 'postgresql':
+        # Zapisy czekają do końca przeliczenia - inaczej ich delty by przepadły
+        op.execute("LOCK TABLE users, tasks, products IN SHARE MODE")
+    for statement in statements:
+        op.execute(statement)
+
+
+def uninstall(connection):
+    if connection.dialect.name == 'postgresql':
+        for table in ('users', 'tasks', 'products'):
+            op.execute(f"DROP FUNCTION IF EXISTS stats_{table}() CASCADE")
+    elif connection.dialect.name == 'sqlite':
+        for trigger in SQLITE_TRIGGER_NAMES:
+            op.execute(f'DROP TRIGGER IF EXISTS stats_{trigger}')
+
+
+def upgrade():
+    op.create_table('stats_totals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('users', sa.BigInteger(), nullable=False),
+    sa.Column('tasks', sa.BigInteger(), nullable=False),
+    sa.Column('tasks_completed', sa.BigInteger(), nullable=False),
+    sa.Column('products', sa.BigInteger(), nullable=False),
+    sa.Column('stock_units', sa.BigInteger(), nullable=False),
+    sa.Column('inventory_value', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_table('user_task_stats',
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('tasks', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id'),
+    if_not_exists=True
+    )
+    # Triggery utrzymujące agregaty i stan początkowy z istniejących danych
+    connection = op.get_bind()
+    install(connection, SQLITE_TRIGGERS, PG_TRIGGERS)
+    rebuild(connection, REBUILD)
+
+
+def downgrade():
+    uninstall(op.get_bind())
+    op.drop_table('user_task_stats')
+    op.drop_table('stats_totals')
@@ -0,0 +1,428 @@
+"""Stats totals slots
+
+Revision ID: b6e4d1a8c372
+Revises: 9d3a6c2e8f15
+Create Date: 2026-10-17 21:05:37.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e4d1a8c372'
+down_revision = '9d3a6c2e8f15'
+branch_labels = None
+depends_on = None
+
+# Liczniki rozłożone na 16 wierszy (id 0-15): PostgreSQL zmienia wiersz
+# pg_backend_pid() % 16, SQLite wiersz 0. Downgrade wraca do jednego
+# wiersza (id = 1) z rewizji 9d3a6c2e8f15. SQL zamrożony w tej rewizji.
+SQLITE_TRIGGER_NAMES = ('users_ai', 'users_ad', 'tasks_ai', 'tasks_ad', 'tasks_au',
+                        'products_ai', 'products_ad', 'products_au')
+
+SQLITE_TRIGGERS = [
+    ('CREATE TRIGGER IF NOT EXISTS stats_users_ai AFTER INSERT ON users FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET users = users + 1 WHERE id = 0; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_users_ad AFTER DELETE ON users FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET users = users - 1 WHERE id = 0; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_tasks_ai AFTER INSERT ON tasks FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET tasks = tasks + 1, tasks_completed '
+     '= tasks_completed + CASE WHEN new.completed THEN 1 ELSE 0 END WHERE id = '
+     '0; INSERT INTO user_task_stats (user_id, tasks, completed) SELECT '
+     'new.user_id, 1, CASE WHEN new.completed THEN 1 ELSE 0 END WHERE '
+     'new.user_id IS NOT NULL ON CONFLICT (user_id) DO UPDATE SET tasks = tasks '
+     '+ excluded.tasks, completed = completed + excluded.completed; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_tasks_ad AFTER DELETE ON tasks FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET tasks = tasks - 1, tasks_completed '
+     '= tasks_completed - CASE WHEN old.completed THEN 1 ELSE 0 END WHERE id = '
+     '0; INSERT INTO user_task_stats (user_id, tasks, completed) SELECT '
+     'old.user_id, -1, -CASE WHEN old.completed THEN 1 ELSE 0 END WHERE '
+     'old.user_id IS NOT NULL ON CONFLICT (user_id) DO UPDATE SET tasks = tasks '
+     '+ excluded.tasks, completed = completed + excluded.completed; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_tasks_au AFTER UPDATE OF completed, '
+     'user_id ON tasks FOR EACH ROW WHEN old.completed IS NOT new.completed OR '
+     'old.user_id IS NOT new.user_id BEGIN UPDATE stats_totals SET '
+     'tasks_completed = tasks_completed + CASE WHEN new.completed THEN 1 ELSE 0 '
+     'END - CASE WHEN old.completed THEN 1 ELSE 0 END WHERE id = 0; INSERT INTO '
+     'user_task_stats (user_id, tasks, completed) SELECT old.user_id, -1, -CASE '
+     'WHEN old.completed THEN 1 ELSE 0 END WHERE old.user_id IS NOT NULL ON '
+     'CONFLICT (user_id) DO UPDATE SET tasks = tasks + excluded.tasks, '
+     'completed = completed + excluded.completed;INSERT INTO user_task_stats '
+     '(user_id, tasks, completed) SELECT new.user_id, 1, CASE WHEN '
+     'new.completed THEN 1 ELSE 0 END WHERE new.user_id IS NOT NULL ON CONFLICT '
+     '(user_id) DO UPDATE SET tasks = tasks + excluded.tasks, completed = '
+     'completed + excluded.completed; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_products_ai AFTER INSERT ON products '
+     'FOR EACH ROW BEGIN UPDATE stats_totals SET products = products + 1, '
+     'stock_units = stock_units + COALESCE(new.stock, 0), inventory_value = '
+     'inventory_value + COALESCE(new.price * new.stock, 0) WHERE id = 0; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_products_ad AFTER DELETE ON products '
+     'FOR EACH ROW BEGIN UPDATE stats_totals SET products = products - 1, '
+     'stock_units = stock_units - COALESCE(old.stock, 0), inventory_value = '
+     'inventory_value - COALESCE(old.price * old.stock, 0) WHERE id = 0; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_products_au AFTER UPDATE OF price, '
+     'stock ON products FOR EACH ROW WHEN old.price IS NOT new.price OR '
+     'old.stock IS NOT new.stock BEGIN UPDATE stats_totals SET stock_units = '
+     'stock_units + COALESCE(new.stock, 0) - COALESCE(old.stock, 0), '
+     'inventory_value = inventory_value + COALESCE(new.price * new.stock, 0) - '
+     'COALESCE(old.price * old.stock, 0) WHERE id = 0; END'),
+]
+
+PG_TRIGGERS = [
+    ('CREATE OR REPLACE FUNCTION stats_users() RETURNS trigger LANGUAGE plpgsql '
+     "AS $$ BEGIN IF TG_OP = 'INSERT' THEN UPDATE stats_totals SET users = "
+     'users + (SELECT COUNT(*) FROM new_rows) WHERE id = pg_backend_pid() % 16; '
+     "ELSIF TG_OP = 'DELETE' THEN UPDATE stats_totals SET users = users - "
+     '(SELECT COUNT(*) FROM old_rows) WHERE id = pg_backend_pid() % 16; ELSE '
+     'UPDATE stats_totals SET users = 0; END IF; RETURN NULL; END $$'),
+    'DROP TRIGGER IF EXISTS stats_users_insert ON users',
+    ('CREATE TRIGGER stats_users_insert AFTER INSERT ON users REFERENCING NEW '
+     'TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_users()'),
+    'DROP TRIGGER IF EXISTS stats_users_delete ON users',
+    ('CREATE TRIGGER stats_users_delete AFTER DELETE ON users REFERENCING OLD '
+     'TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_users()'),
+    'DROP TRIGGER IF EXISTS stats_users_truncate ON users',
+    ('CREATE TRIGGER stats_users_truncate AFTER TRUNCATE ON users FOR EACH '
+     'STATEMENT EXECUTE FUNCTION stats_users()'),
+    ('CREATE OR REPLACE FUNCTION stats_tasks() RETURNS trigger LANGUAGE plpgsql '
+     "AS $$ BEGIN IF TG_OP = 'INSERT' THEN WITH delta AS (SELECT user_id, 1 AS "
+     'tasks, CASE WHEN n.completed THEN 1 ELSE 0 END AS completed FROM new_rows '
+     'n) UPDATE stats_totals SET tasks = stats_totals.tasks + d.tasks, '
+     'tasks_completed = stats_totals.tasks_completed + d.completed FROM (SELECT '
+     'COALESCE(SUM(tasks), 0) AS tasks, COALESCE(SUM(completed), 0) AS '
+     'completed FROM delta) d WHERE stats_totals.id = pg_backend_pid() % 16; '
+     'WITH delta AS (SELECT user_id, 1 AS tasks, CASE WHEN n.completed THEN 1 '
+     'ELSE 0 END AS completed FROM new_rows n) INSERT INTO user_task_stats '
+     '(user_id, tasks, completed) SELECT user_id, SUM(tasks), SUM(completed) '
+     'FROM delta WHERE user_id IS NOT NULL GROUP BY user_id HAVING SUM(tasks) '
+     '<> 0 OR SUM(completed) <> 0 ORDER BY user_id ON CONFLICT (user_id) DO '
+     'UPDATE SET tasks = user_task_stats.tasks + excluded.tasks, completed = '
+     "user_task_stats.completed + excluded.completed; ELSIF TG_OP = 'DELETE' "
+     'THEN WITH delta AS (SELECT user_id, -1 AS tasks, -CASE WHEN o.completed '
+     'THEN 1 ELSE 0 END AS completed FROM old_rows o) UPDATE stats_totals SET '
+     'tasks = stats_totals.tasks + d.tasks, tasks_completed = '
+     'stats_totals.tasks_completed + d.completed FROM (SELECT '
+     'COALESCE(SUM(tasks), 0) AS tasks, COALESCE(SUM(completed), 0) AS '
+     'completed FROM delta) d WHERE stats_totals.id = pg_backend_pid() % 16; '
+     'WITH delta AS (SELECT user_id, -1 AS tasks, -CASE WHEN o.completed THEN 1 '
+     'ELSE 0 END AS completed FROM old_rows o) INSERT INTO user_task_stats '
+     '(user_id, tasks, completed) SELECT user_id, SUM(tasks), SUM(completed) '
+     'FROM delta WHERE user_id IS NOT NULL GROUP BY user_id HAVING SUM(tasks) '
+     '<> 0 OR SUM(completed) <> 0 ORDER BY user_id ON CONFLICT (user_id) DO '
+     'UPDATE SET tasks = user_task_stats.tasks + excluded.tasks, completed = '
+     "user_task_stats.completed + excluded.completed; ELSIF TG_OP = 'UPDATE' "
+     'THEN WITH delta AS (SELECT user_id, 1 AS tasks, CASE WHEN n.completed '
+     'THEN 1 ELSE 0 END AS completed FROM new_rows n UNION ALL SELECT user_id, '
+     '-1 AS tasks, -CASE WHEN o.completed THEN 1 ELSE 0 END AS completed FROM '
+     'old_rows o) UPDATE stats_totals SET tasks = stats_totals.tasks + d.tasks, '
+     'tasks_completed = stats_totals.tasks_completed + d.completed FROM (SELECT '
+     'COALESCE(SUM(tasks), 0) AS tasks, COALESCE(SUM(completed), 0) AS '
+     'completed FROM delta) d WHERE stats_totals.id = pg_backend_pid() % 16; '
+     'WITH delta AS (SELECT user_id, 1 AS tasks, CASE WHEN n.completed THEN 1 '
+     'ELSE 0 END AS completed FROM new_rows n UNION ALL SELECT user_id, -1 AS '
+     'tasks, -CASE WHEN o.completed THEN 1 ELSE 0 END AS completed FROM '
+     'old_rows o) INSERT INTO user_task_stats (user_id, tasks, completed) '
+     'SELECT user_id, SUM(tasks), SUM(completed) FROM delta WHERE user_id IS '
+     'NOT NULL GROUP BY user_id HAVING SUM(tasks) <> 0 OR SUM(completed) <> 0 '
+     'ORDER BY user_id ON CONFLICT (user_id) DO UPDATE SET tasks = '
+     'user_task_stats.tasks + excluded.tasks, completed = '
+     'user_task_stats.completed + excluded.completed; ELSE UPDATE stats_totals '
+     'SET tasks = 0, tasks_completed = 0; DELETE FROM user_task_stats; END IF; '
+     'RETURN NULL; END $$'),
+    'DROP TRIGGER IF EXISTS stats_tasks_insert ON tasks',
+    ('CREATE TRIGGER stats_tasks_insert AFTER INSERT ON tasks REFERENCING NEW '
+     'TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_tasks()'),
+    'DROP TRIGGER IF EXISTS stats_tasks_update ON tasks',
+    ('CREATE TRIGGER stats_tasks_update AFTER UPDATE ON tasks REFERENCING OLD '
+     'TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE '
+     'FUNCTION stats_tasks()'),
+    'DROP TRIGGER IF EXISTS stats_tasks_delete ON tasks',
+    ('CREATE TRIGGER stats_tasks_delete AFTER DELETE ON tasks REFERENCING OLD '
+     'TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_tasks()'),
+    'DROP TRIGGER IF EXISTS stats_tasks_truncate ON tasks',
+    ('CREATE TRIGGER stats_tasks_truncate AFTER TRUNCATE ON tasks FOR EACH '
+     'STATEMENT EXECUTE FUNCTION stats_tasks()'),
+    ('CREATE OR REPLACE FUNCTION stats_products() RETURNS trigger LANGUAGE '
+     "plpgsql AS $$ BEGIN IF TG_OP = 'INSERT' THEN WITH delta AS (SELECT 1 AS "
+     'products, COALESCE(n.stock, 0) AS stock_units, COALESCE(n.price * '
+     'n.stock, 0) AS inventory_value FROM new_rows n) UPDATE stats_totals SET '
+     'products = stats_totals.products + d.products, stock_units = '
+     'stats_totals.stock_units + d.stock_units, inventory_value = '
+     'stats_totals.inventory_value + d.inventory_value FROM (SELECT '
+     'COALESCE(SUM(products), 0) AS products, COALESCE(SUM(stock_units), 0) AS '
+     'stock_units, COALESCE(SUM(inventory_value), 0) AS inventory_value FROM '
+     'delta) d WHERE stats_totals.id = pg_backend_pid() % 16; ELSIF TG_OP = '
+     "'DELETE' THEN WITH delta AS (SELECT -1 AS products, -COALESCE(o.stock, 0) "
+     'AS stock_units, -COALESCE(o.price * o.stock, 0) AS inventory_value FROM '
+     'old_rows o) UPDATE stats_totals SET products = stats_totals.products + '
+     'd.products, stock_units = stats_totals.stock_units + d.stock_units, '
+     'inventory_value = stats_totals.inventory_value + d.inventory_value FROM '
+     '(SELECT COALESCE(SUM(products), 0) AS products, '
+     'COALESCE(SUM(stock_units), 0) AS stock_units, '
+     'COALESCE(SUM(inventory_value), 0) AS inventory_value FROM delta) d WHERE '
+     "stats_totals.id = pg_backend_pid() % 16; ELSIF TG_OP = 'UPDATE' THEN WITH "
+     'delta AS (SELECT 1 AS products, COALESCE(n.stock, 0) AS stock_units, '
+     'COALESCE(n.price * n.stock, 0) AS inventory_value FROM new_rows n UNION '
+     'ALL SELECT -1 AS products, -COALESCE(o.stock, 0) AS stock_units, '
+     '-COALESCE(o.price * o.stock, 0) AS inventory_value FROM old_rows o) '
+     'UPDATE stats_totals SET products = stats_totals.products + d.products, '
+     'stock_units = stats_totals.stock_units + d.stock_units, inventory_value = '
+     'stats_totals.inventory_value + d.inventory_value FROM (SELECT '
+     'COALESCE(SUM(products), 0) AS products, COALESCE(SUM(stock_units), 0) AS '
+     'stock_units, COALESCE(SUM(inventory_value), 0) AS inventory_value FROM '
+     'delta) d WHERE stats_totals.id = pg_backend_pid() % 16; ELSE UPDATE '
+     'stats_totals SET products = 0, stock_units = 0, inventory_value = 0; END '
+     'IF; RETURN NULL; END $$'),
+    'DROP TRIGGER IF EXISTS stats_products_insert ON products',
+    ('CREATE TRIGGER stats_products_insert AFTER INSERT ON products REFERENCING '
+     'NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_products()'),
+    'DROP TRIGGER IF EXISTS stats_products_update ON products',
+    ('CREATE TRIGGER stats_products_update AFTER UPDATE ON products REFERENCING '
+     'OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE '
+     'FUNCTION stats_products()'),
+    'DROP TRIGGER IF EXISTS stats_products_delete ON products',
+    ('CREATE TRIGGER stats_products_delete AFTER DELETE ON products REFERENCING '
+     'OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_products()'),
+    'DROP TRIGGER IF EXISTS stats_products_truncate ON products',
+    ('CREATE TRIGGER stats_products_truncate AFTER TRUNCATE ON products FOR '
+     'EACH STATEMENT EXECUTE FUNCTION stats_products()'),
+]
+
+REBUILD = [
+    'DELETE FROM user_task_stats',
+    ('INSERT INTO user_task_stats (user_id, tasks, completed) SELECT user_id, '
+     'COUNT(*), SUM(CASE WHEN tasks.completed THEN 1 ELSE 0 END) FROM tasks '
+     'WHERE user_id IS NOT NULL GROUP BY user_id'),
+    'DELETE FROM stats_totals',
+    ('INSERT INTO stats_totals (id, users, tasks, tasks_completed, products, '
+     'stock_units, inventory_value) SELECT 0, (SELECT COUNT(*) FROM users), '
+     '(SELECT COUNT(*) FROM tasks), (SELECT COALESCE(SUM(CASE WHEN '
+     'tasks.completed THEN 1 ELSE 0 END), 0) FROM tasks), (SELECT COUNT(*) FROM '
+     'products), (SELECT COALESCE(SUM(COALESCE(products.stock, 0)), 0) FROM '
+     'products), (SELECT COALESCE(SUM(COALESCE(products.price * products.stock, '
+     '0)), 0) FROM products)'),
+    ('INSERT INTO stats_totals (id, users, tasks, tasks_completed, products, '
+     'stock_units, inventory_value) VALUES (1, 0, 0, 0, 0, 0, 0), (2, 0, 0, 0, '
+     '0, 0, 0), (3, 0, 0, 0, 0, 0, 0), (4, 0, 0, 0, 0, 0, 0), (5, 0, 0, 0, 0, '
+     '0, 0), (6, 0, 0, 0, 0, 0, 0), (7, 0, 0, 0, 0, 0, 0), (8, 0, 0, 0, 0, 0, '
+     '0), (9, 0, 0, 0, 0, 0, 0), (10, 0, 0, 0, 0, 0, 0), (11, 0, 0, 0, 0, 0, '
+     '0), (12, 0, 0, 0, 0, 0, 0), (13, 0, 0, 0, 0, 0, 0), (14, 0, 0, 0, 0, 0, '
+     '0), (15, 0, 0, 0, 0, 0, 0)'),
+]
+
+SINGLE_ROW_SQLITE_TRIGGERS = [
+    ('CREATE TRIGGER IF NOT EXISTS stats_users_ai AFTER INSERT ON users FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET users = users + 1; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_users_ad AFTER DELETE ON users FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET users = users - 1; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_tasks_ai AFTER INSERT ON tasks FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET tasks = tasks + 1, tasks_completed '
+     '= tasks_completed + CASE WHEN new.completed THEN 1 ELSE 0 END; INSERT '
+     'INTO user_task_stats (user_id, tasks, completed) SELECT new.user_id, 1, '
+     'CASE WHEN new.completed THEN 1 ELSE 0 END WHERE new.user_id IS NOT NULL '
+     'ON CONFLICT (user_id) DO UPDATE SET tasks = tasks + excluded.tasks, '
+     'completed = completed + excluded.completed; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_tasks_ad AFTER DELETE ON tasks FOR '
+     'EACH ROW BEGIN UPDATE stats_totals SET tasks = tasks - 1, tasks_completed '
+     '= tasks_completed - CASE WHEN old.completed THEN 1 ELSE 0 END; INSERT '
+     'INTO user_task_stats (user_id, tasks, completed) SELECT old.user_id, -1, '
+     '-CASE WHEN old.completed THEN 1 ELSE 0 END WHERE old.user_id IS NOT NULL '
+     'ON CONFLICT (user_id) DO UPDATE SET tasks = tasks + excluded.tasks, '
+     'completed = completed + excluded.completed; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_tasks_au AFTER UPDATE OF completed, '
+     'user_id ON tasks FOR EACH ROW WHEN old.completed IS NOT new.completed OR '
+     'old.user_id IS NOT new.user_id BEGIN UPDATE stats_totals SET '
+     'tasks_completed = tasks_completed + CASE WHEN new.completed THEN 1 ELSE 0 '
+     'END - CASE WHEN old.completed THEN 1 ELSE 0 END; INSERT INTO '
+     'user_task_stats (user_id, tasks, completed) SELECT old.user_id, -1, -CASE '
+     'WHEN old.completed THEN 1 ELSE 0 END WHERE old.user_id IS NOT NULL ON '
+     'CONFLICT (user_id) DO UPDATE SET tasks = tasks + excluded.tasks, '
+     'completed = completed + excluded.completed;INSERT INTO user_task_stats '
+     '(user_id, tasks, completed) SELECT new.user_id, 1, CASE WHEN '
+     'new.completed THEN 1 ELSE 0 END WHERE new.user_id IS NOT NULL ON CONFLICT '
+     '(user_id) DO UPDATE SET tasks = tasks + excluded.tasks, completed = '
+     'completed + excluded.completed; END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_products_ai AFTER INSERT ON products '
+     'FOR EACH ROW BEGIN UPDATE stats_totals SET products = products + 1, '
+     'stock_units = stock_units + COALESCE(new.stock, 0), inventory_value = '
+     'inventory_value + COALESCE(new.price * new.stock, 0); END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_products_ad AFTER DELETE ON products '
+     'FOR EACH ROW BEGIN UPDATE stats_totals SET products = products - 1, '
+     'stock_units = stock_units - COALESCE(old.stock, 0), inventory_value = '
+     'inventory_value - COALESCE(old.price * old.stock, 0); END'),
+    ('CREATE TRIGGER IF NOT EXISTS stats_products_au AFTER UPDATE OF price, '
+     'stock ON products FOR EACH ROW WHEN old.price IS NOT new.price OR '
+     'old.stock IS NOT new.stock BEGIN UPDATE stats_totals SET stock_units = '
+     'stock_units + COALESCE(new.stock, 0) - COALESCE(old.stock, 0), '
+     'inventory_value = inventory_value + COALESCE(new.price * new.stock, 0) - '
+     'COALESCE(old.price * old.stock, 0); END'),
+]
+
+SINGLE_ROW_PG_TRIGGERS = [
+    ('CREATE OR REPLACE FUNCTION stats_users() RETURNS trigger LANGUAGE plpgsql '
+     "AS $$ BEGIN IF TG_OP = 'INSERT' THEN UPDATE stats_totals SET users = "
+     'users + (SELECT COUNT(*) FROM new_rows) WHERE id = 1; ELSIF TG_OP = '
+     "'DELETE' THEN UPDATE stats_totals SET users = users - (SELECT COUNT(*) "
+     'FROM old_rows) WHERE id = 1; ELSE UPDATE stats_totals SET users = 0 WHERE '
+     'id = 1; END IF; RETURN NULL; END $$'),
+    'DROP TRIGGER IF EXISTS stats_users_insert ON users',
+    ('CREATE TRIGGER stats_users_insert AFTER INSERT ON users REFERENCING NEW '
+     'TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_users()'),
+    'DROP TRIGGER IF EXISTS stats_users_delete ON users',
+    ('CREATE TRIGGER stats_users_delete AFTER DELETE ON users REFERENCING OLD '
+     'TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_users()'),
+    'DROP TRIGGER IF EXISTS stats_users_truncate ON users',
+    ('CREATE TRIGGER stats_users_truncate AFTER TRUNCATE ON users FOR EACH '
+     'STATEMENT EXECUTE FUNCTION stats_users()'),
+    ('CREATE OR REPLACE FUNCTION stats_tasks() RETURNS trigger LANGUAGE plpgsql '
+     "AS $$ BEGIN IF TG_OP = 'INSERT' THEN WITH delta AS (SELECT user_id, 1 AS "
+     'tasks, CASE WHEN n.completed THEN 1 ELSE 0 END AS completed FROM new_rows '
+     'n) UPDATE stats_totals SET tasks = stats_totals.tasks + d.tasks, '
+     'tasks_completed = stats_totals.tasks_completed + d.completed FROM (SELECT '
+     'COALESCE(SUM(tasks), 0) AS tasks, COALESCE(SUM(completed), 0) AS '
+     'completed FROM delta) d WHERE stats_totals.id = 1; WITH delta AS (SELECT '
+     'user_id, 1 AS tasks, CASE WHEN n.completed THEN 1 ELSE 0 END AS completed '
+     'FROM new_rows n) INSERT INTO user_task_stats (user_id, tasks, completed) '
+     'SELECT user_id, SUM(tasks), SUM(completed) FROM delta WHERE user_id IS '
+     'NOT NULL GROUP BY user_id HAVING SUM(tasks) <> 0 OR SUM(completed) <> 0 '
+     'ORDER BY user_id ON CONFLICT (user_id) DO UPDATE SET tasks = '
+     'user_task_stats.tasks + excluded.tasks, completed = '
+     "user_task_stats.completed + excluded.completed; ELSIF TG_OP = 'DELETE' "
+     'THEN WITH delta AS (SELECT user_id, -1 AS tasks, -CASE WHEN o.completed '
+     'THEN 1 ELSE 0 END AS completed FROM old_rows o) UPDATE stats_totals SET '
+     'tasks = stats_totals.tasks + d.tasks, tasks_completed = '
+     'stats_totals.tasks_completed + d.completed FROM (SELECT '
+     'COALESCE(SUM(tasks), 0) AS tasks, COALESCE(SUM(completed), 0) AS '
+     'completed FROM delta) d WHERE stats_totals.id = 1; WITH delta AS (SELECT '
+     'user_id, -1 AS tasks, -CASE WHEN o.completed THEN 1 ELSE 0 END AS '
+     'completed FROM old_rows o) INSERT INTO user_task_stats (user_id, tasks, '
+     'completed) SELECT user_id, SUM(tasks), SUM(completed) FROM delta WHERE '
+     'user_id IS NOT NULL GROUP BY user_id HAVING SUM(tasks) <> 0 OR '
+     'SUM(completed) <> 0 ORDER BY user_id ON CONFLICT (user_id) DO UPDATE SET '
+     'tasks = user_task_stats.tasks + excluded.tasks, completed = '
+     "user_task_stats.completed + excluded.completed; ELSIF TG_OP = 'UPDATE' "
+     'THEN WITH delta AS (SELECT user_id, 1 AS tasks, CASE WHEN n.completed '
+     'THEN 1 ELSE 0 END AS completed FROM new_rows n UNION ALL SELECT user_id, '
+     '-1 AS tasks, -CASE WHEN o.completed THEN 1 ELSE 0 END AS completed FROM '
+     'old_rows o) UPDATE stats_totals SET tasks = stats_totals.tasks + d.tasks, '
+     'tasks_completed = stats_totals.tasks_completed + d.completed FROM (SELECT '
+     'COALESCE(SUM(tasks), 0) AS tasks, COALESCE(SUM(completed), 0) AS '
+     'completed FROM delta) d WHERE stats_totals.id = 1; WITH delta AS (SELECT '
+     'user_id, 1 AS tasks, CASE WHEN n.completed THEN 1 ELSE 0 END AS completed '
+     'FROM new_rows n UNION ALL SELECT user_id, -1 AS tasks, -CASE WHEN '
+     'o.completed THEN 1 ELSE 0 END AS completed FROM old_rows o) INSERT INTO '
+     'user_task_stats (user_id, tasks, completed) SELECT user_id, SUM(tasks), '
+     'SUM(completed) FROM delta WHERE user_id IS NOT NULL GROUP BY user_id '
+     'HAVING SUM(tasks) <> 0 OR SUM(completed) <> 0 ORDER BY user_id ON '
+     'CONFLICT (user_id) DO UPDATE SET tasks = user_task_stats.tasks + '
+     'excluded.tasks, completed = user_task_stats.completed + '
+     'excluded.completed; ELSE UPDATE stats_totals SET tasks = 0, '
+     'tasks_completed = 0 WHERE id = 1; DELETE FROM user_task_stats; END IF; '
+     'RETURN NULL; END $$'),
+    'DROP TRIGGER IF EXISTS stats_tasks_insert ON tasks',
+    ('CREATE TRIGGER stats_tasks_insert AFTER INSERT ON tasks REFERENCING NEW '
+     'TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_tasks()'),
+    'DROP TRIGGER IF EXISTS stats_tasks_update ON tasks',
+    ('CREATE TRIGGER stats_tasks_update AFTER UPDATE ON tasks REFERENCING OLD '
+     'TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE '
+     'FUNCTION stats_tasks()'),
+    'DROP TRIGGER IF EXISTS stats_tasks_delete ON tasks',
+    ('CREATE TRIGGER stats_tasks_delete AFTER DELETE ON tasks REFERENCING OLD '
+     'TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_tasks()'),
+    'DROP TRIGGER IF EXISTS stats_tasks_truncate ON tasks',
+    ('CREATE TRIGGER stats_tasks_truncate AFTER TRUNCATE ON tasks FOR EACH '
+     'STATEMENT EXECUTE FUNCTION stats_tasks()'),
+    ('CREATE OR REPLACE FUNCTION stats_products() RETURNS trigger LANGUAGE '
+     "plpgsql AS $$ BEGIN IF TG_OP = 'INSERT' THEN WITH delta AS (SELECT 1 AS "
+     'products, COALESCE(n.stock, 0) AS stock_units, COALESCE(n.price * '
+     'n.stock, 0) AS inventory_value FROM new_rows n) UPDATE stats_totals SET '
+     'products = stats_totals.products + d.products, stock_units = '
+     'stats_totals.stock_units + d.stock_units, inventory_value = '
+     'stats_totals.inventory_value + d.inventory_value FROM (SELECT '
+     'COALESCE(SUM(products), 0) AS products, COALESCE(SUM(stock_units), 0) AS '
+     'stock_units, COALESCE(SUM(inventory_value), 0) AS inventory_value FROM '
+     "delta) d WHERE stats_totals.id = 1; ELSIF TG_OP = 'DELETE' THEN WITH "
+     'delta AS (SELECT -1 AS products, -COALESCE(o.stock, 0) AS stock_units, '
+     '-COALESCE(o.price * o.stock, 0) AS inventory_value FROM old_rows o) '
+     'UPDATE stats_totals SET products = stats_totals.products + d.products, '
+     'stock_units = stats_totals.stock_units + d.stock_units, inventory_value = '
+     'stats_totals.inventory_value + d.inventory_value FROM (SELECT '
+     'COALESCE(SUM(products), 0) AS products, COALESCE(SUM(stock_units), 0) AS '
+     'stock_units, COALESCE(SUM(inventory_value), 0) AS inventory_value FROM '
+     "delta) d WHERE stats_totals.id = 1; ELSIF TG_OP = 'UPDATE' THEN WITH "
+     'delta AS (SELECT 1 AS products, COALESCE(n.stock, 0) AS stock_units, '
+     'COALESCE(n.price * n.stock, 0) AS inventory_value FROM new_rows n UNION '
+     'ALL SELECT -1 AS products, -COALESCE(o.stock, 0) AS stock_units, '
+     '-COALESCE(o.price * o.stock, 0) AS inventory_value FROM old_rows o) '
+     'UPDATE stats_totals SET products = stats_totals.products + d.products, '
+     'stock_units = stats_totals.stock_units + d.stock_units, inventory_value = '
+     'stats_totals.inventory_value + d.inventory_value FROM (SELECT '
+     'COALESCE(SUM(products), 0) AS products, COALESCE(SUM(stock_units), 0) AS '
+     'stock_units, COALESCE(SUM(inventory_value), 0) AS inventory_value FROM '
+     'delta) d WHERE stats_totals.id = 1; ELSE UPDATE stats_totals SET products '
+     '= 0, stock_units = 0, inventory_value = 0 WHERE id = 1; END IF; RETURN '
+     'NULL; END $$'),
+    'DROP TRIGGER IF EXISTS stats_products_insert ON products',
+    ('CREATE TRIGGER stats_products_insert AFTER INSERT ON products REFERENCING '
+     'NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_products()'),
+    'DROP TRIGGER IF EXISTS stats_products_update ON products',
+    ('CREATE TRIGGER stats_products_update AFTER UPDATE ON products REFERENCING '
+     'OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE '
+     'FUNCTION stats_products()'),
+    'DROP TRIGGER IF EXISTS stats_products_delete ON products',
+    ('CREATE TRIGGER stats_products_delete AFTER DELETE ON products REFERENCING '
+     'OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_products()'),
+    'DROP TRIGGER IF EXISTS stats_products_truncate ON products',
+    ('CREATE TRIGGER stats_products_truncate AFTER TRUNCATE ON products FOR '
+     'EACH STATEMENT EXECUTE FUNCTION stats_products()'),
+]
+
+SINGLE_ROW_REBUILD = [
+    'DELETE FROM user_task_stats',
+    ('INSERT INTO user_task_stats (user_id, tasks, completed) SELECT user_id, '
+     'COUNT(*), SUM(CASE WHEN tasks.completed THEN 1 ELSE 0 END) FROM tasks '
+     'WHERE user_id IS NOT NULL GROUP BY user_id'),
+    'DELETE FROM stats_totals',
+    ('INSERT INTO stats_totals (id, users, tasks, tasks_completed, products, '
+     'stock_units, inventory_value) SELECT 1, (SELECT COUNT(*) FROM users), '
+     '(SELECT COUNT(*) FROM tasks), (SELECT COALESCE(SUM(CASE WHEN '
+     'tasks.completed THEN 1 ELSE 0 END), 0) FROM tasks), (SELECT COUNT(*) FROM '
+     'products), (SELECT COALESCE(SUM(COALESCE(products.stock, 0)), 0) FROM '
+     'products), (SELECT COALESCE(SUM(COALESCE(products.price * products.stock, '
+     '0)), 0) FROM products)'),
+]
+
+
+def reinstall(connection, sqlite_triggers, pg_triggers):
+    """Podmienia triggery (funkcje PG są CREATE OR REPLACE, triggery SQLite - nie)."""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        statements = pg_triggers
+    elif dialect == 'sqlite':
+        statements = [f'DROP TRIGGER IF EXISTS stats_{trigger}'
+                      for trigger in SQLITE_TRIGGER_NAMES] + sqlite_triggers
+    else:
+        raise ValueError(f"incremental stats are not supported on {dialect!r}")
+    for statement in statements:
+        op.execute(statement)
+
+
+def rebuild(connection, statements):
+    if connection.dialect.name == 'postgresql':
+        # Zapisy czekają do końca przeliczenia - inaczej ich delty by przepadły
+        op.execute("LOCK TABLE users, tasks, products IN SHARE MODE")
+    for statement in statements:
+        op.execute(statement)
+
+
+def upgrade():
+    connection = op.get_bind()
+    reinstall(connection, SQLITE_TRIGGERS, PG_TRIGGERS)
+    rebuild(connection, REBUILD)
+
+
+def downgrade():
+    connection = op.get_bind()
+    reinstall(connection, SINGLE_ROW_SQLITE_TRIGGERS, SINGLE_ROW_PG_TRIGGERS)
+    rebuild(connection, SINGLE_ROW_REBUILD)
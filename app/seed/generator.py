@@ -0,0 +1,119 @@
+"""Deterministyczny generator syntetycznych danych do testów pojemności.
+
+Każda partia ma własny generator liczb losowych wyprowadzony z
+(seed, tabela, numer partii), więc wynik nie zależy od liczby procesów
+ani od kolejności, w jakiej partie zostaną załadowane.
+"""
+import random
+
+MALE_FIRST_NAMES = [
+    "Jan", "Piotr", "Krzysztof", "Andrzej", "Tomasz", "Paweł", "Michał",
+    "Marcin", "Marek", "Grzegorz", "Jakub", "Adam", "Łukasz", "Mateusz",
+    "Kamil", "Wojciech", "Rafał", "Dariusz", "Jerzy", "Maciej", "Bartosz",
+    "Szymon", "Filip", "Antoni", "Stanisław", "Zbigniew", "Sebastian",
+]
+FEMALE_FIRST_NAMES = [
+    "Anna", "Maria", "Katarzyna", "Małgorzata", "Agnieszka", "Barbara",
+    "Ewa", "Krystyna", "Magdalena", "Elżbieta", "Joanna", "Aleksandra",
+    "Monika", "Zofia", "Teresa", "Danuta", "Natalia", "Julia", "Karolina",
+    "Marta", "Beata", "Dorota", "Alicja", "Justyna", "Paulina", "Hanna",
+]
+# (forma męska, forma żeńska)
+SURNAMES = [
+    ("Nowak", "Nowak"), ("Kowalski", "Kowalska"), ("Wiśniewski", "Wiśniewska"),
+    ("Wójcik", "Wójcik"), ("Kowalczyk", "Kowalczyk"), ("Kamiński", "Kamińska"),
+    ("Lewandowski", "Lewandowska"), ("Zieliński", "Zielińska"),
+    ("Szymański", "Szymańska"), ("Woźniak", "Woźniak"), ("Dąbrowski", "Dąbrowska"),
+    ("Kozłowski", "Kozłowska"), ("Jankowski", "Jankowska"), ("Mazur", "Mazur"),
+    ("Kwiatkowski", "Kwiatkowska"), ("Krawczyk", "Krawczyk"),
+    ("Piotrowski", "Piotrowska"), ("Grabowski", "Grabowska"),
+    ("Nowakowski", "Nowakowska"), ("Pawłowski", "Pawłowska"),
+    ("Michalski", "Michalska"), ("Nowicki", "Nowicka"), ("Adamczyk", "Adamczyk"),
+    ("Dudek", "Dudek"), ("Zając", "Zając"), ("Wieczorek", "Wieczorek"),
+    ("Jabłoński", "Jabłońska"), ("Król", "Król"), ("Majewski", "Majewska"),
+    ("Olszewski", "Olszewska"), ("Jaworski", "Jaworska"), ("Wróbel", "Wróbel"),
+    ("Malinowski", "Malinowska"), ("Pawlak", "Pawlak"), ("Witkowski", "Witkowska"),
+    ("Walczak", "Walczak"), ("Stępień", "Stępień"), ("Górski", "Górska"),
+]
+TASK_VERBS = [
+    "Zrobić", "Napisać", "Sprawdzić", "Przygotować", "Wysłać", "Zamówić",
+    "Przeczytać", "Poprawić", "Omówić", "Zaplanować", "Opłacić", "Odebrać",
+]
+TASK_OBJECTS = [
+    "zakupy", "raport", "fakturę", "prezentację", "ofertę", "umowę",
+    "spotkanie z klientem", "budżet", "dokumentację", "przegląd kodu",
+    "paczkę", "rachunek za prąd", "notatki", "plan sprintu", "ankietę",
+]
+PRODUCT_NAMES = [
+    "Laptop", "Mysz", "Klawiatura", "Monitor", "Słuchawki", "Drukarka",
+    "Tablet", "Smartfon", "Głośnik", "Kamera", "Router", "Dysk SSD",
+    "Pendrive", "Zasilacz", "Mikrofon", "Podkładka", "Stacja dokująca",
+]
+PRODUCT_BRANDS = [
+    "Lenovo", "Dell", "Logitech", "Samsung", "Sony", "HP", "Asus", "Acer",
+    "Xiaomi", "Philips", "Kingston", "TP-Link", "Razer", "Apple", "LG",
+]
+
+# Ułamek zadań bez przypisanego użytkownika i zakończonych
+UNASSIGNED_TASK_RATIO = 0.03
+COMPLETED_TASK_RATIO = 0.35
+# Wykładnik rozkładu zadań na użytkowników: u = r ** k daje długi ogon -
+# większość użytkowników ma kilka zadań, nieliczni bardzo dużo
+TASK_SKEW = 2.5
+
+_ASCII = str.maketrans("ąćęłńóśźżĄĆĘŁŃÓŚŹŻ", "acelnoszzACELNOSZZ")
+
+
+def batch_rng(seed, table, batch_index):
+    return random.Random(f"{seed}:{table}:{batch_index}")
+
+
+def plan_batches(total, batch_size):
+    """Dzieli zakres ID 1..total na partie -> [(numer, pierwsze_id, liczba)]."""
+    return [
+        (index, start + 1, min(batch_size, total - start))
+        for index, start in enumerate(range(0, total, batch_size))
+    ]
+
+
+def user_rows(seed, batch_index, start_id, count):
+    """Wiersze (id, name, email); e-mail zawiera ID, więc jest unikalny."""
+    rng = batch_rng(seed, 'users', batch_index)
+    rows = []
+    for user_id in range(start_id, start_id + count):
+        male, female = rng.choice(SURNAMES)
+        if rng.random() < 0.5:
+            first, last = rng.choice(MALE_FIRST_NAMES), male
+        else:
+            first, last = rng.choice(FEMALE_FIRST_NAMES), female
+        email = f"{first}.{last}.{user_id}@example.pl".translate(_ASCII).lower()
+        rows.append((user_id, f"{first} {last}", email))
+    return rows
+
+
+def task_rows(seed, batch_index, start_id, count, user_count):
+    """Wiersze (id, title, completed, user_id) z długim ogonem zadań na użytkownika."""
+    rng = batch_rng(seed, 'tasks', batch_index)
+    rows = []
+    for task_id in range(start_id, start_id + count):
+        title = f"{rng.choice(TASK_VERBS)} {rng.choice(TASK_OBJECTS)}"
+        completed = rng.random() < COMPLETED_TASK_RATIO
+        if not user_count or rng.random() < UNASSIGNED_TASK_RATIO:
+            user_id = None
+        else:
+            user_id = 1 + int(user_count * rng.random() ** TASK_SKEW)
+        rows.append((task_id, title, completed, user_id))
+    return rows
+
+
+def product_rows(seed, batch_index, start_id, count):
+    """Wiersze (id, name, price, stock); nazwa zawiera ID, więc jest unikalna."""
+    rng = batch_rng(seed, 'products', batch_index)
+    rows = []
+    for product_id in range(start_id, start_id + count):
+        name = f"{rng.choice(PRODUCT_NAMES)} {rng.choice(PRODUCT_BRANDS)} {product_id:07d}"
+        # Ceny mają rozkład log-normalny zaokrąglony do końcówki ,99
+        price = round(max(1, int(rng.lognormvariate(5, 1.2))) - 0.01, 2)
+        stock = 0 if rng.random() < 0.05 else rng.randint(1, 500)
+        rows.append((product_id, name, price, stock))
+    return rows
@@ -0,0 +1,140 @@
+"""Szybkie ładowanie wygenerowanych partii do bazy.
+
+Na PostgreSQL partie idą przez ``COPY ... FROM STDIN`` (CSV w pamięci),
+na pozostałych bazach przez ``executemany`` na surowym połączeniu. Partie
+mogą być rozdzielone między procesy robocze - każdy ma własny silnik.
+"""
+import csv
+import io
+import time
+from multiprocessing import get_context
+
+from sqlalchemy import create_engine, text
+
+from seed.generator import plan_batches, product_rows, task_rows, user_rows
+
+COLUMNS = {
+    'users': ('id', 'name', 'email'),
+    'tasks': ('id', 'title', 'completed', 'user_id'),
+    'products': ('id', 'name', 'price', 'stock'),
+}
+DEFAULT_BATCH_SIZE = 50000
+
+_PLACEHOLDERS = {'qmark': '?', 'format': '%s', 'pyformat': '%s'}
+
+# Silnik procesu roboczego - tworzony po starcie procesu, nie dziedziczony
+_worker_engine = None
+
+
+def generate(table, seed, batch_index, start_id, count, user_count):
+    if table == 'users':
+        return user_rows(seed, batch_index, start_id, count)
+    if table == 'tasks':
+        return task_rows(seed, batch_index, start_id, count, user_count)
+    return product_rows(seed, batch_index, start_id, count)
+
+
+def copy_rows(engine, table, rows):
+    """Zapisuje jedną partię krotek w jednej transakcji."""
+    columns = COLUMNS[table]
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if engine.dialect.name == 'postgresql':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        else:
+            placeholder = _PLACEHOLDERS[engine.dialect.paramstyle]
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join([placeholder] * len(columns))})",
+                rows
+            )
+        cursor.close()
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def _init_worker(url):
+    global _worker_engine
+    _worker_engine = create_engine(url)
+
+
+def _load_job(job):
+    table, seed, batch_index, start_id, count, user_count = job
+    copy_rows(_worker_engine, table, generate(table, seed, batch_index, start_id, count, user_count))
+    return table, count
+
+
+def _run_jobs(engine, jobs, workers, report):
+    if workers <= 1:
+        for table, seed, batch_index, start_id, count, user_count in jobs:
+            copy_rows(engine, table, generate(table, seed, batch_index, start_id, count, user_count))
+            report(table, count)
+        return
+
+    url = engine.url.render_as_string(hide_password=False)
+    with get_context().Pool(workers, initializer=_init_worker, initargs=(url,)) as pool:
+        for table, count in pool.imap_unordered(_load_job, jobs):
+            report(table, count)
+
+
+def reset_tables(engine):
+    with engine.begin() as conn:
+        if engine.dialect.name == 'postgresql':
+            conn.execute(text("TRUNCATE tasks, products, users RESTART IDENTITY"))
+        else:
+            for table in ('tasks', 'products', 'users'):
+                conn.execute(text(f"DELETE FROM {table}"))
+
+
+def finalize(engine):
+    """Po wstawieniu jawnych ID przestawia sekwencje i odświeża statystyki."""
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as conn:
+        for table in COLUMNS:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {table}"
+            ))
+        conn.execute(text("ANALYZE users, tasks, products"))
+
+
+def load_scale(engine, users=0, tasks=0, products=0, seed=42,
+               batch_size=DEFAULT_BATCH_SIZE, workers=1, log=print):
+    """Czyści tabele i ładuje zadany wolumen danych; zwraca liczby wierszy."""
+    if engine.dialect.name == 'sqlite' and workers > 1:
+        log("SQLite allows a single writer, falling back to 1 worker")
+        workers = 1
+
+    totals = {'users': 0, 'tasks': 0, 'products': 0}
+    started = time.perf_counter()
+
+    def report(table, count):
+        totals[table] += count
+        elapsed = time.perf_counter() - started
+        log(f"  {table}: {totals[table]} rows ({sum(totals.values()) / elapsed:,.0f} rows/s)")
+
+    reset_tables(engine)
+
+    # Najpierw użytkownicy - zadania się do nich odwołują
+    user_jobs = [('users', seed, i, start, count, users)
+                 for i, start, count in plan_batches(users, batch_size)]
+    _run_jobs(engine, user_jobs, workers, report)
+
+    other_jobs = [('tasks', seed, i, start, count, users)
+                  for i, start, count in plan_batches(tasks, batch_size)]
+    other_jobs += [('products', seed, i, start, count, users)
+                   for i, start, count in plan_batches(products, batch_size)]
+    _run_jobs(engine, other_jobs, workers, report)
+
+    finalize(engine)
+    log(f"Loaded {sum(totals.values())} rows in {time.perf_counter() - started:.1f}s")
+    return totals
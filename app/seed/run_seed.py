@@ -1,7 +1,6 @@
 import os
 import sys
-import json
-import csv
+import argparse
 from datetime import datetime
 
 # Dodaj katalog nadrzędny do ścieżki
@@ -10,11 +9,86 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 # Teraz import będzie działał
-from src.app import app, db, User, Task, Product
-
-
-def seed():
-    with app.app_context():
+from src.app import create_app, db, User, Task, Product
+from seed.loader import DEFAULT_BATCH_SIZE, load_scale
+from seed.upsert import sync_rows, upsert
+from src.export import FORMATS, export_to_files
+
+
+# Dane demonstracyjne - klucze naturalne: users.email, products.name
+USERS = [
+    {"name": "Jan Kowalski", "email": "jan@example.com"},
+    {"name": "Anna Nowak", "email": "anna@example.com"},
+    {"name": "Piotr Wiśniewski", "email": "piotr@example.com"},
+    {"name": "Maria Lewandowska", "email": "maria@example.com"},
+    {"name": "Krzysztof Dąbrowski", "email": "krzysztof@example.com"},
+]
+
+# (e-mail właściciela, tytuł, zakończone)
+TASKS = [
+    ("jan@example.com", "Zrobić zakupy", False),
+    ("anna@example.com", "Napisać raport", True),
+    ("jan@example.com", "Umówić się na spotkanie", False),
+    ("piotr@example.com", "Przeczytać książkę", False),
+    ("maria@example.com", "Zadzwonić do klienta", True),
+]
+
+PRODUCTS = [
+    {"name": "Laptop", "price": 2999.99, "stock": 15},
+    {"name": "Mysz", "price": 89.99, "stock": 50},
+    {"name": "Klawiatura", "price": 199.99, "stock": 30},
+    {"name": "Monitor", "price": 899.99, "stock": 20},
+    {"name": "Słuchawki", "price": 299.99, "stock": 40},
+]
+
+
+def demo_task_rows(user_ids):
+    return [
+        {"user_id": user_ids[email], "title": title, "completed": completed}
+        for email, title, completed in TASKS
+    ]
+
+
+def write_outputs(summary_lines, export_format=None, compress=False, rows_per_file=None):
+    """Eksportuje users i products strumieniowo z bazy i zapisuje seed.log.
+
+    Domyślnie users trafiają do CSV, a products do JSON; ``export_format``
+    wymusza jeden format dla obu tabel.
+    """
+    # Utworzenie katalogu na pliki wyjściowe
+    output_dir = os.path.join(parent_dir, 'seed_output')
+    os.makedirs(output_dir, exist_ok=True)
+
+    exported = []
+    with db.engine.connect() as conn:
+        exported += export_to_files(
+            conn, User.__table__, export_format or 'csv', output_dir,
+            compress=compress, rows_per_file=rows_per_file,
+            header=['ID', 'Name', 'Email']
+        )
+        exported += export_to_files(
+            conn, Product.__table__, export_format or 'json', output_dir,
+            compress=compress, rows_per_file=rows_per_file
+        )
+    for path in exported:
+        print(f"Export saved to: {path}")
+
+    # Zapisz log
+    log_path = os.path.join(output_dir, "seed.log")
+    with open(log_path, "w") as f:
+        f.write(f"Seed completed at: {datetime.now()}\n")
+        for line in summary_lines:
+            f.write(f"{line}\n")
+        f.write("\n=== Exported files ===\n")
+        for path in exported:
+            f.write(f"{os.path.basename(path)}\n")
+
+    print(f"Log saved to: {log_path}")
+    return output_dir
+
+
+def seed(export_options=None):
+    with create_app().app_context():
         print("Starting database seeding...")
 
         # Utwórz tabele (jeśli jeszcze nie istnieją)
@@ -29,81 +103,130 @@ def seed():
 
         # Seedowanie Users
         print("Seeding users...")
-        users_data = [
-            User(name="Jan Kowalski", email="jan@example.com"),
-            User(name="Anna Nowak", email="anna@example.com"),
-            User(name="Piotr Wiśniewski", email="piotr@example.com"),
-            User(name="Maria Lewandowska", email="maria@example.com"),
-            User(name="Krzysztof Dąbrowski", email="krzysztof@example.com"),
-        ]
+        users_data = [User(**data) for data in USERS]
         db.session.add_all(users_data)
         db.session.commit()
         print(f"Created {len(users_data)} users")
 
         # Seedowanie Tasks
         print("Seeding tasks...")
-        tasks_data = [
-            Task(title="Zrobić zakupy", completed=False, user_id=1),
-            Task(title="Napisać raport", completed=True, user_id=2),
-            Task(title="Umówić się na spotkanie", completed=False, user_id=1),
-            Task(title="Przeczytać książkę", completed=False, user_id=3),
-            Task(title="Zadzwonić do klienta", completed=True, user_id=4),
-        ]
+        user_ids = {user.email: user.id for user in users_data}
+        tasks_data = [Task(**data) for data in demo_task_rows(user_ids)]
         db.session.add_all(tasks_data)
         db.session.commit()
         print(f"Created {len(tasks_data)} tasks")
 
         # Seedowanie Products
         print("Seeding products...")
-        products_data = [
-            Product(name="Laptop", price=2999.99, stock=15),
-            Product(name="Mysz", price=89.99, stock=50),
-            Product(name="Klawiatura", price=199.99, stock=30),
-            Product(name="Monitor", price=899.99, stock=20),
-            Product(name="Słuchawki", price=299.99, stock=40),
-        ]
+        products_data = [Product(**data) for data in PRODUCTS]
         db.session.add_all(products_data)
         db.session.commit()
         print(f"Created {len(products_data)} products")
 
-        # Utworzenie katalogu na pliki wyjściowe
-        output_dir = os.path.join(parent_dir, 'seed_output')
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Zapisz log
-        log_path = os.path.join(output_dir, "seed.log")
-        with open(log_path, "w") as f:
-            f.write(f"Seed completed at: {datetime.now()}\n")
-            f.write(f"Created {len(users_data)} users\n")
-            f.write(f"Created {len(tasks_data)} tasks\n")
-            f.write(f"Created {len(products_data)} products\n")
-            f.write("\n=== Users ===\n")
-            for user in users_data:
-                f.write(f"ID: {user.id}, Name: {user.name}, Email: {user.email}\n")
-
-        print(f"Log saved to: {log_path}")
-
-        # Zapisz users do CSV
-        csv_path = os.path.join(output_dir, "users.csv")
-        with open(csv_path, "w", newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['ID', 'Name', 'Email'])
-            for user in users_data:
-                writer.writerow([user.id, user.name, user.email])
-
-        print(f"CSV saved to: {csv_path}")
-
-        # Zapisz products do JSON
-        json_path = os.path.join(output_dir, "products.json")
-        products_list = [p.to_dict() for p in products_data]
-        with open(json_path, "w", encoding='utf-8') as jsonfile:
-            json.dump(products_list, jsonfile, indent=2, ensure_ascii=False)
-
-        print(f"JSON saved to: {json_path}")
+        output_dir = write_outputs([
+            f"Created {len(users_data)} users",
+            f"Created {len(tasks_data)} tasks",
+            f"Created {len(products_data)} products",
+        ], **(export_options or {}))
 
         print("\n✅ Seeding completed successfully!")
         print(f"📁 Output directory: {output_dir}")
 
 
+def seed_incremental(export_options=None):
+    """Upsert danych po kluczu naturalnym - bez kasowania istniejących wierszy."""
+    with create_app().app_context():
+        print("Starting incremental database seeding...")
+        db.create_all()
+
+        summary = {}
+        with db.engine.begin() as conn:
+            summary['users'] = upsert(conn, User.__table__, 'email', USERS)
+            user_ids = dict(conn.execute(
+                db.select(User.email, User.id)
+                .where(User.email.in_([u['email'] for u in USERS]))
+            ).all())
+            summary['tasks'] = sync_rows(conn, Task.__table__, ['user_id', 'title'],
+                                         demo_task_rows(user_ids))
+            summary['products'] = upsert(conn, Product.__table__, 'name', PRODUCTS)
+
+        lines = [
+            f"{table}: {c['inserted']} inserted, {c['updated']} updated, "
+            f"{c['unchanged']} unchanged"
+            for table, c in summary.items()
+        ]
+        for line in lines:
+            print(line)
+
+        output_dir = write_outputs(lines, **(export_options or {}))
+        print("\n✅ Incremental seeding completed successfully!")
+        print(f"📁 Output directory: {output_dir}")
+        return summary
+
+
+def seed_scale(users, tasks, products, seed_value, batch_size, workers,
+               export_options=None):
+    with create_app().app_context():
+        print(f"Starting scale seeding (seed={seed_value}, workers={workers})...")
+        db.create_all()
+        totals = load_scale(db.engine, users=users, tasks=tasks, products=products,
+                            seed=seed_value, batch_size=batch_size, workers=workers)
+        if export_options is not None:
+            write_outputs([f"Created {totals[table]} {table}" for table in totals],
+                          **export_options)
+        print(f"\n✅ Created {totals['users']} users, {totals['tasks']} tasks, "
+              f"{totals['products']} products")
+
+
+def count_arg(value):
+    """Liczba wierszy; akceptuje też zapis naukowy, np. 1e6."""
+    try:
+        count = int(float(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid row count: {value}")
+    if count < 0:
+        raise argparse.ArgumentTypeError("row count must not be negative")
+    return count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Seed the database with demo data, or with a large "
+                    "deterministic synthetic dataset when row counts are given."
+    )
+    parser.add_argument('--users', type=count_arg, default=0)
+    parser.add_argument('--tasks', type=count_arg, default=0)
+    parser.add_argument('--products', type=count_arg, default=0)
+    parser.add_argument('--seed', type=int, default=42,
+                        help="random seed; the same seed gives the same data")
+    parser.add_argument('--batch-size', type=count_arg, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of loader processes")
+    parser.add_argument('--incremental', action='store_true',
+                        help="upsert demo data by natural key instead of "
+                             "clearing the tables first")
+    parser.add_argument('--export-format', choices=FORMATS,
+                        help="format for both exports (default: users CSV, products JSON)")
+    parser.add_argument('--export-gzip', action='store_true',
+                        help="gzip-compress exported files")
+    parser.add_argument('--export-chunk-rows', type=count_arg,
+                        help="split exports into files of at most this many rows")
+    parser.add_argument('--skip-export', action='store_true',
+                        help="do not write seed_output files")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    seed()
+    args = parse_args()
+    export_options = None if args.skip_export else {
+        "export_format": args.export_format,
+        "compress": args.export_gzip,
+        "rows_per_file": args.export_chunk_rows,
+    }
+    if args.users or args.tasks or args.products:
+        seed_scale(args.users, args.tasks, args.products, args.seed,
+                   args.batch_size, args.workers, export_options)
+    elif args.incremental:
+        seed_incremental(export_options)
+    else:
+        seed(export_options)
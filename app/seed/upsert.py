@@ -0,0 +1,89 @@
+"""Przyrostowe seedowanie: upsert po kluczu naturalnym zamiast kasowania tabel.
+
+Najpierw porównujemy dane wejściowe z tym, co już jest w bazie, i do
+``INSERT ... ON CONFLICT DO UPDATE`` wysyłamy tylko nowe i zmienione
+wiersze. Warunek ``WHERE ... IS DISTINCT FROM`` w klauzuli DO UPDATE
+dodatkowo chroni przed przepisaniem wiersza, który w międzyczasie już
+ma docelowe wartości. Istniejące ID (a więc i ``tasks.user_id``) zostają.
+"""
+from sqlalchemy import or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+LOOKUP_CHUNK_SIZE = 1000
+
+_DIALECT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def _existing(conn, table, key_columns, value_columns, keys):
+    """Mapuje klucz naturalny -> krotkę obecnych wartości kolumn."""
+    key_cols = [table.c[name] for name in key_columns]
+    key_expr = key_cols[0] if len(key_cols) == 1 else tuple_(*key_cols)
+    found = {}
+    keys = list(keys)
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+        statement = select(*key_cols, *[table.c[name] for name in value_columns]) \
+            .where(key_expr.in_(chunk))
+        for row in conn.execute(statement):
+            key = row[0] if len(key_cols) == 1 else tuple(row[:len(key_cols)])
+            found[key] = tuple(row[len(key_cols):])
+    return found
+
+
+def diff_rows(conn, table, key_columns, rows):
+    """Dzieli ``rows`` (słowniki) na (nowe, zmienione, liczba_niezmienionych)."""
+    value_columns = [name for name in rows[0] if name not in key_columns] if rows else []
+
+    def key_of(row):
+        if len(key_columns) == 1:
+            return row[key_columns[0]]
+        return tuple(row[name] for name in key_columns)
+
+    existing = _existing(conn, table, key_columns, value_columns, {key_of(r) for r in rows})
+    new, changed, unchanged = [], [], 0
+    for row in rows:
+        current = existing.get(key_of(row))
+        if current is None:
+            new.append(row)
+        elif current != tuple(row[name] for name in value_columns):
+            changed.append(row)
+        else:
+            unchanged += 1
+    return new, changed, unchanged
+
+
+def upsert(conn, table, key, rows):
+    """Upsert po unikalnej kolumnie ``key``; zwraca liczniki zmian."""
+    new, changed, unchanged = diff_rows(conn, table, [key], rows)
+    pending = new + changed
+    if pending:
+        dialect_insert = _DIALECT_INSERTS[conn.dialect.name]
+        statement = dialect_insert(table)
+        value_columns = [name for name in pending[0] if name != key]
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c[key]],
+            set_={name: statement.excluded[name] for name in value_columns},
+            where=or_(*[table.c[name].is_distinct_from(statement.excluded[name])
+                        for name in value_columns])
+        )
+        conn.execute(statement, pending)
+    return {"inserted": len(new), "updated": len(changed), "unchanged": unchanged}
+
+
+def sync_rows(conn, table, key_columns, rows):
+    """Jak ``upsert``, ale dla tabel bez unikalnego klucza naturalnego.
+
+    Nowe wiersze są wstawiane, a zmienione aktualizowane po kluczu złożonym
+    z ``key_columns`` (bez ON CONFLICT, bo nie ma ograniczenia, na którym
+    mógłby zadziałać).
+    """
+    new, changed, unchanged = diff_rows(conn, table, key_columns, rows)
+    if new:
+        conn.execute(table.insert(), new)
+    for row in changed:
+        conn.execute(
+            update(table)
+            .where(*[table.c[name] == row[name] for name in key_columns])
+            .values({name: value for name, value in row.items() if name not in key_columns})
+        )
+    return {"inserted": len(new), "updated": len(changed), "unchanged": unchanged}
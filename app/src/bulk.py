@@ -0,0 +1,236 @@
+"""Masowe wstawianie wierszy: walidacja z góry i jeden wielowierszowy INSERT.
+
+Walidacja opiera się na metadanych kolumn modelu (typ, długość, NOT NULL,
+UNIQUE, klucze obce), więc działa tak samo dla wszystkich zasobów. Błędy
+są zgłaszane per element; poprawne elementy trafiają do bazy w jednej
+transakcji.
+"""
+import json
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from src.errors import ApiError
+
+MAX_BULK_ITEMS = 10000
+# Limit ID w jednym PATCH i rozmiar listy `IN (...)` w pojedynczym UPDATE
+MAX_UPDATE_IDS = 100000
+UPDATE_CHUNK_SIZE = 10000
+# Ile wartości naraz sprawdzamy w `IN (...)` przy walidacji unikalności/FK
+LOOKUP_CHUNK_SIZE = 1000
+
+
+def parse_items(request):
+    """Czyta listę elementów z tablicy JSON albo z ciała NDJSON."""
+    return load_items(request.mimetype, request.get_data(as_text=True))
+
+
+def load_items(mimetype, body):
+    """``parse_items`` dla surowego ciała żądania (tekst)."""
+    try:
+        if mimetype == 'application/x-ndjson':
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError:
+        raise ApiError("invalid NDJSON body" if mimetype == 'application/x-ndjson'
+                       else "expected a JSON array of objects")
+    if not isinstance(items, list):
+        raise ApiError("expected a JSON array of objects")
+
+    if not items:
+        raise ApiError("no items to insert")
+    if len(items) > MAX_BULK_ITEMS:
+        raise ApiError(f"too many items (max {MAX_BULK_ITEMS})", 413)
+    return items
+
+
+def _insert_columns(model):
+    return [c for c in model.__table__.columns if not c.primary_key]
+
+
+def _check_value(column, value):
+    """Zwraca opis błędu dla wartości kolumny albo None."""
+    if value is None:
+        return None if column.nullable else f"{column.name} must not be null"
+
+    expected = column.type.python_type
+    if expected is float:
+        ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+    elif expected is int:
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    else:
+        ok = isinstance(value, expected)
+    if not ok:
+        return f"{column.name} must be of type {expected.__name__}"
+
+    length = getattr(column.type, 'length', None)
+    if length is not None and len(value) > length:
+        return f"{column.name} is longer than {length} characters"
+    return None
+
+
+def validate_item(model, item, ignore_unknown=False):
+    """Waliduje jeden element -> (wiersz z kompletem kolumn, błąd albo None).
+
+    ``ignore_unknown`` pomija pola spoza kolumn (np. ``id``) zamiast błędu.
+    """
+    if not isinstance(item, dict):
+        return None, "item must be a JSON object"
+
+    columns = _insert_columns(model)
+    unknown = set(item) - {c.name for c in columns}
+    if unknown and not ignore_unknown:
+        return None, f"unknown fields: {', '.join(sorted(unknown))}"
+
+    row = {}
+    for column in columns:
+        if column.name in item:
+            value = item[column.name]
+        elif column.default is not None and column.default.is_scalar:
+            value = column.default.arg
+        elif column.nullable:
+            value = None
+        else:
+            return None, f"missing field: {column.name}"
+
+        error = _check_value(column, value)
+        if error:
+            return None, error
+        row[column.name] = value
+    return row, None
+
+
+def _existing_values(session, column, values):
+    found = set()
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+        found.update(session.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def check_constraints(session, model, rows, errors):
+    """Wykrywa naruszenia UNIQUE i kluczy obcych zanim dotkniemy INSERT-a.
+
+    ``rows`` to lista par (indeks, wiersz); zwraca pary, które przeszły,
+    a odrzucone dopisuje do ``errors``.
+    """
+    for column in _insert_columns(model):
+        if column.unique:
+            taken = _existing_values(
+                session, column, {row[column.name] for _, row in rows}
+            )
+            kept, seen = [], set()
+            for index, row in rows:
+                value = row[column.name]
+                if value in taken:
+                    errors.append({"index": index, "error": f"duplicate {column.name}: {value}"})
+                elif value in seen:
+                    errors.append({"index": index, "error": f"duplicate {column.name} in batch: {value}"})
+                else:
+                    seen.add(value)
+                    kept.append((index, row))
+            rows = kept
+
+        for foreign_key in column.foreign_keys:
+            wanted = {row[column.name] for _, row in rows if row[column.name] is not None}
+            present = _existing_values(session, foreign_key.column, wanted)
+            kept = []
+            for index, row in rows:
+                value = row[column.name]
+                if value is not None and value not in present:
+                    errors.append({"index": index, "error": f"{column.name} {value} does not exist"})
+                else:
+                    kept.append((index, row))
+            rows = kept
+    return rows
+
+
+def insert_rows(session, model, rows):
+    """Wstawia pary (indeks, wiersz) jednym wielowierszowym INSERT ... RETURNING.
+
+    Gdy mimo walidacji baza odrzuci partię (np. równoległy zapis tego
+    samego e-maila), wstawiamy elementy pojedynczo w SAVEPOINT-ach, żeby
+    zgłosić błąd tylko dla winnych elementów.
+    Zwraca (utworzone [{"index", "id"}], błędy [{"index", "error"}]).
+    """
+    if not rows:
+        return [], []
+
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    try:
+        ids = session.execute(statement, [row for _, row in rows]).scalars().all()
+        session.commit()
+        return [{"index": index, "id": id_} for (index, _), id_ in zip(rows, ids)], []
+    except IntegrityError:
+        session.rollback()
+
+    created, errors = [], []
+    for index, row in rows:
+        try:
+            with session.begin_nested():
+                id_ = session.execute(insert(model).returning(model.id), row).scalar_one()
+            created.append({"index": index, "id": id_})
+        except IntegrityError as e:
+            errors.append({"index": index, "error": str(e.orig)})
+    session.commit()
+    return created, errors
+
+
+def bulk_create(session, model, items):
+    """Pełna ścieżka: walidacja, sprawdzenie ograniczeń i wstawienie."""
+    errors, rows = [], []
+    for index, item in enumerate(items):
+        row, error = validate_item(model, item)
+        if error:
+            errors.append({"index": index, "error": error})
+        else:
+            rows.append((index, row))
+
+    rows = check_constraints(session, model, rows, errors)
+    created, insert_errors = insert_rows(session, model, rows)
+    errors.extend(insert_errors)
+    errors.sort(key=lambda e: e["index"])
+    return created, errors
+
+
+def ids_arg(value):
+    """Lista ID z ciała żądania (bez powtórzeń, w kolejności rosnącej)."""
+    if not isinstance(value, list) or not value:
+        raise ApiError("ids must be a non-empty list of integers")
+    if any(not isinstance(id_, int) or isinstance(id_, bool) for id_ in value):
+        raise ApiError("ids must be a non-empty list of integers")
+    if len(value) > MAX_UPDATE_IDS:
+        raise ApiError(f"too many ids (max {MAX_UPDATE_IDS})", 413)
+    return sorted(set(value))
+
+
+def bulk_update(session, model, values, criteria=(), ids=None):
+    """Zbiorowy UPDATE wierszy spełniających ``criteria`` (i z listy ``ids``).
+
+    Wiersze, które już mają docelowe wartości, są pomijane w WHERE, więc
+    nie są przepisywane. Lista ID jest dzielona na kawałki ``IN (...)``
+    w jednej transakcji. Zwraca liczbę zmienionych wierszy.
+    """
+    changed = or_(*(getattr(model, name).is_distinct_from(value)
+                    for name, value in values.items()))
+    statement = (
+        update(model)
+        .where(*criteria, changed)
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+    if ids is None:
+        # Bez listy kluczy ChangeTracker unieważnia całą tabelę
+        updated = session.execute(statement).rowcount
+    else:
+        updated = 0
+        for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+            chunk = ids[start:start + UPDATE_CHUNK_SIZE]
+            updated += session.execute(
+                statement.where(model.id.in_(chunk)).execution_options(changed_rows=chunk)
+            ).rowcount
+    session.commit()
+    return updated
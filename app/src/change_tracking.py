@@ -0,0 +1,90 @@
+"""Śledzenie zapisów w sesji SQLAlchemy i powiadamianie po COMMIT.
+
+Zbieramy zmiany z bieżącej transakcji - zarówno z flush obiektów ORM
+(tabela + klucz główny), jak i z instrukcji ``insert()/update()/delete()``
+wykonanych przez ``session.execute`` - i dopiero po udanym COMMIT
+przekazujemy je subskrybentom (np. unieważnianie cache). Po ROLLBACK
+zebrane zmiany są porzucane.
+"""
+from collections import defaultdict
+
+from sqlalchemy import event, inspect
+
+_INFO_KEY = 'pending_changes'
+
+
+class Changes:
+    """Zmiany z jednej transakcji.
+
+    ``tables`` - wszystkie zmienione tabele, ``rows`` - klucze główne
+    zmienionych wierszy per tabela, ``whole_tables`` - tabele zmienione
+    instrukcją UPDATE/DELETE bez znanej listy wierszy.
+    """
+
+    def __init__(self):
+        self.tables = set()
+        self.rows = defaultdict(set)
+        self.whole_tables = set()
+
+    def __bool__(self):
+        return bool(self.tables)
+
+
+class ChangeTracker:
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Rejestruje ``callback(changes)`` wywoływany po każdym COMMIT ze zmianami."""
+        self._subscribers.append(callback)
+        return callback
+
+    def install(self, session_target):
+        """Podpina zdarzenia pod sesję (``scoped_session``, ``sessionmaker`` lub klasę)."""
+        event.listen(session_target, 'after_flush', self._after_flush)
+        event.listen(session_target, 'do_orm_execute', self._do_orm_execute)
+        event.listen(session_target, 'after_commit', self._after_commit)
+        event.listen(session_target, 'after_rollback', self._after_rollback)
+
+    def notify(self, changes):
+        """Przekazuje subskrybentom zmiany wykonane poza sesją (np. Core)."""
+        if changes:
+            for callback in self._subscribers:
+                callback(changes)
+
+    @staticmethod
+    def _pending(session):
+        return session.info.setdefault(_INFO_KEY, Changes())
+
+    def _after_flush(self, session, flush_context):
+        changes = self._pending(session)
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            state = inspect(obj)
+            table = state.mapper.local_table.name
+            changes.tables.add(table)
+            changes.rows[table].add(state.mapper.primary_key_from_instance(obj)[0])
+
+    def _do_orm_execute(self, orm_execute_state):
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update
+                or orm_execute_state.is_delete):
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is None:
+            return
+        changes = self._pending(orm_execute_state.session)
+        table = mapper.local_table.name
+        changes.tables.add(table)
+        # Wywołujący może podać zmieniane klucze (execution option
+        # ``changed_rows``) - wtedy unieważniamy tylko te wiersze
+        changed_rows = orm_execute_state.execution_options.get('changed_rows')
+        if changed_rows is not None:
+            changes.rows[table].update(changed_rows)
+        # INSERT nie zmienia istniejących wierszy, więc nie unieważnia encji
+        elif not orm_execute_state.is_insert:
+            changes.whole_tables.add(table)
+
+    def _after_commit(self, session):
+        self.notify(session.info.pop(_INFO_KEY, None))
+
+    def _after_rollback(self, session):
+        session.info.pop(_INFO_KEY, None)
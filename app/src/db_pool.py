@@ -0,0 +1,171 @@
+"""Konfiguracja puli połączeń ze zmiennych środowiskowych i jej metryki.
+
+Zmienne (obok ``DATABASE_URL``):
+
+- ``DB_POOL_SIZE`` - stałe połączenia w puli (domyślnie 5)
+- ``DB_MAX_OVERFLOW`` - dodatkowe połączenia ponad pulę (domyślnie 10)
+- ``DB_POOL_TIMEOUT`` - ile sekund czekać na wolne połączenie (domyślnie 30)
+- ``DB_POOL_RECYCLE`` - wiek połączenia w sekundach, po którym jest
+  odnawiane; -1 wyłącza (domyślnie 1800)
+- ``DB_POOL_PRE_PING`` - sprawdzanie połączenia przed użyciem (domyślnie tak)
+- ``DB_STATEMENT_TIMEOUT_MS`` - ``statement_timeout`` w PostgreSQL (domyślnie brak)
+
+SQLite używa własnych pul SQLAlchemy, więc tam opcji nie ustawiamy.
+Wariant asynchroniczny (``src.asgi``) czyta te same zmienne.
+"""
+import bisect
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class WaitHistogram:
+    """Histogram czasu oczekiwania na połączenie z puli (kubełki skumulowane)."""
+
+    def __init__(self, buckets=WAIT_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.timeouts = 0
+
+    def observe(self, seconds):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+            self.max = max(self.max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def to_dict(self):
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip((*self.buckets, float('inf')), self._counts):
+                cumulative += count
+                buckets['+Inf' if bound == float('inf') else str(bound)] = cumulative
+            return {
+                "buckets": buckets,
+                "count": self.count,
+                "sum": round(self.sum, 6),
+                "max": round(self.max, 6),
+                "timeouts": self.timeouts,
+            }
+
+
+class _TimedCheckout:
+    """Domieszka do puli mierząca, jak długo czekano na połączenie.
+
+    Histogram należy do puli (jeden na silnik - główny, repliki), a
+    ``recreate()`` (``engine.dispose()``, fork workera) przenosi go do nowej.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_waits = WaitHistogram()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkout_waits = self.checkout_waits
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_waits.record_timeout()
+            raise
+        finally:
+            self.checkout_waits.observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool mierzący, jak długo wątek czekał na połączenie."""
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """To samo dla silnika asynchronicznego (czeka korutyna, nie wątek)."""
+
+
+def _env_bool(environ, name, default):
+    value = environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options(database_url, environ=os.environ):
+    """Opcje ``create_engine`` dla ``SQLALCHEMY_ENGINE_OPTIONS``."""
+    if database_url.startswith('sqlite'):
+        return {}
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': int(environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(environ.get('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': _env_bool(environ, 'DB_POOL_PRE_PING', True),
+    }
+    statement_timeout = environ.get('DB_STATEMENT_TIMEOUT_MS')
+    if statement_timeout and database_url.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={int(statement_timeout)}'}
+    return options
+
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_database_url(database_url):
+    """``DATABASE_URL`` przepisany na sterownik asynchroniczny (asyncpg, aiosqlite)."""
+    scheme, sep, rest = database_url.partition('://')
+    dialect = scheme.split('+')[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver configured for {dialect!r}")
+    return ASYNC_DRIVERS[dialect] + sep + rest
+
+
+def async_engine_options(database_url, environ=os.environ):
+    """Opcje ``create_async_engine`` - te same zmienne co ``engine_options``."""
+    options = engine_options(database_url, environ)
+    if not options:
+        return options
+    options['poolclass'] = TimedAsyncQueuePool
+    statement_timeout = environ.get('DB_STATEMENT_TIMEOUT_MS')
+    if statement_timeout and database_url.startswith('postgresql'):
+        # asyncpg nie zna libpq-owego "options", ustawienia idą przez server_settings
+        options['connect_args'] = {
+            'server_settings': {'statement_timeout': str(int(statement_timeout))}
+        }
+    return options
+
+
+def pool_stats(engine):
+    """Stan puli: zajęte połączenia, przepełnienie i histogram oczekiwania.
+
+    Histogram jest tylko dla pul ``TimedQueuePool`` (na SQLite - None).
+    """
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    waits = getattr(pool, 'checkout_waits', None)
+    stats["checkout_wait_seconds"] = waits.to_dict() if waits is not None else None
+    return stats
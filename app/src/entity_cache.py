@@ -0,0 +1,226 @@
+"""Cache encji (read-through) kluczowany przez (model, id).
+
+Domyślnie to LRU w procesie z TTL i limitem rozmiaru; z backendem
+współdzielonym między procesami (np. Redis) cache jest tylko tam.
+Unieważnienie po COMMIT dociera tylko do LRU procesu, który zapisywał -
+pozostałe workery gunicorna oddają starą encję aż do końca TTL, dlatego
+domyślny TTL to 1 s. Dłuższy TTL przy kilku workerach - tylko z Redisem
+(``ENTITY_CACHE_REDIS_URL``).
+Przechowujemy zserializowane słowniki (``to_dict()``), nie obiekty ORM.
+
+Unieważnianie całego modelu (np. po ``UPDATE ... WHERE``) nie przegląda
+kluczy - podbija numer generacji modelu, który jest częścią klucza.
+Wynik ``loader()`` nie trafia do cache, jeśli w trakcie ładowania model
+został unieważniony. Unieważnienie pojedynczej encji w innym procesie
+w tym samym momencie może zostawić starą wartość w backendzie
+współdzielonym - najdłużej na ``shared_ttl``.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # potrzebny tylko dla współdzielonego backendu
+    redis = None
+
+MISS = object()
+
+
+class LocalCache:
+    """LRU w pamięci procesu z TTL; liczy trafienia, chybienia i wyparcia."""
+
+    def __init__(self, max_entries=10000, ttl=1.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return MISS
+            expires_at, value = item
+            if expires_at < self.clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISS
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MemoryBackend:
+    """Lokalny zamiennik współdzielonego backendu (testy, pojedynczy proces)."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+class RedisBackend:
+    """Współdzielony backend na Redisie (wymaga pakietu ``redis``)."""
+
+    def __init__(self, url, prefix='entity:'):
+        if redis is None:
+            raise RuntimeError("the 'redis' package is required for ENTITY_CACHE_REDIS_URL")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+
+class EntityCache:
+    """Cache encji: LRU w procesie albo - gdy jest ``shared`` - tylko backend współdzielony.
+
+    Przy współdzielonym backendzie nie ma poziomu lokalnego: unieważnienie
+    w innym workerze (usunięcie klucza, nowa generacja) nie dociera do
+    pamięci tego procesu, więc lokalna kopia byłaby nieaktualna do TTL.
+    """
+
+    def __init__(self, local, shared=None, shared_ttl=300):
+        self.local = local
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self._generations = {}
+        self._changes = {}  # model -> licznik unieważnień w tym procesie
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.stale_loads = 0
+        self.invalidations = 0
+
+    def _generation(self, model):
+        if self.shared is not None:
+            return int(self.shared.get(f"gen:{model}") or 0)
+        return self._generations.get(model, 0)
+
+    def _key(self, model, entity_id, generation=None):
+        if generation is None:
+            generation = self._generation(model)
+        return f"{model}:{generation}:{entity_id}"
+
+    def _snapshot(self, model):
+        return self._generation(model), self._changes.get(model, 0)
+
+    def get(self, model, entity_id, loader, store=True):
+        """Zwraca słownik encji; przy chybieniu woła ``loader()`` (None = brak).
+
+        ``store=False`` - wynik ``loader()`` nie trafia do cache (np. odczyt z repliki).
+        """
+        # Generację czytamy przed zapytaniem - COMMIT w trakcie ładowania
+        # (nowa generacja albo unieważnienie encji) pomija zapis do cache
+        before = self._snapshot(model)
+        generation = before[0]
+        if self.shared is not None:
+            key = self._key(model, entity_id, generation)
+            raw = self.shared.get(key)
+            if raw is not None:
+                self.shared_hits += 1
+                return json.loads(raw)
+            self.shared_misses += 1
+        else:
+            local_key = (model, generation, entity_id)
+            value = self.local.get(local_key)
+            if value is not MISS:
+                return value
+
+        value = loader()
+        if value is None or not store:
+            return value
+        if self._snapshot(model) != before:
+            self.stale_loads += 1
+        elif self.shared is not None:
+            self.shared.set(key, json.dumps(value), self.shared_ttl)
+        else:
+            self.local.set(local_key, value)
+        return value
+
+    def invalidate(self, model, entity_id):
+        self.invalidations += 1
+        self._changes[model] = self._changes.get(model, 0) + 1
+        if self.shared is not None:
+            self.shared.delete(self._key(model, entity_id))
+        else:
+            self.local.delete((model, self._generations.get(model, 0), entity_id))
+
+    def invalidate_model(self, model):
+        self.invalidations += 1
+        self._changes[model] = self._changes.get(model, 0) + 1
+        self._generations[model] = self._generations.get(model, 0) + 1
+        if self.shared is not None:
+            self.shared.incr(f"gen:{model}")
+
+    def on_commit(self, changes):
+        """Subskrybent ``ChangeTracker``: unieważnia zmienione encje."""
+        for table in changes.whole_tables:
+            self.invalidate_model(table)
+        for table, ids in changes.rows.items():
+            if table not in changes.whole_tables:
+                for entity_id in ids:
+                    self.invalidate(table, entity_id)
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self.local),
+            "max_entries": self.local.max_entries,
+            "ttl": self.local.ttl,
+            "hits": self.local.hits,
+            "misses": self.local.misses,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "shared_backend": type(self.shared).__name__ if self.shared is not None else None,
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "stale_loads": self.stale_loads,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,13 @@
+class ApiError(Exception):
+    """Błąd zwracany klientowi jako JSON {"error": ...} z podanym kodem HTTP."""
+
+    status_code = 400
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.message = message
+        if status_code is not None:
+            self.status_code = status_code
+
+    def to_dict(self):
+        return {"error": self.message}
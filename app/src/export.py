@@ -0,0 +1,134 @@
+"""Strumieniowy eksport tabel do CSV, NDJSON i JSON (opcjonalnie gzip).
+
+Wiersze są czytane kursorem po stronie serwera (``stream_results`` +
+``yield_per``) jako zwykłe krotki, bez obiektów ORM, i kodowane kawałek po
+kawałku - pamięć jest stała niezależnie od rozmiaru tabeli. Ten sam silnik
+obsługuje pliki z seedera i endpointy ``/<zasób>/export.<format>``.
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from itertools import islice
+
+from sqlalchemy import select
+
+from src.streaming import json_array_chunks, ndjson_chunks
+
+EXPORT_BATCH_SIZE = 5000
+FORMATS = ('csv', 'ndjson', 'json')
+MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+    'gzip': 'application/gzip',
+}
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def iter_table_rows(executor, table, batch_size=EXPORT_BATCH_SIZE):
+    """Iteruje po wierszach tabeli w kolejności ID.
+
+    ``executor`` to sesja albo połączenie - cokolwiek z metodą ``execute``.
+    """
+    statement = select(*table.columns).order_by(table.primary_key.columns.values()[0]) \
+        .execution_options(stream_results=True, yield_per=batch_size)
+    return executor.execute(statement)
+
+
+def csv_chunks(rows, header, batch_size=EXPORT_BATCH_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_rows(rows, columns, fmt, header=None, dumps=_dumps,
+                batch_size=EXPORT_BATCH_SIZE):
+    """Zamienia krotki na kawałki tekstu w danym formacie."""
+    if fmt == 'csv':
+        return csv_chunks(rows, header or columns, batch_size)
+
+    def dump_row(row):
+        return dumps(dict(zip(columns, row)))
+
+    if fmt == 'ndjson':
+        return ndjson_chunks(rows, dump_row, batch_size)
+    if fmt == 'json':
+        return json_array_chunks(rows, dump_row, batch_size)
+    raise ValueError(f"unsupported export format: {fmt}")
+
+
+def gzip_chunks(chunks):
+    """Kompresuje strumień tekstu do formatu gzip (również strumieniowo)."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _byte_chunks(rows, columns, fmt, compress, header, dumps, batch_size):
+    chunks = encode_rows(rows, columns, fmt, header, dumps, batch_size)
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
+
+
+def export_chunks(executor, table, fmt, compress=False, header=None, dumps=_dumps,
+                  batch_size=EXPORT_BATCH_SIZE):
+    """Kawałki (bajty) eksportu całej tabeli, np. do odpowiedzi HTTP."""
+    rows = iter_table_rows(executor, table, batch_size)
+    return _byte_chunks(rows, [c.name for c in table.columns], fmt, compress,
+                        header, dumps, batch_size)
+
+
+def _write_file(path, chunks):
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+def export_to_files(executor, table, fmt, directory, basename=None, compress=False,
+                    rows_per_file=None, header=None, batch_size=EXPORT_BATCH_SIZE):
+    """Eksportuje tabelę do pliku albo serii plików po ``rows_per_file`` wierszy.
+
+    Zwraca listę ścieżek zapisanych plików.
+    """
+    basename = basename or table.name
+    extension = fmt + ('.gz' if compress else '')
+    columns = [c.name for c in table.columns]
+    os.makedirs(directory, exist_ok=True)
+
+    def file_chunks(rows):
+        return _byte_chunks(rows, columns, fmt, compress, header, _dumps, batch_size)
+
+    rows = iter(iter_table_rows(executor, table, batch_size))
+    if not rows_per_file:
+        path = os.path.join(directory, f"{basename}.{extension}")
+        _write_file(path, file_chunks(rows))
+        return [path]
+
+    paths = []
+    while True:
+        part = list(islice(rows, 1))
+        if not part and paths:
+            break
+        path = os.path.join(directory, f"{basename}-{len(paths) + 1:05d}.{extension}")
+        part_rows = (row for chunk in (part, islice(rows, rows_per_file - 1)) for row in chunk)
+        _write_file(path, file_chunks(part_rows))
+        paths.append(path)
+        if not part:
+            break
+    return paths
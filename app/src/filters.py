@@ -0,0 +1,80 @@
+"""Parsowanie filtrów z query stringa na warunki SQL."""
+from src.errors import ApiError
+
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('0', 'false', 'no')
+
+
+def int_arg(args, name):
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f"{name} must be an integer")
+
+
+def bool_arg(args, name):
+    value = args.get(name)
+    if value is None:
+        return None
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ApiError(f"{name} must be true or false")
+
+
+def include_arg(args, allowed):
+    """Zbiór relacji z ``?include=a,b``; nieznana nazwa to błąd klienta."""
+    value = args.get('include')
+    if not value:
+        return set()
+    include = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = include - set(allowed)
+    if unknown:
+        raise ApiError(f"cannot include: {', '.join(sorted(unknown))}")
+    return include
+
+
+def fields_arg(args, model):
+    """Pola z ``?fields=id,name`` w kolejności ``model.FIELDS``; None = wszystkie."""
+    value = args.get('fields')
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested - set(model.FIELDS)
+    if unknown:
+        raise ApiError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in model.FIELDS if name in requested) or None
+
+
+def narrow(data, fields):
+    """Zawęża słownik encji do ``fields`` (None = bez zmian)."""
+    if fields is None:
+        return data
+    return {name: data[name] for name in fields}
+
+
+def task_filters(model, args):
+    """Warunki dla ``?user_id=&completed=&title_prefix=`` na liście zadań.
+
+    Kształt warunków pasuje do indeksów na ``tasks``: (user_id, completed, id),
+    częściowego indeksu otwartych zadań i indeksu wzorca na ``title``.
+    """
+    criteria = []
+
+    user_id = int_arg(args, 'user_id')
+    if user_id is not None:
+        criteria.append(model.user_id == user_id)
+
+    completed = bool_arg(args, 'completed')
+    if completed is not None:
+        criteria.append(model.completed == completed)
+
+    title_prefix = args.get('title_prefix')
+    if title_prefix:
+        criteria.append(model.title.startswith(title_prefix, autoescape=True))
+
+    return criteria
@@ -0,0 +1,133 @@
+"""Grupowy zapis (write-behind) dla wielu równoległych INSERT-ów.
+
+Żądania nie wykonują własnego COMMIT - wkładają wiersz do kolejki procesu
+i czekają na ``Future``. Wątek zapisujący zbiera wiersze przez najwyżej
+``max_delay`` sekund albo do ``max_rows`` i zapisuje je jednym
+wielowierszowym INSERT w jednej transakcji. Każdy wywołujący dostaje swoje
+ID albo własny błąd (zapis partii z podziałem na SAVEPOINT-y przy
+konflikcie, patrz ``bulk.insert_rows``).
+
+Wiersz, którego ``Future`` anulowano przed zapisem partii (wywołujący
+przestał czekać), jest pomijany.
+
+``close()`` (wołane przez ``atexit`` przy łagodnym wyjściu workera)
+zapisuje to, co zostało w kolejce. Wiersze zgłoszone po zamknięciu są
+zapisywane od razu, pojedynczo, w wątku wywołującego.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class GroupCommitter:
+    """Kolejka wierszy zapisywanych partiami przez ``flush(rows) -> [ID albo wyjątek]``."""
+
+    def __init__(self, flush, max_rows=500, max_delay=0.005):
+        self.flush = flush
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        """Uruchamia wątek zapisujący w bieżącym procesie (także po fork())."""
+        with self._lock:
+            if self._pid == os.getpid() and (self._closed or self._thread.is_alive()):
+                return
+            self._pid = os.getpid()
+            self._closed = False
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+            self._thread.start()
+
+    def submit(self, row):
+        """Dodaje wiersz do kolejki; wynik (ID) albo wyjątek przychodzi przez ``Future``."""
+        self.start()
+        future = Future()
+        # Pod blokadą: wiersz trafia do kolejki przed znacznikiem końca z close()
+        with self._lock:
+            queued = not self._closed
+            if queued:
+                self._queue.put((row, future))
+        if not queued:
+            self._write([(row, future)])
+        return future
+
+    def close(self, timeout=None):
+        """Zapisuje wszystko, co już w kolejce, i zatrzymuje wątek."""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _collect(self):
+        """Czeka na pierwszy wiersz, potem dobiera do ``max_rows`` przez ``max_delay``."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch, deadline = [first], time.monotonic() + self.max_delay
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 \
+                    else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                self._write(batch)
+        # Wiersze dodane tuż przed zamknięciem
+        rest = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                rest.append(item)
+        if rest:
+            self._write(rest)
+
+    def _write(self, batch):
+        # Wywołujący, który przestał czekać (timeout), anulował swój Future -
+        # taki wiersz nie może już trafić do bazy
+        batch = [(row, future) for row, future in batch
+                 if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self.flush([row for row, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "rows": self.rows,
+            "max_rows": self.max_rows,
+            "max_delay_ms": self.max_delay * 1000,
+        }
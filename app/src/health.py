@@ -0,0 +1,84 @@
+"""Sondy liveness/readiness bez zapytania do bazy w każdym żądaniu.
+
+``/livez`` nie wykonuje żadnego I/O - odpowiada, dopóki proces obsługuje
+żądania. ``/readyz`` zwraca ostatni wynik sprawdzenia bazy wykonywanego
+w tle co ``interval`` sekund, więc częste odpytywanie przez Dockera,
+nginx czy orkiestrator nie zabiera połączeń z puli ruchowi aplikacji.
+
+Wątek sondy startuje leniwie przy pierwszym odczycie statusu i jest
+uruchamiany ponownie po fork() (gunicorn z preload), bo wątki nie
+przechodzą do procesu potomnego. Zanim wątek zapisze pierwszy wynik,
+pierwsze ``status()`` w procesie sprawdza bazę samo - świeży worker
+(start, ``max_requests``) nie odpowiada 503 tylko dlatego, że jeszcze
+nie zdążył.
+"""
+import os
+import threading
+import time
+
+
+class ReadinessProbe:
+    """Okresowo wywołuje ``check()`` i zapamiętuje wynik.
+
+    ``check`` zwraca słownik szczegółów (np. statystyki puli) albo rzuca
+    wyjątek. Wynik starszy niż ``stale_after`` sekund oznacza brak
+    gotowości - np. gdy sprawdzenie zawisło na blokadzie w bazie.
+    """
+
+    def __init__(self, check=None, interval=5.0, stale_after=15.0, clock=time.monotonic):
+        self.check = check
+        self.interval = interval
+        self.stale_after = stale_after
+        self.clock = clock
+        self._result = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def refresh(self):
+        """Jedno sprawdzenie; wynik trafia do ``status()``."""
+        started = time.perf_counter()
+        try:
+            details = self.check() or {}
+            result = {"ready": True, **details}
+        except Exception as e:
+            result = {"ready": False, "error": f"{type(e).__name__}: {e}"}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        with self._lock:
+            self._result = (self.clock(), result)
+        return result
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Uruchamia wątek sondy, jeśli w tym procesie jeszcze nie działa."""
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='readiness-probe',
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        """Ostatni wynik z wiekiem; nieaktualny -> niegotowy."""
+        self.start()
+        with self._lock:
+            pending = self._result is None
+        if pending:
+            self.refresh()  # pierwszy odczyt w procesie - bez czekania na wątek
+        with self._lock:
+            checked_at, result = self._result
+        age = self.clock() - checked_at
+        status = {**result, "age_seconds": round(age, 3)}
+        if age > self.stale_after:
+            status.update(ready=False, error="last check is stale")
+        return status
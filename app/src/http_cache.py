@@ -0,0 +1,144 @@
+"""Warunkowe GET (ETag / If-None-Match) i cache zserializowanych odpowiedzi.
+
+Każda tabela ma licznik wersji podbijany po COMMIT zmieniającym tę tabelę
+(patrz ``change_tracking``). Wpis w cache jest ważny, dopóki wersja tabeli
+się nie zmieni i nie minie ``ttl`` sekund. TTL ogranicza nieaktualność
+przy wielu procesach - zapis w innym workerze nie podbije naszego licznika.
+
+ETag jest skrótem treści odpowiedzi, więc jest silny i taki sam we
+wszystkich procesach. Trafienie w cache (w tym odpowiedź 304) nie
+wykonuje żadnego zapytania do bazy.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from flask import Response, request
+
+from src.replicas import cache_allowed, cache_fill_allowed
+from src.streaming import stream_mode
+
+CACHED_HEADERS = ('Link', 'X-Next-Cursor')
+
+CacheEntry = namedtuple('CacheEntry', 'version etag body mimetype headers stored_at')
+
+
+class TableVersions:
+    """Licznik wersji per tabela (w obrębie procesu)."""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, table):
+        return self._versions.get(table, 0)
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+
+class ResponseCache:
+    """Cache LRU gotowych odpowiedzi, ograniczony liczbą wpisów i TTL."""
+
+    def __init__(self, versions, max_entries=1024, ttl=10.0, max_body_bytes=1024 * 1024):
+        self.versions = versions
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_body_bytes = max_body_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, table, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != self.versions.get(table) \
+                    or time.monotonic() - entry.stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        if len(entry.body) > self.max_body_bytes:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def make_etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _respond(entry):
+    if request.if_none_match.contains(entry.etag.strip('"')):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype=entry.mimetype)
+        response.headers.update(entry.headers)
+    response.headers['ETag'] = entry.etag
+    response.headers['Cache-Control'] = 'no-cache'
+    # Ten sam URL z innym Accept to inna reprezentacja (NDJSON)
+    response.vary.add('Accept')
+    return response
+
+
+def cached_response(get_cache, table):
+    """Dekorator widoku: GET obsługiwany z cache, z ETag i odpowiedzią 304.
+
+    ``get_cache()`` zwraca ``ResponseCache`` bieżącej aplikacji.
+
+    Cache'owane są tylko zwykłe odpowiedzi 200; żądania strumieniowe
+    (``Accept: application/x-ndjson``, ``?stream=1``) i przypięte do bazy
+    głównej omijają cache w obie strony, a odpowiedzi z repliki nie są
+    zapisywane. Klucz to ścieżka z query stringiem.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or stream_mode(request) is not None \
+                    or not cache_allowed():
+                return view(*args, **kwargs)
+
+            cache = get_cache()
+            key = request.full_path
+            entry = cache.get(table, key)
+            if entry is not None:
+                return _respond(entry)
+
+            # Wersję czytamy przed zapytaniem - zapis w trakcie unieważni wpis
+            version = cache.versions.get(table)
+            response = view(*args, **kwargs)
+            if isinstance(response, tuple) or not isinstance(response, Response) \
+                    or response.status_code != 200 or response.is_streamed \
+                    or not cache_fill_allowed():
+                return response
+
+            body = response.get_data()
+            entry = CacheEntry(
+                version=version,
+                etag=make_etag(body),
+                body=body,
+                mimetype=response.mimetype,
+                headers={h: response.headers[h] for h in CACHED_HEADERS if h in response.headers},
+                stored_at=time.monotonic()
+            )
+            cache.put(key, entry)
+            return _respond(entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,78 @@
+"""Atomowa rezerwacja stanu magazynowego produktów.
+
+Każda rezerwacja to jedno warunkowe ``UPDATE ... SET stock = stock - n
+WHERE stock >= n RETURNING`` - baza sama rozstrzyga wyścig między
+równoległymi zamówieniami, bez odczytu i blokad po stronie aplikacji.
+Rezerwacja wielu produktów to również jedna instrukcja (``CASE`` po ID);
+jeśli którykolwiek produkt nie ma wystarczającego stanu, cała transakcja
+jest wycofywana.
+"""
+from sqlalchemy import case, select, update
+
+from src.errors import ApiError
+from src.models import Product
+
+MAX_RESERVATION_ITEMS = 1000
+
+
+def quantity_arg(value, name='quantity'):
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise ApiError(f"{name} must be a positive integer")
+    return value
+
+
+def parse_reservations(data):
+    """``{"items": [{"product_id": 1, "quantity": 2}, ...]}`` -> {id: ilość}.
+
+    Powtórzone produkty są sumowane.
+    """
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ApiError("expected a non-empty 'items' list")
+    if len(items) > MAX_RESERVATION_ITEMS:
+        raise ApiError(f"too many items (max {MAX_RESERVATION_ITEMS})", 413)
+
+    quantities = {}
+    for item in items:
+        if not isinstance(item, dict):
+            raise ApiError("each item must be an object")
+        product_id = quantity_arg(item.get('product_id'), 'product_id')
+        quantities[product_id] = quantities.get(product_id, 0) + quantity_arg(item.get('quantity'))
+    return quantities
+
+
+def reserve(session, quantities):
+    """Zdejmuje ``quantities`` ({id: ilość}) ze stanu wszystkich produktów albo żadnego.
+
+    Zwraca (lista zarezerwowanych ``{product_id, quantity, stock}``, lista
+    nieudanych ``{product_id, error}``). Przy niepowodzeniu transakcja jest
+    wycofana i pierwsza lista jest pusta.
+    """
+    ids = sorted(quantities)
+    amount = case(quantities, value=Product.id) if len(ids) > 1 else quantities[ids[0]]
+    statement = (
+        update(Product)
+        .where(Product.id.in_(ids), Product.stock >= amount)
+        .values(stock=Product.stock - amount)
+        .returning(Product.id, Product.stock)
+        .execution_options(synchronize_session=False, changed_rows=ids)
+    )
+    remaining = dict(session.execute(statement).all())
+
+    if len(remaining) == len(ids):
+        session.commit()
+        return [{"product_id": product_id, "quantity": quantities[product_id],
+                 "stock": remaining[product_id]} for product_id in ids], []
+
+    session.rollback()
+    existing = dict(session.execute(
+        select(Product.id, Product.stock).where(Product.id.in_(ids))
+    ).all())
+    failed = []
+    for product_id in ids:
+        if product_id not in existing:
+            failed.append({"product_id": product_id, "error": "product not found"})
+        elif product_id not in remaining:
+            failed.append({"product_id": product_id, "error": "insufficient stock",
+                           "available": existing[product_id]})
+    return [], failed
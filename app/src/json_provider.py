@@ -0,0 +1,50 @@
+"""Szybki dostawca JSON dla Flaska oparty na ``orjson``.
+
+Wybór przez ``JSON_PROVIDER`` w konfiguracji: ``orjson`` (domyślnie, jeśli
+pakiet jest zainstalowany) albo ``default`` (standardowy ``json``).
+``orjson`` koduje od razu do bajtów, więc ``jsonify`` nie przechodzi przez
+pośredni ``str``. Klucze nie są sortowane - kolejność pól wynika z
+kolejności kolumn.
+"""
+from flask.json.provider import DefaultJSONProvider, JSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # opcjonalna zależność - bez niej zostaje standardowy json
+    orjson = None
+
+
+class OrjsonProvider(JSONProvider):
+    mimetype = 'application/json'
+
+    def _option(self):
+        option = orjson.OPT_NON_STR_KEYS
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self._option()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self._option()), mimetype=self.mimetype
+        )
+
+
+PROVIDERS = {'default': DefaultJSONProvider, 'orjson': OrjsonProvider}
+
+
+def init_app(app):
+    """Ustawia ``app.json`` według ``JSON_PROVIDER``."""
+    name = app.config['JSON_PROVIDER']
+    if name not in PROVIDERS:
+        raise ValueError(f"unknown JSON_PROVIDER: {name!r}")
+    if name == 'orjson' and orjson is None:
+        app.logger.warning("orjson is not installed, using the default JSON provider")
+        name = 'default'
+    app.json = PROVIDERS[name](app)
@@ -0,0 +1,100 @@
+"""Metryki w formacie Prometheusa: żądania HTTP i czas bazy per endpoint.
+
+Żądania są mierzone hookami Flaska, zapytania - zdarzeniami silnika
+SQLAlchemy (``before/after_cursor_execute``) przypisanymi do bieżącego
+żądania. Etykieta ``endpoint`` to nazwa widoku (np. ``users``,
+``get_user``), nie ścieżka, więc liczba serii nie rośnie z ID w URL.
+
+Przy wielu procesach (gunicorn) ``PROMETHEUS_MULTIPROC_DIR`` musi być
+ustawiony przed importem ``prometheus_client`` - robi to ``src.server``.
+Każdy worker zapisuje wtedy wartości do plików w tym katalogu, a
+``/metrics`` w dowolnym workerze zwraca sumę ze wszystkich procesów.
+"""
+import os
+import time
+
+from flask import g, has_request_context, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Histogram, generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency', ['endpoint', 'method']
+)
+REQUESTS = Counter(
+    'http_requests_total', 'Requests by status code', ['endpoint', 'method', 'status']
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size (non-streamed responses)',
+    ['endpoint'], buckets=SIZE_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'db_queries_per_request', 'SQL statements executed per request',
+    ['endpoint'], buckets=QUERY_COUNT_BUCKETS
+)
+DB_TIME = Histogram(
+    'db_time_per_request_seconds', 'Time spent in SQL statements per request', ['endpoint']
+)
+
+
+def endpoint_label():
+    """Nazwa widoku bez prefiksu blueprintu; 'unmatched' dla 404 z routingu."""
+    if request.endpoint is None:
+        return 'unmatched'
+    return request.endpoint.rsplit('.', 1)[-1]
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_db_time = 0.0
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    endpoint = endpoint_label()
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+    REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    if not response.is_streamed:
+        RESPONSE_SIZE.labels(endpoint).observe(response.calculate_content_length() or 0)
+    # Zapytania wykonane w trakcie strumieniowania po tym punkcie nie są liczone
+    DB_QUERIES.labels(endpoint).observe(g.metrics_queries)
+    DB_TIME.labels(endpoint).observe(g.metrics_db_time)
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and has_request_context():
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'metrics_started', None)
+    if started is not None and has_request_context() and 'metrics_started' in g:
+        g.metrics_queries += 1
+        g.metrics_db_time += time.perf_counter() - started
+
+
+def init_app(app):
+    """Podpina hooki żądań do aplikacji i zdarzenia do wszystkich silników."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def metrics_payload():
+    """(treść, content type) ekspozycji - zsumowanej z procesów w trybie multiprocess."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,137 @@
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
+
+from src import stats
+from src.replicas import RoutingSession
+
+# Rozszerzenie bez aplikacji - wiązane z nią w create_app(); sesja umie
+# kierować odczyty na repliki (src/replicas.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Indeksy trigramowe pod wyszukiwanie po nazwie (src/search.py); na SQLite
+# zamiast nich są tabele FTS5 tworzone przez src.search
+event.listen(db.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+
+def trigram_index(name, column):
+    return db.Index(name, column, postgresql_using='gin',
+                    postgresql_ops={column: 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+
+
+# Model 1: Users
+class User(db.Model):
+    __tablename__ = 'users'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(100), unique=True, nullable=False)
+    tasks = db.relationship('Task', backref='user', lazy=True, order_by='Task.id')
+
+    __table_args__ = (trigram_index('ix_users_name_trgm', 'name'),)
+
+    FIELDS = ('id', 'name', 'email')
+
+    def to_dict(self, include_tasks=False, fields=None):
+        # Tylko wybrane pola - przy load_only() nie dociągamy pozostałych kolumn
+        data = {name: getattr(self, name) for name in fields or self.FIELDS}
+        if include_tasks:
+            data["tasks"] = [task.to_dict() for task in self.tasks]
+        return data
+
+
+# Model 2: Tasks
+class Task(db.Model):
+    __tablename__ = 'tasks'
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    completed = db.Column(db.Boolean, default=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+
+    # Indeksy pod filtry GET /tasks (?user_id=&completed=&title_prefix=) z
+    # sortowaniem po id dla paginacji keyset
+    __table_args__ = (
+        db.Index('ix_tasks_user_id_completed', 'user_id', 'completed', 'id'),
+        db.Index('ix_tasks_open', 'id',
+                 postgresql_where=completed == False,  # noqa: E712
+                 sqlite_where=completed == False),  # noqa: E712
+        db.Index('ix_tasks_title_prefix', 'title',
+                 postgresql_ops={'title': 'text_pattern_ops'}),
+    )
+
+    FIELDS = ('id', 'title', 'completed', 'user_id')
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "completed": self.completed,
+            "user_id": self.user_id
+        }
+
+
+# Model 3: Products
+class Product(db.Model):
+    __tablename__ = 'products'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    stock = db.Column(db.Integer, default=0)
+
+    __table_args__ = (trigram_index('ix_products_name_trgm', 'name'),)
+
+    FIELDS = ('id', 'name', 'price', 'stock')
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "price": self.price,
+            "stock": self.stock
+        }
+
+
+# Model 4: Agregaty dla /stats - utrzymywane triggerami (src/stats.py)
+class StatsTotals(db.Model):
+    __tablename__ = 'stats_totals'
+    id = db.Column(db.Integer, primary_key=True)  # wiersz licznika: 0 .. stats.SLOTS - 1
+    users = db.Column(db.BigInteger, nullable=False, default=0)
+    tasks = db.Column(db.BigInteger, nullable=False, default=0)
+    tasks_completed = db.Column(db.BigInteger, nullable=False, default=0)
+    products = db.Column(db.BigInteger, nullable=False, default=0)
+    stock_units = db.Column(db.BigInteger, nullable=False, default=0)
+    inventory_value = db.Column(db.Float, nullable=False, default=0)
+
+
+class UserTaskStats(db.Model):
+    __tablename__ = 'user_task_stats'
+    # Bez klucza obcego - TRUNCATE users (seed) nie może być blokowany
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    tasks = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+
+    FIELDS = ('user_id', 'tasks', 'completed')
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_stats(target, connection, tables=(), **kw):
+    # create_all() (testy, seed): triggery i - dla nowych tabel - stan początkowy
+    stats.install(connection)
+    if StatsTotals.__table__ in tables:
+        stats.rebuild(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _uninstall_stats(target, connection, **kw):
+    stats.uninstall(connection)
+
+
+RESOURCES = {'users': User, 'tasks': Task, 'products': Product}
+
+
+def field_columns(model, fields=None):
+    """Kolumny tabeli dla pól ``to_dict()`` (w tej samej kolejności).
+
+    Pozwala wybrać ``select(*kolumny)`` i zbudować słowniki z krotek bez
+    tworzenia obiektów ORM - wynik jest taki sam jak z ``to_dict()``.
+    """
+    return [model.__table__.c[name] for name in (fields or model.FIELDS)]
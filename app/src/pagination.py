@@ -0,0 +1,79 @@
+"""Paginacja keyset (kursorowa) po kluczu głównym.
+
+Zamiast OFFSET filtrujemy po ``id > ostatnie_id`` i sortujemy po ``id``,
+więc koszt strony jest stały niezależnie od tego, jak głęboko klient
+przewinął listę (indeks PK od razu trafia w początek strony).
+"""
+import base64
+import binascii
+import json
+from urllib.parse import urlencode
+
+from src.errors import ApiError
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(last_id):
+    """Zwraca nieprzezroczysty token kursora wskazujący za ``last_id``."""
+    raw = json.dumps({"id": last_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Odwraca ``encode_cursor``; zły token to błąd klienta (400)."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = payload['id']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ApiError("invalid cursor")
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise ApiError("invalid cursor")
+    return last_id
+
+
+def page_args(args):
+    """Parsuje ``?limit=&after=`` z query stringa -> (limit, after_id)."""
+    limit = args.get('limit', DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ApiError("limit must be an integer")
+    if limit < 1:
+        raise ApiError("limit must be positive")
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    after = args.get('after')
+    return limit, decode_cursor(after) if after else None
+
+
+def keyset_select(stmt, key_column, limit, after=None):
+    """Strona ``stmt`` po ``key_column`` - instrukcja ``select()`` bez wykonania.
+
+    Pobieramy ``limit + 1`` wierszy, żeby wiedzieć, czy istnieje kolejna
+    strona, bez osobnego COUNT(*); wynik przekazujemy do ``split_page``.
+    """
+    if after is not None:
+        stmt = stmt.where(key_column > after)
+    return stmt.order_by(key_column).limit(limit + 1)
+
+
+def split_page(rows, key_column, limit):
+    """Obcina ``limit + 1`` wierszy do strony -> (wiersze, kursor albo None)."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(getattr(rows[-1], key_column.key))
+    return rows, None
+
+
+def set_page_headers(response, base_url, args, next_cursor):
+    """Dodaje nagłówki ``X-Next-Cursor`` i ``Link: rel="next"``."""
+    if next_cursor is None:
+        return response
+    params = dict(args.items())
+    params['after'] = next_cursor
+    response.headers['X-Next-Cursor'] = next_cursor
+    response.headers['Link'] = f'<{base_url}?{urlencode(params)}>; rel="next"'
+    return response
@@ -0,0 +1,175 @@
+"""Profilowanie zapytań SQL: log wolnych zapytań, nagłówki i wykrywanie N+1.
+
+Zapytania są zbierane zdarzeniami ``before/after_cursor_execute`` do
+profilu aktywnego w bieżącym wątku. Profil można otworzyć ręcznie
+(``profiler.capture()`` - np. w testach do sprawdzania budżetu zapytań)
+albo dla każdego żądania, gdy aplikacja ma włączone ``QUERY_PROFILING``.
+Wtedy odpowiedź dostaje nagłówki ``Server-Timing`` i ``X-DB-Queries``.
+
+To samo zapytanie (identyczny tekst SQL) wykonane w jednym profilu co
+najmniej ``n_plus_one_threshold`` razy jest zgłaszane jako możliwe N+1 -
+typowo to leniwe ładowanie relacji w pętli.
+"""
+import logging
+import os
+import threading
+import time
+import traceback
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Ramki spoza tego katalogu (biblioteki) pomijamy przy szukaniu miejsca wywołania
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Query = namedtuple('Query', 'statement parameters duration call_site')
+
+
+def call_site(depth=3):
+    """Najbliższe ramki kodu aplikacji nad wywołaniem SQLAlchemy.
+
+    Np. ``src/app.py:144 list_response <- src/app.py:253 tasks``.
+    """
+    frames = []
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        if frame.filename.startswith(APP_ROOT) and frame.filename != __file__ \
+                and '/site-packages/' not in frame.filename:
+            frames.append(f"{os.path.relpath(frame.filename, APP_ROOT)}:{frame.lineno} "
+                          f"{frame.name}")
+            if len(frames) == depth:
+                break
+    return ' <- '.join(frames) or None
+
+
+class QueryProfile:
+    """Zapytania wykonane w jednym profilu (żądaniu albo bloku ``capture``)."""
+
+    def __init__(self, n_plus_one_threshold=3):
+        self.queries = []
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.started = time.perf_counter()
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(query.duration for query in self.queries)
+
+    def repeated(self):
+        """``[(statement, liczba)]`` dla zapytań powtórzonych >= progu razy."""
+        counts = Counter(query.statement for query in self.queries)
+        return [(statement, n) for statement, n in counts.most_common()
+                if n >= self.n_plus_one_threshold]
+
+    def summary(self):
+        lines = [f"{self.count} queries, {self.db_time * 1000:.2f} ms in database"]
+        for query in self.queries:
+            lines.append(f"  {query.duration * 1000:8.2f} ms  {query.call_site or '?'}  "
+                         f"{' '.join(query.statement.split())}")
+        return '\n'.join(lines)
+
+
+class QueryProfiler:
+    def __init__(self, slow_threshold_ms=100.0, n_plus_one_threshold=3):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._local = threading.local()
+        self._installed = False
+
+    def install(self):
+        """Podpina zdarzenia pod wszystkie silniki (raz na proces)."""
+        if not self._installed:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._installed = True
+
+    def _active(self):
+        return getattr(self._local, 'profiles', None)
+
+    def start(self):
+        self.install()
+        profile = QueryProfile(self.n_plus_one_threshold)
+        if self._active() is None:
+            self._local.profiles = []
+        self._local.profiles.append(profile)
+        return profile
+
+    def stop(self, profile):
+        profiles = self._active()
+        if profiles and profile in profiles:
+            profiles.remove(profile)
+
+    @contextmanager
+    def capture(self):
+        """Zbiera zapytania wykonane w bloku (w tym wątku) do ``QueryProfile``."""
+        profile = self.start()
+        try:
+            yield profile
+        finally:
+            self.stop(profile)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context,
+                               executemany):
+        if context is not None and self._active():
+            context.profile_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context,
+                              executemany):
+        started = getattr(context, 'profile_started', None)
+        profiles = self._active()
+        if started is None or not profiles:
+            return
+        duration = time.perf_counter() - started
+        query = Query(statement, parameters, duration, call_site())
+        for profile in profiles:
+            profile.queries.append(query)
+        if duration * 1000 >= self.slow_threshold_ms:
+            logger.warning("Slow query (%.1f ms) at %s: %s; parameters: %r",
+                           duration * 1000, query.call_site, ' '.join(statement.split()),
+                           parameters)
+
+
+profiler = QueryProfiler()
+
+
+def _before_request():
+    g.query_profile = profiler.start()
+
+
+def _after_request(response):
+    profile = g.get('query_profile')
+    if profile is None:
+        return response
+    total_ms = (time.perf_counter() - profile.started) * 1000
+    response.headers['X-DB-Queries'] = str(profile.count)
+    response.headers['Server-Timing'] = (
+        f'db;dur={profile.db_time * 1000:.2f};desc="{profile.count} queries", '
+        f'total;dur={total_ms:.2f}'
+    )
+    for statement, count in profile.repeated():
+        logger.warning("Possible N+1 in %s %s: %d x %s", request.method, request.path,
+                       count, ' '.join(statement.split()))
+    return response
+
+
+def _teardown_request(error=None):
+    profile = g.pop('query_profile', None)
+    if profile is not None:
+        profiler.stop(profile)
+
+
+def init_app(app):
+    """Włącza profilowanie każdego żądania, jeśli ``QUERY_PROFILING`` jest ustawione."""
+    if app.config['QUERY_PROFILING']:
+        profiler.slow_threshold_ms = app.config['QUERY_SLOW_MS']
+        profiler.n_plus_one_threshold = app.config['QUERY_N_PLUS_ONE_THRESHOLD']
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+        app.teardown_request(_teardown_request)
@@ -0,0 +1,247 @@
+"""Kierowanie odczytów GET na repliki bazy (``DATABASE_REPLICA_URLS``).
+
+Silniki replik (``replica_0``, ...) i ich stan (``ReplicaSet``) są
+trzymane w ``app.extensions['replicas']``, obok silnika głównego
+Flask-SQLAlchemy. Widok oznaczony ``@reads`` wybiera replikę po kolei (round-robin)
+i ``RoutingSession`` kieruje na nią same instrukcje SELECT - zapisy, flush
+i ``session.connection()`` zostają na bazie głównej.
+
+Replika, na której zapytanie skończyło się błędem połączenia
+(``OperationalError``), jest wyłączana na ``eject_seconds``, a żądanie jest
+powtarzane na kolejnej replice albo, gdy żadnej nie zostało, na bazie
+głównej. Po tym czasie wraca do rotacji - jeśli dalej
+nie działa, zostanie wyłączona przy pierwszym nieudanym zapytaniu.
+
+Opóźnienie replikacji: na PostgreSQL replika jest sprawdzana co
+``lag_interval`` sekund (zapytanie przy wyborze repliki) i pomijana, dopóki
+jest opóźniona o więcej niż ``max_lag`` sekund. Bez ``max_lag`` (albo na
+bazach bez tej informacji) opóźnienie nie jest ograniczane - odczyt z
+repliki może być dowolnie nieaktualny.
+
+Odczyt własnych zapisów: udany POST/PUT/PATCH/DELETE ustawia krótkotrwałe
+ciasteczko ``read_primary``; żądania z nim (albo z nagłówkiem
+``X-Read-Primary``) czytają z bazy głównej, więc klient widzi swoje zmiany
+mimo opóźnienia replikacji.
+
+Cache odpowiedzi i encji są wspólne dla wszystkich klientów. Odczyt z
+repliki napełnia je tylko przy włączonym ``max_lag`` - wpis jest wtedy
+starszy od bazy głównej najwyżej o ``max_lag + lag_interval`` sekund (plus
+TTL cache; poza PostgreSQL pomiar zawsze daje 0, więc ta granica nie jest
+sprawdzana). Bez ``max_lag`` napełniają je tylko odczyty z bazy głównej
+(``cache_fill_allowed``; ostrzeżenie w logu przy starcie i
+``fill_from_replicas`` w ``/internal/cache``). Żądania przypięte do bazy
+głównej omijają cache (``cache_allowed``).
+
+Odpowiedzi strumieniowe (``yield_per``, partie ``selectinload``) czytają
+wiersze już po powrocie z widoku, więc bind repliki zostaje w ``g`` do
+końca kontekstu żądania. Błąd repliki w trakcie strumienia nie jest
+powtarzany na bazie głównej - nagłówki są już wysłane.
+"""
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import Response, current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, create_engine, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+STICKY_COOKIE = 'read_primary'
+STICKY_HEADER = 'X-Read-Primary'
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+logger = logging.getLogger(__name__)
+
+# Sekundy od ostatniej odtworzonej transakcji; 0, gdy replika nadąża za WAL
+PG_LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def parse_urls(value):
+    """``DATABASE_REPLICA_URLS`` (rozdzielone przecinkami) -> lista URL."""
+    return [url.strip() for url in (value or '').split(',') if url.strip()]
+
+
+def replica_set(app=None):
+    """``ReplicaSet`` aplikacji albo None (aplikacja bez ``init_app``)."""
+    return (app or current_app).extensions.get('replicas')
+
+
+def replica_engines(app=None):
+    """Silniki replik aplikacji (bind -> Engine); pusty słownik bez replik."""
+    replicas = replica_set(app)
+    return replicas.engines if replicas is not None else {}
+
+
+def measure_lag(engine):
+    """Opóźnienie repliki w sekundach (tylko PostgreSQL; inne bazy - 0)."""
+    if engine.dialect.name != 'postgresql':
+        return 0.0
+    with engine.connect() as connection:
+        return float(connection.execute(text(PG_LAG_SQL)).scalar())
+
+
+def pinned_to_primary():
+    """Żądanie po własnym zapisie (ciasteczko) albo z ``X-Read-Primary``."""
+    return has_request_context() and (STICKY_COOKIE in request.cookies
+                                      or STICKY_HEADER in request.headers)
+
+
+def cache_allowed():
+    """Czy żądanie może korzystać ze wspólnego cache (nie - gdy przypięte do bazy głównej)."""
+    return not pinned_to_primary()
+
+
+def cache_fill_allowed():
+    """Czy wynik można zapisać we wspólnym cache.
+
+    Odczyt z bazy głównej - zawsze; z repliki - tylko gdy ``ReplicaSet``
+    ogranicza opóźnienie (``max_lag``).
+    """
+    if not cache_allowed():
+        return False
+    if not has_app_context() or (g.get('read_bind') is None
+                                 and not g.get('replica_read', False)):
+        return True
+    replicas = replica_set()
+    return replicas is not None and replicas.fills_cache
+
+
+def init_app(app, urls, engine_options, **options):
+    """Tworzy silniki replik (``engine_options(url)`` jak dla bazy głównej)."""
+    for engine in replica_engines(app).values():
+        engine.dispose()
+    engines = {
+        f"replica_{i}": create_engine(url, **engine_options(url))
+        for i, url in enumerate(urls)
+    }
+    replicas = app.extensions['replicas'] = ReplicaSet(engines, **options)
+    if replicas.keys and not replicas.fills_cache:
+        logger.warning("Replica lag check disabled (max_lag=%r): reads served by "
+                       "replicas will not fill the shared caches", replicas.max_lag)
+    app.after_request(mark_writer)
+    return replicas
+
+
+class RoutingSession(Session):
+    """Sesja kierująca SELECT-y widoku ``@reads`` na wybraną replikę."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        key = g.get('read_bind') if has_app_context() else None
+        if bind is None and key is not None and not self._flushing \
+                and isinstance(clause, Select):
+            engine = replica_engines().get(key)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaSet:
+    """Silniki replik jednej aplikacji: rotacja, wyłączanie po awarii, status."""
+
+    def __init__(self, engines, eject_seconds=30.0, sticky_seconds=5, max_lag=None,
+                 lag_interval=5.0, clock=time.monotonic, measure_lag=measure_lag):
+        self.engines = engines
+        self.keys = list(engines)
+        self.eject_seconds = eject_seconds
+        self.sticky_seconds = sticky_seconds
+        self.max_lag = max_lag
+        self.lag_interval = lag_interval
+        self.clock = clock
+        self.measure_lag = measure_lag
+        self._lock = threading.Lock()
+        self._next = 0
+        self._ejected = {}  # bind -> czas powrotu do rotacji
+        self._lag = {}  # bind -> (czas pomiaru, opóźnienie w sekundach)
+
+    def choose(self):
+        """Następna sprawna i nieopóźniona replika albo None (odczyt z bazy głównej)."""
+        for _ in range(len(self.keys)):
+            with self._lock:
+                key = self.keys[self._next % len(self.keys)]
+                self._next += 1
+                healthy = self._ejected.get(key, 0) <= self.clock()
+                if healthy:
+                    self._ejected.pop(key, None)
+            # Pomiar opóźnienia poza blokadą - to zapytanie do repliki
+            if healthy and not self.lagging(key):
+                return key
+        return None
+
+    @property
+    def fills_cache(self):
+        """Czy odczyty z replik mogą napełniać wspólny cache (opóźnienie ograniczone)."""
+        return bool(self.max_lag)
+
+    def lagging(self, key):
+        """Czy replika jest opóźniona ponad ``max_lag`` (pomiar co ``lag_interval``)."""
+        if not self.max_lag:
+            return False
+        now = self.clock()
+        measured = self._lag.get(key)
+        if measured is None or now - measured[0] >= self.lag_interval:
+            try:
+                measured = self._lag[key] = (now, self.measure_lag(self.engines[key]))
+            except DBAPIError:
+                self.eject(key)
+                return True
+        return measured[1] > self.max_lag
+
+    def eject(self, key):
+        with self._lock:
+            self._ejected[key] = self.clock() + self.eject_seconds
+
+    def status(self):
+        now = self.clock()
+        return {
+            key: {"healthy": self._ejected.get(key, 0) <= now,
+                  "ejected_for": round(max(self._ejected.get(key, 0) - now, 0), 1),
+                  "lag_seconds": self._lag[key][1] if key in self._lag else None}
+            for key in self.keys
+        }
+
+    def wants_replica(self):
+        return bool(self.keys) and request.method in ('GET', 'HEAD') and not pinned_to_primary()
+
+
+def reads(view):
+    """Dekorator widoku: SELECT-y na replice, przy awarii repliki - na bazie głównej."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = replica_set()
+        key = replicas.choose() if replicas is not None and replicas.wants_replica() else None
+        streamed = False
+        try:
+            while key is not None:
+                g.read_bind = key
+                try:
+                    response = view(*args, **kwargs)
+                    g.replica_read = True  # dla cache_fill_allowed() po powrocie
+                    # Strumień czyta dalej po powrocie z widoku - bind zostaje w g
+                    streamed = isinstance(response, Response) and response.is_streamed
+                    return response
+                except DBAPIError as e:
+                    if not (isinstance(e, OperationalError) or e.connection_invalidated):
+                        raise
+                    replicas.eject(key)
+                    current_app.extensions['sqlalchemy'].session.rollback()
+                    key = replicas.choose()
+            g.pop('read_bind', None)
+            return view(*args, **kwargs)
+        finally:
+            if not streamed:
+                g.pop('read_bind', None)
+    return wrapper
+
+
+def mark_writer(response):
+    """``after_request``: po udanym zapisie kolejne odczyty klienta idą na bazę główną."""
+    replicas = replica_set()
+    if replicas is not None and replicas.keys and request.method in WRITE_METHODS \
+            and response.status_code < 400:
+        response.set_cookie(STICKY_COOKIE, '1', max_age=replicas.sticky_seconds,
+                            httponly=True, samesite='Lax')
+    return response
@@ -0,0 +1,36 @@
+"""Aktualizacja schematu bazy migracjami Alembica (``python -m src.schema``).
+
+Uruchamiane przez ``migration_runner`` w docker-compose przed startem
+aplikacji. Bazy założone kiedyś przez ``db.create_all()`` nie mają tabeli
+``alembic_version`` - oznaczamy je najpierw migracją początkową, a
+kolejne migracje pomijają obiekty, które ``create_all()`` już utworzyło.
+"""
+import os
+
+from flask_migrate import stamp, upgrade
+from sqlalchemy import inspect
+
+BASELINE_REVISION = 'e0b88855f468'
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'migrations')
+
+
+def upgrade_schema(db, directory=MIGRATIONS_DIR):
+    """``flask db upgrade`` z oznaczeniem baz sprzed migracji (w kontekście aplikacji)."""
+    tables = inspect(db.engine).get_table_names()
+    if 'alembic_version' not in tables and 'users' in tables:
+        print(f"Unversioned database, stamping baseline revision {BASELINE_REVISION}")
+        stamp(directory=directory, revision=BASELINE_REVISION)
+    upgrade(directory=directory)
+
+
+def main():
+    from src.app import create_app, db
+
+    with create_app().app_context():
+        upgrade_schema(db)
+    print("Migrations completed!")
+
+
+if __name__ == "__main__":
+    main()
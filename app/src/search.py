@@ -0,0 +1,105 @@
+"""Wyszukiwanie po fragmencie nazwy (``GET /products/search?q=``, ``/users/search``).
+
+Dopasowanie jest podciągowe i bez rozróżniania wielkości liter, a każde
+zapytanie trafia w indeks trigramowy:
+
+- PostgreSQL - ``ILIKE '%q%'`` na indeksie GIN ``gin_trgm_ops`` (pg_trgm),
+  kolejność: najpierw dopasowania prefiksu, potem ``similarity()``
+- SQLite - wirtualna tabela FTS5 z tokenizerem ``trigram`` utrzymywana
+  triggerami, kolejność: prefiks, potem ``rank`` (bm25)
+
+Trigram to trzy znaki, więc krótszych fraz żaden z indeksów nie obsłuży -
+zamiast skanu całej tabeli zwracamy 400.
+"""
+from sqlalchemy import DDL, column, event, func, literal_column, select, table
+
+from src.errors import ApiError
+from src.models import Product, User, field_columns
+
+MIN_QUERY_LENGTH = 3
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Model -> przeszukiwana kolumna
+SEARCHABLE = {Product: 'name', User: 'name'}
+
+
+def fts_table(model):
+    return f"{model.__tablename__}_fts"
+
+
+def sqlite_fts_ddl(model):
+    """Instrukcje tworzące indeks FTS5 modelu wraz z triggerami (external content)."""
+    name, source = fts_table(model), model.__tablename__
+    col = SEARCHABLE[model]
+    return [
+        f"CREATE VIRTUAL TABLE {name} USING fts5("
+        f"{col}, content='{source}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER {name}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {name}(rowid, {col}) VALUES (new.id, new.{col}); END",
+        f"CREATE TRIGGER {name}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {col}) VALUES ('delete', old.id, old.{col}); END",
+        f"CREATE TRIGGER {name}_au AFTER UPDATE OF {col} ON {source} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {col}) VALUES ('delete', old.id, old.{col}); "
+        f"INSERT INTO {name}(rowid, {col}) VALUES (new.id, new.{col}); END",
+        f"INSERT INTO {name}({name}) VALUES ('rebuild')",
+    ]
+
+
+def _install_sqlite_fts(model):
+    # create_all()/drop_all() (testy, seed) - na PostgreSQL indeks GIN jest w modelu
+    for statement in sqlite_fts_ddl(model):
+        event.listen(model.__table__, 'after_create',
+                     DDL(statement).execute_if(dialect='sqlite'))
+    event.listen(model.__table__, 'before_drop',
+                 DDL(f"DROP TABLE IF EXISTS {fts_table(model)}").execute_if(dialect='sqlite'))
+
+
+for _model in SEARCHABLE:
+    _install_sqlite_fts(_model)
+
+
+def search_args(args):
+    """``?q=&limit=`` -> (fraza, limit)."""
+    query = (args.get('q') or '').strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        raise ApiError(f"q must be at least {MIN_QUERY_LENGTH} characters")
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError("limit must be an integer")
+    if limit < 1:
+        raise ApiError("limit must be positive")
+    return query, min(limit, MAX_LIMIT)
+
+
+def _like_pattern(query, prefix=False):
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"{escaped}%" if prefix else f"%{escaped}%"
+
+
+def search_select(model, query, limit, dialect, fields=None):
+    """SELECT kolumn ``fields`` dla ``limit`` najlepszych dopasowań ``query``."""
+    target = model.__table__.c[SEARCHABLE[model]]
+    prefix_first = func.lower(target).like(_like_pattern(query.lower(), prefix=True),
+                                           escape='\\').desc()
+    stmt = select(*field_columns(model, fields))
+
+    if dialect == 'postgresql':
+        return (stmt.where(target.ilike(_like_pattern(query), escape='\\'))
+                .order_by(prefix_first, func.similarity(target, query).desc(), model.id)
+                .limit(limit))
+
+    if dialect == 'sqlite':
+        fts = table(fts_table(model), column('rowid'), column('rank'))
+        # Fraza FTS5 w cudzysłowie - bez interpretacji operatorów w ``q``
+        phrase = '"' + query.replace('"', '""') + '"'
+        return (stmt.join(fts, fts.c.rowid == model.id)
+                .where(literal_column(fts_table(model)).op('MATCH')(phrase))
+                .order_by(prefix_first, fts.c.rank, model.id)
+                .limit(limit))
+
+    # Inne bazy: to samo dopasowanie bez indeksu
+    return (stmt.where(func.lower(target).like(_like_pattern(query.lower()), escape='\\'))
+            .order_by(prefix_first, model.id)
+            .limit(limit))
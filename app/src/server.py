@@ -0,0 +1,138 @@
+"""Produkcyjne uruchomienie API: gunicorn z procesami roboczymi (prefork).
+
+    python -m src.server
+
+Ustawienia ze zmiennych środowiskowych:
+
+- ``HOST`` / ``PORT`` - adres nasłuchu (domyślnie 0.0.0.0:5000)
+- ``WEB_WORKERS`` - liczba procesów (domyślnie liczba dostępnych rdzeni)
+- ``WEB_THREADS`` - wątki na proces; >1 włącza workera ``gthread``
+- ``WEB_WORKER_CLASS`` - jawna klasa workera, np. ``gevent`` dla trybu
+  asynchronicznego (wymaga zainstalowanego ``gevent``)
+- ``WEB_WORKER_CONNECTIONS`` - limit jednoczesnych klientów workera async
+- ``WEB_TIMEOUT`` / ``WEB_GRACEFUL_TIMEOUT`` / ``WEB_KEEPALIVE`` - sekundy
+- ``WEB_MAX_REQUESTS`` / ``WEB_MAX_REQUESTS_JITTER`` - okresowy restart workera
+- ``WEB_PRELOAD`` - ładowanie aplikacji w procesie głównym przed fork()
+- ``PROMETHEUS_MULTIPROC_DIR`` - katalog metryk współdzielonych przez
+  workery; domyślnie tworzony w katalogu tymczasowym i czyszczony przy starcie
+- ``WEB_MODE=asgi`` - wariant asynchroniczny (``src.asgi``) na workerach
+  uvicorn; ``WEB_THREADS`` i ``WEB_WORKER_CLASS`` są wtedy pomijane
+
+Aplikacja (a więc i silnik bazy) jest tworzona w każdym workerze po
+fork(). Przy ``WEB_PRELOAD`` pule połączeń odziedziczone po procesie
+głównym są porzucane w ``post_worker_init``. ``kill -HUP`` na procesie
+głównym przeładowuje konfigurację i łagodnie wymienia workery (bez
+preload nowe workery importują świeży kod).
+"""
+import glob
+import os
+import sys
+import tempfile
+
+from gunicorn.app.base import BaseApplication
+
+# Dodaj katalog nadrzędny do ścieżki (uruchamianie jako `python src/server.py`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def available_cpus():
+    """Rdzenie dostępne dla procesu (z uwzględnieniem cpuset kontenera)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def server_options(environ=os.environ):
+    threads = int(environ.get('WEB_THREADS', '1'))
+    worker_class = environ.get('WEB_WORKER_CLASS') or ('gthread' if threads > 1 else 'sync')
+    if environ.get('WEB_MODE') == 'asgi':
+        threads, worker_class = 1, 'uvicorn.workers.UvicornWorker'
+    return {
+        'bind': f"{environ.get('HOST', '0.0.0.0')}:{environ.get('PORT', '5000')}",
+        'workers': int(environ.get('WEB_WORKERS') or available_cpus()),
+        'threads': threads,
+        'worker_class': worker_class,
+        'worker_connections': int(environ.get('WEB_WORKER_CONNECTIONS', '1000')),
+        'timeout': int(environ.get('WEB_TIMEOUT', '30')),
+        'graceful_timeout': int(environ.get('WEB_GRACEFUL_TIMEOUT', '30')),
+        'keepalive': int(environ.get('WEB_KEEPALIVE', '5')),
+        'max_requests': int(environ.get('WEB_MAX_REQUESTS', '0')),
+        'max_requests_jitter': int(environ.get('WEB_MAX_REQUESTS_JITTER', '0')),
+        'preload_app': environ.get('WEB_PRELOAD', '').lower() in ('1', 'true', 'yes'),
+        'accesslog': '-',
+        'errorlog': '-',
+        'post_worker_init': post_worker_init,
+        'child_exit': child_exit,
+    }
+
+
+def post_worker_init(worker):
+    """Porzuca połączenia odziedziczone po procesie głównym (tryb preload).
+
+    ``close=False`` - nie zamykamy gniazd należących do rodzica, tylko
+    zapominamy o nich; worker otworzy własne połączenia.
+    """
+    from src.models import db
+    from src.replicas import replica_engines
+
+    if not hasattr(worker.wsgi, 'app_context'):
+        return  # aplikacja ASGI tworzy połączenia leniwie, już w workerze
+    with worker.wsgi.app_context():
+        for engine in (*db.engines.values(), *replica_engines().values()):
+            engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    """Zamyka pliki metryk zakończonego workera (gauge typu live*)."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def prepare_metrics_dir(environ=os.environ):
+    """Ustawia i czyści ``PROMETHEUS_MULTIPROC_DIR`` przed startem workerów.
+
+    Musi się wykonać przed pierwszym importem ``prometheus_client`` (także
+    w procesie głównym przy preload), dlatego robimy to w ``main()``.
+    """
+    directory = environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not directory:
+        directory = environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='prometheus-')
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+    # Import teraz, po ustawieniu katalogu - nie w child_exit, który gunicorn
+    # woła z obsługi sygnału (import w trakcie importu kończy się błędem)
+    import prometheus_client.multiprocess  # noqa: F401
+    return directory
+
+
+class ApiServer(BaseApplication):
+    def __init__(self, options=None, app_config=None):
+        self.options = options if options is not None else server_options()
+        self.app_config = app_config
+        self.asgi = self.options['worker_class'].startswith('uvicorn')
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        # Import dopiero tutaj: bez preload wykonuje się w workerze po fork()
+        if self.asgi:
+            from src.asgi import create_asgi_app
+            return create_asgi_app(self.app_config)
+        from src.app import create_app
+        return create_app(self.app_config)
+
+
+def main():
+    prepare_metrics_dir()
+    ApiServer().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Agregaty dla ``GET /stats`` utrzymywane przyrostowo triggerami w bazie.
+
+``stats_totals`` trzyma liczniki całych tabel i wartość magazynu
+(``SUM(price * stock)``) rozłożone na ``SLOTS`` wierszy, a
+``user_task_stats`` liczbę zadań i zakończonych zadań na użytkownika.
+Triggery poprawiają je w tej samej transakcji co zapis, więc obejmują
+każdą ścieżkę - ORM, masowe INSERT/UPDATE, rezerwacje, seed (także COPY
+i TRUNCATE) - a odczyt to suma ``SLOTS`` wierszy zamiast GROUP BY po
+całych tabelach.
+
+- PostgreSQL - triggery na poziomie instrukcji z tabelami przejściowymi:
+  jedna aktualizacja liczników na instrukcję, nie na wiersz
+- SQLite - triggery na poziomie wiersza
+
+Gdyby liczniki były w jednym wierszu, każda transakcja pisząca zadania
+albo produkty czekałaby na jego blokadę do COMMIT-u poprzedniej. Na
+PostgreSQL trigger zmienia więc wiersz ``pg_backend_pid() % SLOTS`` -
+równoległe połączenia trafiają zwykle w różne wiersze - a ``totals()``
+je sumuje. SQLite ma jednego piszącego naraz, więc używa wiersza 0.
+
+``rebuild()`` (``flask stats rebuild``) przelicza wszystko od
+zera, gdy liczniki rozjadą się z danymi (np. po ręcznych poprawkach z
+wyłączonymi triggerami).
+
+Moduł operuje na nazwach tabel w SQL - nie importuje modeli, bo sam jest
+podpinany w ``src.models``.
+"""
+from sqlalchemy import text
+
+TABLES = ('users', 'tasks', 'products')
+TOTALS = ('users', 'tasks', 'tasks_completed', 'products', 'stock_units', 'inventory_value')
+SLOTS = 16
+PG_SLOT = f"pg_backend_pid() % {SLOTS}"
+
+
+def _done(row):
+    return f"CASE WHEN {row}.completed THEN 1 ELSE 0 END"
+
+
+def _stock(row):
+    return f"COALESCE({row}.stock, 0)"
+
+
+def _value(row):
+    return f"COALESCE({row}.price * {row}.stock, 0)"
+
+
+def _sqlite_task_upsert(row, sign):
+    return (
+        f"INSERT INTO user_task_stats (user_id, tasks, completed) "
+        f"SELECT {row}.user_id, {sign}1, {sign}{_done(row)} WHERE {row}.user_id IS NOT NULL "
+        f"ON CONFLICT (user_id) DO UPDATE SET tasks = tasks + excluded.tasks, "
+        f"completed = completed + excluded.completed;"
+    )
+
+
+def sqlite_ddl():
+    task_changed = "old.completed IS NOT new.completed OR old.user_id IS NOT new.user_id"
+    product_changed = "old.price IS NOT new.price OR old.stock IS NOT new.stock"
+    triggers = {
+        'stats_users_ai': ("AFTER INSERT ON users", None,
+                           "UPDATE stats_totals SET users = users + 1 WHERE id = 0;"),
+        'stats_users_ad': ("AFTER DELETE ON users", None,
+                           "UPDATE stats_totals SET users = users - 1 WHERE id = 0;"),
+        'stats_tasks_ai': ("AFTER INSERT ON tasks", None,
+                           f"UPDATE stats_totals SET tasks = tasks + 1, "
+                           f"tasks_completed = tasks_completed + {_done('new')} WHERE id = 0; "
+                           + _sqlite_task_upsert('new', '')),
+        'stats_tasks_ad': ("AFTER DELETE ON tasks", None,
+                           f"UPDATE stats_totals SET tasks = tasks - 1, "
+                           f"tasks_completed = tasks_completed - {_done('old')} WHERE id = 0; "
+                           + _sqlite_task_upsert('old', '-')),
+        'stats_tasks_au': ("AFTER UPDATE OF completed, user_id ON tasks", task_changed,
+                           f"UPDATE stats_totals SET tasks_completed = tasks_completed "
+                           f"+ {_done('new')} - {_done('old')} WHERE id = 0; "
+                           + _sqlite_task_upsert('old', '-') + _sqlite_task_upsert('new', '')),
+        'stats_products_ai': ("AFTER INSERT ON products", None,
+                              f"UPDATE stats_totals SET products = products + 1, "
+                              f"stock_units = stock_units + {_stock('new')}, "
+                              f"inventory_value = inventory_value + {_value('new')} WHERE id = 0;"),
+        'stats_products_ad': ("AFTER DELETE ON products", None,
+                              f"UPDATE stats_totals SET products = products - 1, "
+                              f"stock_units = stock_units - {_stock('old')}, "
+                              f"inventory_value = inventory_value - {_value('old')} WHERE id = 0;"),
+        'stats_products_au': ("AFTER UPDATE OF price, stock ON products", product_changed,
+                              f"UPDATE stats_totals SET "
+                              f"stock_units = stock_units + {_stock('new')} - {_stock('old')}, "
+                              f"inventory_value = inventory_value "
+                              f"+ {_value('new')} - {_value('old')} WHERE id = 0;"),
+    }
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {name} {event} FOR EACH ROW "
+        f"{f'WHEN {when} ' if when else ''}BEGIN {body} END"
+        for name, (event, when, body) in triggers.items()
+    ]
+
+
+def _pg_delta(*parts):
+    return " UNION ALL ".join(parts)
+
+
+def _pg_function(name, branches, truncate):
+    body = "".join(
+        f"{'IF' if i == 0 else 'ELSIF'} TG_OP = '{op}' THEN {statements} "
+        for i, (op, statements) in enumerate(branches.items())
+    )
+    return (
+        f"CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        f"BEGIN {body}ELSE {truncate} END IF; RETURN NULL; END $$"
+    )
+
+
+def _pg_task_statements(delta):
+    return (
+        f"WITH delta AS ({delta}) "
+        f"UPDATE stats_totals SET tasks = stats_totals.tasks + d.tasks, "
+        f"tasks_completed = stats_totals.tasks_completed + d.completed "
+        f"FROM (SELECT COALESCE(SUM(tasks), 0) AS tasks, "
+        f"COALESCE(SUM(completed), 0) AS completed FROM delta) d "
+        f"WHERE stats_totals.id = {PG_SLOT}; "
+        f"WITH delta AS ({delta}) "
+        f"INSERT INTO user_task_stats (user_id, tasks, completed) "
+        f"SELECT user_id, SUM(tasks), SUM(completed) FROM delta WHERE user_id IS NOT NULL "
+        f"GROUP BY user_id HAVING SUM(tasks) <> 0 OR SUM(completed) <> 0 ORDER BY user_id "
+        f"ON CONFLICT (user_id) DO UPDATE SET tasks = user_task_stats.tasks + excluded.tasks, "
+        f"completed = user_task_stats.completed + excluded.completed;"
+    )
+
+
+def _pg_product_statements(delta):
+    return (
+        f"WITH delta AS ({delta}) "
+        f"UPDATE stats_totals SET products = stats_totals.products + d.products, "
+        f"stock_units = stats_totals.stock_units + d.stock_units, "
+        f"inventory_value = stats_totals.inventory_value + d.inventory_value "
+        f"FROM (SELECT COALESCE(SUM(products), 0) AS products, "
+        f"COALESCE(SUM(stock_units), 0) AS stock_units, "
+        f"COALESCE(SUM(inventory_value), 0) AS inventory_value FROM delta) d "
+        f"WHERE stats_totals.id = {PG_SLOT};"
+    )
+
+
+def postgresql_branches():
+    """Treść funkcji triggerów PostgreSQL: tabela -> ({operacja: SQL}, SQL dla TRUNCATE)."""
+    task_new = f"SELECT user_id, 1 AS tasks, {_done('n')} AS completed FROM new_rows n"
+    task_old = f"SELECT user_id, -1 AS tasks, -{_done('o')} AS completed FROM old_rows o"
+    product_new = (f"SELECT 1 AS products, {_stock('n')} AS stock_units, "
+                   f"{_value('n')} AS inventory_value FROM new_rows n")
+    product_old = (f"SELECT -1 AS products, -{_stock('o')} AS stock_units, "
+                   f"-{_value('o')} AS inventory_value FROM old_rows o")
+
+    return {
+        'users': ({
+            'INSERT': f"UPDATE stats_totals SET users = users + "
+                      f"(SELECT COUNT(*) FROM new_rows) WHERE id = {PG_SLOT};",
+            'DELETE': f"UPDATE stats_totals SET users = users - "
+                      f"(SELECT COUNT(*) FROM old_rows) WHERE id = {PG_SLOT};",
+        }, "UPDATE stats_totals SET users = 0;"),
+        'tasks': ({
+            'INSERT': _pg_task_statements(task_new),
+            'DELETE': _pg_task_statements(task_old),
+            'UPDATE': _pg_task_statements(_pg_delta(task_new, task_old)),
+        }, "UPDATE stats_totals SET tasks = 0, tasks_completed = 0; "
+           "DELETE FROM user_task_stats;"),
+        'products': ({
+            'INSERT': _pg_product_statements(product_new),
+            'DELETE': _pg_product_statements(product_old),
+            'UPDATE': _pg_product_statements(_pg_delta(product_new, product_old)),
+        }, "UPDATE stats_totals SET products = 0, stock_units = 0, inventory_value = 0;"),
+    }
+
+
+def postgresql_ddl():
+    statements = []
+    for table, (branches, truncate) in postgresql_branches().items():
+        statements.append(_pg_function(f"stats_{table}", branches, truncate))
+        for op, referencing in (('INSERT', 'NEW TABLE AS new_rows'),
+                                ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+                                ('DELETE', 'OLD TABLE AS old_rows')):
+            if table == 'users' and op == 'UPDATE':
+                continue  # zmiana nazwy/e-maila nie wpływa na liczniki
+            name = f"stats_{table}_{op.lower()}"
+            statements.append(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+            statements.append(
+                f"CREATE TRIGGER {name} AFTER {op} ON {table} REFERENCING {referencing} "
+                f"FOR EACH STATEMENT EXECUTE FUNCTION stats_{table}()"
+            )
+        statements.append(f"DROP TRIGGER IF EXISTS stats_{table}_truncate ON {table}")
+        statements.append(f"CREATE TRIGGER stats_{table}_truncate AFTER TRUNCATE ON {table} "
+                          f"FOR EACH STATEMENT EXECUTE FUNCTION stats_{table}()")
+    return statements
+
+
+def install(connection):
+    """Tworzy (albo odtwarza) triggery utrzymujące agregaty."""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        statements = postgresql_ddl()
+    elif dialect == 'sqlite':
+        statements = sqlite_ddl()
+    else:
+        raise ValueError(f"incremental stats are not supported on {dialect!r}")
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def uninstall(connection):
+    if connection.dialect.name == 'postgresql':
+        for table in TABLES:
+            connection.execute(text(f"DROP FUNCTION IF EXISTS stats_{table}() CASCADE"))
+
+
+def rebuild(connection):
+    """Przelicza agregaty od zera w bieżącej transakcji (naprawa rozjazdu)."""
+    if connection.dialect.name == 'postgresql':
+        # Zapisy czekają do końca przeliczenia - inaczej ich delty by przepadły
+        connection.execute(text("LOCK TABLE users, tasks, products IN SHARE MODE"))
+    connection.execute(text("DELETE FROM user_task_stats"))
+    connection.execute(text(
+        f"INSERT INTO user_task_stats (user_id, tasks, completed) "
+        f"SELECT user_id, COUNT(*), SUM({_done('tasks')}) FROM tasks "
+        f"WHERE user_id IS NOT NULL GROUP BY user_id"
+    ))
+    connection.execute(text("DELETE FROM stats_totals"))
+    connection.execute(text(
+        f"INSERT INTO stats_totals (id, {', '.join(TOTALS)}) SELECT 0, "
+        f"(SELECT COUNT(*) FROM users), "
+        f"(SELECT COUNT(*) FROM tasks), "
+        f"(SELECT COALESCE(SUM({_done('tasks')}), 0) FROM tasks), "
+        f"(SELECT COUNT(*) FROM products), "
+        f"(SELECT COALESCE(SUM({_stock('products')}), 0) FROM products), "
+        f"(SELECT COALESCE(SUM({_value('products')}), 0) FROM products)"
+    ))
+    # Pozostałe wiersze zaczynają od zera - triggery tylko je aktualizują
+    connection.execute(
+        text(f"INSERT INTO stats_totals (id, {', '.join(TOTALS)}) "
+             f"VALUES (:id, {', '.join('0' for _ in TOTALS)})"),
+        [{"id": slot} for slot in range(1, SLOTS)]
+    )
+
+
+def totals(connection):
+    """Suma wierszy ``stats_totals`` jako słownik (zera, jeśli jeszcze ich nie ma)."""
+    sums = ", ".join(
+        f"CAST(COALESCE(SUM({name}), 0) AS {'FLOAT' if name == 'inventory_value' else 'BIGINT'})"
+        f" AS {name}"
+        for name in TOTALS
+    )
+    return dict(connection.execute(text(f"SELECT {sums} FROM stats_totals")).mappings().one())
+
+
+def completion_rate(tasks, completed):
+    return round(completed / tasks, 4) if tasks else None
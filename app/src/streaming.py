@@ -0,0 +1,70 @@
+"""Strumieniowanie pełnych tabel jako NDJSON albo tablicy JSON w kawałkach.
+
+Wiersze są czytane partiami przez ``yield_per`` (na PostgreSQL oznacza to
+kursor po stronie serwera), a odpowiedź jest wysyłana kawałek po kawałku,
+więc zużycie pamięci nie zależy od rozmiaru tabeli.
+"""
+from flask import Response, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+STREAM_BATCH_SIZE = 1000
+
+
+def stream_mode(request):
+    """Zwraca 'ndjson', 'json' albo None (zwykła strona listy)."""
+    return negotiate_stream(request.accept_mimetypes, request.args)
+
+
+def negotiate_stream(accept_mimetypes, args):
+    """``stream_mode`` bez obiektu żądania Flaska (``MIMEAccept`` + argumenty)."""
+    best = accept_mimetypes.best_match(
+        ['application/json', NDJSON_MIMETYPE], default='application/json'
+    )
+    if best == NDJSON_MIMETYPE:
+        return 'ndjson'
+    if args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return 'json'
+    return None
+
+
+def iter_batches(rows, dumps, batch_size=STREAM_BATCH_SIZE):
+    """Grupuje zserializowane wiersze w listy po ``batch_size``."""
+    batch = []
+    for row in rows:
+        batch.append(dumps(row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ndjson_chunks(rows, dumps, batch_size=STREAM_BATCH_SIZE):
+    for batch in iter_batches(rows, dumps, batch_size):
+        yield '\n'.join(batch) + '\n'
+
+
+def json_array_chunks(rows, dumps, batch_size=STREAM_BATCH_SIZE):
+    yield '['
+    separator = ''
+    for batch in iter_batches(rows, dumps, batch_size):
+        yield separator + ','.join(batch)
+        separator = ','
+    yield ']'
+
+
+def stream_response(rows, dumps, mode, batch_size=STREAM_BATCH_SIZE):
+    """Buduje odpowiedź strumieniową dla iteratora wierszy.
+
+    ``stream_with_context`` utrzymuje kontekst żądania (a więc i sesję bazy)
+    aż do wysłania ostatniego kawałka.
+    """
+    if mode == 'ndjson':
+        chunks, mimetype = ndjson_chunks(rows, dumps, batch_size), NDJSON_MIMETYPE
+    else:
+        chunks, mimetype = json_array_chunks(rows, dumps, batch_size), 'application/json'
+
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    # nginx domyślnie buforuje odpowiedzi z upstreamu - tu nie chcemy tego
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
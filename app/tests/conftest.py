@@ -1,6 +1,7 @@
 import pytest
 import sys
 import os
+from contextlib import contextmanager
 
 # Dodaj katalog nadrzędny do ścieżki
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -10,14 +11,18 @@ sys.path.insert(0, parent_dir)
 # WAŻNE: Ustaw zmienną środowiskową PRZED importem aplikacji
 os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
 
-from src.app import app, db
+from src.app import create_app, db
+from src.profiling import profiler
+
+app = create_app({
+    'TESTING': True,
+    'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+    'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+})
 
 @pytest.fixture(scope='function')
 def test_app():
     """Fixture dla aplikacji testowej"""
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     return app
 
 @pytest.fixture
@@ -30,6 +35,8 @@ def client(test_app):
         with test_app.app_context():
             db.session.remove()
             db.drop_all()
+        test_app.extensions['response_cache'].clear()
+        test_app.extensions['entity_cache'].clear()
 
 @pytest.fixture
 def app_context(test_app):
@@ -39,3 +46,20 @@ def app_context(test_app):
         yield
         db.session.remove()
         db.drop_all()
+
+@pytest.fixture
+def query_budget():
+    """Budżet zapytań: ``with query_budget(2): client.get(...)``
+
+    Blok nie może wykonać więcej niż ``max_queries`` zapytań ani powtarzać
+    tego samego zapytania (możliwe N+1), chyba że ``allow_repeated=True``.
+    """
+    @contextmanager
+    def budget(max_queries, allow_repeated=False):
+        with profiler.capture() as profile:
+            yield profile
+        assert profile.count <= max_queries, \
+            f"query budget {max_queries} exceeded:\n{profile.summary()}"
+        if not allow_repeated:
+            assert not profile.repeated(), f"possible N+1:\n{profile.summary()}"
+    return budget
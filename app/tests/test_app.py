@@ -1,6 +1,8 @@
 import pytest
 import sys
 import os
+import json
+import gzip
 
 # Dodaj katalog nadrzędny do ścieżki
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -10,7 +12,24 @@ sys.path.insert(0, parent_dir)
 # Ustaw zmienną środowiskową PRZED importem
 os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
 
-from src.app import app, db, User, Task, Product
+from src.app import create_app, db, User, Task, Product
+from src.export import export_to_files
+from sqlalchemy import create_engine, event, exc
+from src.db_pool import TimedQueuePool, async_database_url, engine_options, pool_stats
+from src.entity_cache import MISS, EntityCache, LocalCache, MemoryBackend
+from src.health import ReadinessProbe
+from src.server import server_options
+from src.asgi import create_asgi_app
+from starlette.testclient import TestClient
+from prometheus_client import REGISTRY
+from src.profiling import profiler
+from src.json_provider import OrjsonProvider
+from flask.json.provider import DefaultJSONProvider
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.replicas import replica_engines, replica_set
+from src.group_commit import GroupCommitter
+from src import stats
 
 
 # Test 1: Test jednostkowy - model User
@@ -160,6 +179,12 @@ def test_products_endpoint(client):
     assert len(products) == 1
     assert products[0]['name'] == 'Laptop'
 
+    # Powtórzona nazwa - 409 zamiast błędu serwera, sesja nadal używalna
+    response = client.post('/products', json={'name': 'Laptop', 'price': 1.0})
+    assert response.status_code == 409
+    assert 'duplicate name' in response.get_json()['error']
+    assert len(client.get('/products').get_json()) == 1
+
 
 # Test 7: Test Task model
 def test_task_model(app_context):
@@ -224,3 +249,1053 @@ def test_update_task(client):
     updated_task = response.get_json()
     assert updated_task['completed'] is True
     assert updated_task['title'] == 'Zadanie do zrobienia'
+
+
+# Test 10: Paginacja kursorowa list
+def test_keyset_pagination(client):
+    """Test stronicowania ?limit=&after= z kursorem następnej strony"""
+    for i in range(5):
+        response = client.post('/products',
+                               json={'name': f'Produkt {i}', 'price': 10.0 + i},
+                               content_type='application/json'
+                               )
+        assert response.status_code == 201
+
+    response = client.get('/products?limit=2')
+    assert response.status_code == 200
+    first_page = response.get_json()
+    assert [p['name'] for p in first_page] == ['Produkt 0', 'Produkt 1']
+    cursor = response.headers['X-Next-Cursor']
+    assert 'rel="next"' in response.headers['Link']
+
+    seen = [p['id'] for p in first_page]
+    while cursor:
+        response = client.get(f'/products?limit=2&after={cursor}')
+        assert response.status_code == 200
+        seen.extend(p['id'] for p in response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+
+# Test 11: Błędne parametry paginacji
+def test_pagination_invalid_params(client):
+    """Test odrzucania złego kursora i limitu"""
+    response = client.get('/users?after=nie-kursor')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'invalid cursor'
+
+    response = client.get('/tasks?limit=0')
+    assert response.status_code == 400
+
+
+# Test 12: Strumieniowanie całej tabeli
+def test_streaming_list(client):
+    """Test NDJSON i tablicy JSON w kawałkach dla pełnej listy zadań"""
+    for i in range(120):
+        response = client.post('/tasks',
+                               json={'title': f'Zadanie {i}'},
+                               content_type='application/json'
+                               )
+        assert response.status_code == 201
+
+    # Zwykła lista zwraca tylko domyślną stronę
+    response = client.get('/tasks')
+    assert len(response.get_json()) == 100
+
+    response = client.get('/tasks', headers={'Accept': 'application/x-ndjson'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 120
+    assert json.loads(lines[-1])['title'] == 'Zadanie 119'
+
+    response = client.get('/tasks?stream=1')
+    assert response.status_code == 200
+    tasks = json.loads(response.get_data(as_text=True))
+    assert len(tasks) == 120
+    assert [t['id'] for t in tasks] == sorted(t['id'] for t in tasks)
+
+
+# Test 13: Masowe wstawianie z błędami per element
+def test_bulk_insert_users(client):
+    """Test POST /users/bulk z duplikatem e-maila i brakującym polem"""
+    response = client.post('/users',
+                           json={'name': 'Jan Kowalski', 'email': 'jan@example.com'},
+                           content_type='application/json'
+                           )
+    assert response.status_code == 201
+
+    response = client.post('/users/bulk',
+                           json=[
+                               {'name': 'Anna Nowak', 'email': 'anna@example.com'},
+                               {'name': 'Duplikat', 'email': 'jan@example.com'},
+                               {'email': 'bez.imienia@example.com'},
+                               {'name': 'Piotr Wiśniewski', 'email': 'piotr@example.com'},
+                               {'name': 'Duplikat w partii', 'email': 'piotr@example.com'},
+                           ],
+                           content_type='application/json'
+                           )
+    assert response.status_code == 207
+    result = response.get_json()
+    assert [c['index'] for c in result['created']] == [0, 3]
+    assert [e['index'] for e in result['errors']] == [1, 2, 4]
+    assert 'duplicate email' in result['errors'][0]['error']
+
+    response = client.get('/users')
+    assert len(response.get_json()) == 3
+
+
+# Test 14: Masowe wstawianie zadań z NDJSON
+def test_bulk_insert_tasks_ndjson(client):
+    """Test POST /tasks/bulk z ciałem NDJSON i walidacją klucza obcego"""
+    user = client.post('/users',
+                       json={'name': 'Anna Nowak', 'email': 'anna@example.com'},
+                       content_type='application/json'
+                       ).get_json()
+
+    body = '\n'.join(json.dumps(item) for item in [
+        {'title': 'Zrobić zakupy', 'user_id': user['id']},
+        {'title': 'Napisać raport', 'completed': True},
+        {'title': 'Zadanie sieroty', 'user_id': 999},
+    ])
+    response = client.post('/tasks/bulk', data=body,
+                           content_type='application/x-ndjson')
+    assert response.status_code == 207
+    result = response.get_json()
+    assert result['created_count'] == 2
+    assert result['errors'][0]['index'] == 2
+
+    task_id = result['created'][1]['id']
+    task = client.get(f'/tasks/{task_id}').get_json()
+    assert task['completed'] is True
+    assert task['user_id'] is None
+
+
+# Test 15: Eksport CSV i NDJSON przez HTTP
+def test_export_endpoints(client):
+    """Test GET /users/export.csv i /products/export.ndjson (także gzip)"""
+    client.post('/users/bulk', json=[
+        {'name': 'Jan Kowalski', 'email': 'jan@example.com'},
+        {'name': 'Piotr Wiśniewski', 'email': 'piotr@example.com'},
+    ], content_type='application/json')
+    client.post('/products/bulk', json=[
+        {'name': 'Laptop', 'price': 2999.99, 'stock': 15},
+        {'name': 'Mysz', 'price': 89.99},
+    ], content_type='application/json')
+
+    response = client.get('/users/export.csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == 'id,name,email'
+    assert lines[2] == '2,Piotr Wiśniewski,piotr@example.com'
+
+    response = client.get('/products/export.ndjson')
+    products = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert products[1] == {'id': 2, 'name': 'Mysz', 'price': 89.99, 'stock': 0}
+
+    response = client.get('/products/export.ndjson?gzip=1')
+    assert response.mimetype == 'application/gzip'
+    assert len(gzip.decompress(response.data).decode().splitlines()) == 2
+
+
+# Test 16: Eksport do plików dzielonych na części
+def test_export_to_chunked_files(app_context, tmp_path):
+    """Test podziału eksportu na pliki po N wierszy"""
+    db.session.add_all([Task(title=f"Zadanie {i}") for i in range(7)])
+    db.session.commit()
+
+    with db.engine.connect() as conn:
+        paths = export_to_files(conn, Task.__table__, 'ndjson', str(tmp_path),
+                                compress=True, rows_per_file=3)
+    assert [os.path.basename(p) for p in paths] == [
+        'tasks-00001.ndjson.gz', 'tasks-00002.ndjson.gz', 'tasks-00003.ndjson.gz'
+    ]
+    with gzip.open(paths[-1], 'rt') as f:
+        assert [json.loads(line)['title'] for line in f] == ['Zadanie 6']
+
+
+# Test 17: ETag i odpowiedzi 304 dla katalogu produktów
+def test_products_etag_cache(client, test_app):
+    """Test warunkowego GET bez zapytań do bazy i unieważniania po zapisie"""
+    client.post('/products', json={'name': 'Laptop', 'price': 2999.99},
+                content_type='application/json')
+
+    response = client.get('/products')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    queries = []
+    with test_app.app_context():
+        engine = db.engine
+    listener = lambda *args: queries.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/products', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        response = client.get('/products')
+        assert response.status_code == 200
+        assert response.headers['ETag'] == etag
+        assert 'Accept' in response.headers['Vary']
+        assert queries == []
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    # NDJSON pod tym samym URL nie dostaje strony JSON z cache
+    response = client.get('/products', headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    assert json.loads(response.get_data(as_text=True).splitlines()[0])['name'] == 'Laptop'
+
+    client.post('/products', json={'name': 'Mysz', 'price': 89.99},
+                content_type='application/json')
+    response = client.get('/products', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()) == 2
+
+
+# Test 18: Cache encji dla odczytów po ID
+def test_entity_cache_read_through(client, test_app):
+    """Test trafień w cache i unieważniania po PUT zadania"""
+    task = client.post('/tasks', json={'title': 'Zrobić zakupy'},
+                       content_type='application/json').get_json()
+
+    queries = []
+    with test_app.app_context():
+        engine = db.engine
+    listener = lambda *args: queries.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        assert client.get(f'/tasks/{task["id"]}').get_json()['completed'] is False
+        assert len(queries) == 1
+        client.get(f'/tasks/{task["id"]}')
+        assert len(queries) == 1
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    response = client.put(f'/tasks/{task["id"]}', json={'completed': True},
+                          content_type='application/json')
+    assert response.status_code == 200
+    assert client.get(f'/tasks/{task["id"]}').get_json()['completed'] is True
+    assert client.get('/tasks/999').status_code == 404
+
+    stats = client.get('/internal/cache').get_json()['entities']
+    assert stats['hits'] >= 1
+    assert stats['misses'] >= 2
+    assert stats['invalidations'] >= 1
+
+
+# Test 19: LRU z TTL i współdzielony backend
+def test_entity_cache_lru_and_shared_backend():
+    """Test wyparć, wygasania i trafień we współdzielonym backendzie"""
+    now = [0.0]
+    local = LocalCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    local.set('a', 1)
+    local.set('b', 2)
+    local.set('c', 3)
+    assert local.evictions == 1
+    now[0] = 11
+    assert local.get('c') is MISS
+    assert local.expirations == 1
+
+    shared = MemoryBackend()
+    loads = []
+    first = EntityCache(LocalCache(), shared=shared)
+    second = EntityCache(LocalCache(), shared=shared)
+    loader = lambda: loads.append(1) or {'id': 1, 'name': 'Laptop'}
+
+    assert first.get('products', 1, loader) == {'id': 1, 'name': 'Laptop'}
+    assert second.get('products', 1, loader) == {'id': 1, 'name': 'Laptop'}
+    assert len(loads) == 1
+    assert second.shared_hits == 1
+
+    first.invalidate_model('products')
+    assert EntityCache(LocalCache(), shared=shared).get('products', 1, loader)
+    assert len(loads) == 2
+    # Unieważnienie w innym procesie widać od razu (bez lokalnej kopii)
+    second.invalidate('products', 1)
+    first.get('products', 1, loader)
+    assert len(loads) == 3
+
+    # COMMIT w trakcie ładowania - wynik nie trafia do cache
+    cache = EntityCache(LocalCache())
+    stale = lambda: cache.invalidate('products', 1) or {'id': 1, 'name': 'stara'}
+    assert cache.get('products', 1, stale) == {'id': 1, 'name': 'stara'}
+    assert cache.get('products', 1, loader) == {'id': 1, 'name': 'Laptop'}
+    assert cache.stats()['stale_loads'] == 1
+
+
+# Test 20: Filtrowanie zadań po stronie serwera
+def test_task_filters(client):
+    """Test ?user_id=, ?completed= i ?title_prefix= na liście zadań"""
+    anna = client.post('/users', json={'name': 'Anna Nowak', 'email': 'anna@example.com'},
+                       content_type='application/json').get_json()
+    client.post('/tasks/bulk', json=[
+        {'title': 'Zrobić zakupy', 'user_id': anna['id']},
+        {'title': 'Zrobić pranie', 'user_id': anna['id'], 'completed': True},
+        {'title': 'Napisać raport', 'user_id': anna['id']},
+        {'title': 'Zrobić 100% normy'},
+    ], content_type='application/json')
+
+    tasks = client.get(f'/tasks?user_id={anna["id"]}&completed=false').get_json()
+    assert [t['title'] for t in tasks] == ['Zrobić zakupy', 'Napisać raport']
+
+    tasks = client.get('/tasks?title_prefix=Zrobić').get_json()
+    assert len(tasks) == 3
+    tasks = client.get('/tasks?title_prefix=Zrobić 100%').get_json()
+    assert [t['title'] for t in tasks] == ['Zrobić 100% normy']
+
+    tasks = client.get('/tasks?completed=true&limit=1').get_json()
+    assert [t['title'] for t in tasks] == ['Zrobić pranie']
+
+    assert client.get('/tasks?completed=maybe').status_code == 400
+    assert client.get('/tasks?user_id=abc').status_code == 400
+
+
+# Test 21: Zapytania dashboardu używają indeksów
+def test_task_filter_indexes(app_context):
+    """Test planu zapytania dla otwartych zadań użytkownika"""
+    plan = db.session.execute(db.text(
+        "EXPLAIN QUERY PLAN SELECT id FROM tasks "
+        "WHERE user_id = 1 AND completed = 0 AND id > 10 ORDER BY id LIMIT 101"
+    )).all()
+    assert 'ix_tasks_user_id_completed' in ' '.join(str(row) for row in plan)
+
+
+# Test 22: Zadania użytkownika i ?include=tasks bez N+1
+def test_users_with_tasks_without_n_plus_one(client, test_app):
+    """Test /users/<id>/tasks i stałej liczby zapytań dla ?include=tasks"""
+    users = client.post('/users/bulk', json=[
+        {'name': f'Użytkownik {i}', 'email': f'user{i}@example.com'} for i in range(30)
+    ], content_type='application/json').get_json()['created']
+    client.post('/tasks/bulk', json=[
+        {'title': f'Zadanie {i}', 'user_id': users[i % 30]['id'], 'completed': i % 2 == 0}
+        for i in range(90)
+    ], content_type='application/json')
+
+    first_id = users[0]['id']
+    tasks = client.get(f'/users/{first_id}/tasks?title_prefix=Zadanie 6').get_json()
+    assert [t['title'] for t in tasks] == ['Zadanie 60']
+    assert client.get(f'/users/{first_id}/tasks?completed=false').get_json() == []
+    assert client.get('/users/999/tasks').status_code == 404
+
+    queries = []
+    with test_app.app_context():
+        engine = db.engine
+    listener = lambda *args: queries.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        page = client.get('/users?include=tasks&limit=25').get_json()
+        assert len(page) == 25
+        assert len(queries) <= 2
+        assert [t['title'] for t in page[0]['tasks']] == ['Zadanie 0', 'Zadanie 30', 'Zadanie 60']
+
+        queries.clear()
+        response = client.get('/users?include=tasks', headers={'Accept': 'application/x-ndjson'})
+        streamed = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert len(streamed) == 30
+        assert all(len(u['tasks']) == 3 for u in streamed)
+        assert len(queries) <= 2
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    assert client.get('/users?include=orders').status_code == 400
+
+
+# Test 23: Konfiguracja puli połączeń ze zmiennych środowiskowych
+def test_engine_options_from_env():
+    """Test opcji puli i statement_timeout dla PostgreSQL"""
+    options = engine_options(
+        'postgresql://flask_user:flask_password@db:5432/flask_docker_db',
+        {'DB_POOL_SIZE': '20', 'DB_MAX_OVERFLOW': '5', 'DB_POOL_PRE_PING': 'false',
+         'DB_STATEMENT_TIMEOUT_MS': '1500'}
+    )
+    assert options['poolclass'] is TimedQueuePool
+    assert options['pool_size'] == 20
+    assert options['max_overflow'] == 5
+    assert options['pool_pre_ping'] is False
+    assert options['connect_args'] == {'options': '-c statement_timeout=1500'}
+
+    assert engine_options('sqlite:///:memory:', {'DB_POOL_SIZE': '20'}) == {}
+
+
+# Test 24: Metryki nasycenia puli
+def test_pool_saturation_stats(tmp_path, client):
+    """Test licznika zajętych połączeń i histogramu oczekiwania"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    other = create_engine(f"sqlite:///{tmp_path / 'other.db'}", poolclass=TimedQueuePool)
+    first = engine.connect()
+    stats = pool_stats(engine)
+    assert stats['checked_out'] == 1
+    assert stats['overflow'] == 0
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    first.close()
+    engine.dispose()
+
+    # Histogram per silnik, zachowany po dispose()
+    stats = pool_stats(engine)['checkout_wait_seconds']
+    assert stats['timeouts'] == 1
+    assert stats['buckets']['+Inf'] == stats['count']
+    assert stats['max'] >= 0.05
+    assert pool_stats(other)['checkout_wait_seconds']['count'] == 0
+
+    response = client.get('/internal/pool')
+    assert response.status_code == 200
+    assert 'checkout_wait_seconds' in response.get_json()
+
+
+# Test 25: Fabryka aplikacji i opcje serwera produkcyjnego
+def test_app_factory_and_server_options():
+    """Test niezależnych instancji aplikacji i konfiguracji gunicorna"""
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        db.create_all()
+        assert app.test_client().get('/health').get_json()['database'] == 'connected'
+
+    # Stan aplikacji jest jej własny - druga aplikacja nie nadpisuje pierwszej
+    other = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                        'ENTITY_CACHE_MAX_ENTRIES': 5})
+    for name in ('response_cache', 'entity_cache', 'readiness_probe', 'replicas'):
+        assert app.extensions[name] is not other.extensions[name]
+    assert app.extensions['entity_cache'].local.max_entries == 10000
+    assert app.extensions['entity_cache'].local.ttl == 1.0
+    with app.app_context():
+        assert app.extensions['readiness_probe'].refresh()['ready'] is True
+
+    options = server_options({'PORT': '8000', 'WEB_WORKERS': '3', 'WEB_THREADS': '4',
+                              'WEB_PRELOAD': 'true'})
+    assert options['bind'] == '0.0.0.0:8000'
+    assert options['workers'] == 3
+    assert options['worker_class'] == 'gthread'
+    assert options['preload_app'] is True
+
+    options = server_options({'WEB_WORKER_CLASS': 'gevent'})
+    assert options['worker_class'] == 'gevent'
+    assert options['workers'] >= 1
+    assert options['preload_app'] is False
+
+
+# Test 26: Wariant asynchroniczny (ASGI) z tymi samymi trasami
+def test_asgi_variant(tmp_path):
+    """Test tras aplikacji ASGI na aiosqlite"""
+    assert async_database_url('postgresql://u:p@db/x') == 'postgresql+asyncpg://u:p@db/x'
+    assert async_database_url('sqlite:///:memory:') == 'sqlite+aiosqlite:///:memory:'
+
+    database_url = f"sqlite:///{tmp_path / 'asgi.db'}"
+    engine = create_engine(database_url)
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    with TestClient(create_asgi_app({'SQLALCHEMY_DATABASE_URI': database_url})) as client:
+        assert client.get('/health').json()['database'] == 'connected'
+        client.app.state.readiness.refresh()
+        assert client.get('/readyz').json()['ready'] is True
+
+        user = client.post('/users', json={"name": "Ewa", "email": "ewa@example.com"})
+        assert user.status_code == 201
+        user_id = user.json()['id']
+        response = client.post('/tasks/bulk', json=[
+            {"title": f"Zadanie {i}", "user_id": user_id} for i in range(5)
+        ])
+        assert response.json()['created_count'] == 5
+        task_id = response.json()['created'][0]['id']
+
+        assert client.put(f'/tasks/{task_id}', json={"completed": True}).json()['completed']
+        assert client.get(f'/users/{user_id}').json()['email'] == 'ewa@example.com'
+        assert client.get('/users/999').status_code == 404
+
+        page = client.get('/tasks?limit=2')
+        assert len(page.json()) == 2
+        assert 'after=' in page.headers['Link']
+        assert len(client.get('/tasks?' + page.headers['Link'].split('?')[1].split('>')[0]).json()) == 2
+        assert len(client.get(f'/users/{user_id}/tasks?completed=false').json()) == 4
+
+        users = client.get('/users?include=tasks').json()
+        assert len(users[0]['tasks']) == 5
+        lines = client.get('/tasks', headers={'Accept': 'application/x-ndjson'}).text.splitlines()
+        assert [json.loads(line)['id'] for line in lines] == sorted(
+            json.loads(line)['id'] for line in lines)
+        assert len(lines) == 5
+        assert client.get('/products?stream=1').json() == []
+        assert client.get('/tasks?limit=abc').status_code == 400
+        assert client.get('/tasks?fields=title&limit=1').json() == [{"title": "Zadanie 0"}]
+        assert client.get(f'/users/{user_id}?fields=name').json() == {"name": "Ewa"}
+
+        # Walidacja POST jak w /bulk (400), duplikat nazwy produktu - 409 jak w src.app
+        response = client.post('/tasks', json={"completed": True})
+        assert response.status_code == 400 and response.json() == {"error": "missing field: title"}
+        assert client.post('/users', json={"name": "Ola"}).status_code == 400
+        assert client.post('/products', json={"name": "Kubek", "price": "tanio"}).status_code == 400
+        product = client.post('/products', json={"name": "Kubek", "price": 9.5})
+        assert product.status_code == 201 and product.json()['stock'] == 0
+        response = client.post('/products', json={"name": "Kubek", "price": 1.0})
+        assert response.status_code == 409
+        assert response.json() == {"error": "duplicate name: Kubek"}
+        assert len(client.get('/products').json()) == 1
+
+
+# Test 27: Sondy liveness/readiness
+def test_liveness_and_readiness(client):
+    """Test /livez bez I/O oraz /readyz z wyniku sondy w tle"""
+    assert client.get('/livez').get_json() == {"status": "alive"}
+
+    # Pierwsze /readyz świeżego workera - sprawdzenie od razu, bez 503
+    fresh = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    response = fresh.test_client().get('/readyz')
+    assert response.status_code == 200 and response.get_json()['ready'] is True
+    fresh.extensions['readiness_probe'].stop()
+
+    response = client.get('/readyz')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['ready'] is True
+    assert body['latency_ms'] >= 0
+    assert 'pool' in body
+
+    now = [100.0]
+    probe = ReadinessProbe(check=lambda: {}, stale_after=10, clock=lambda: now[0])
+    probe.start = lambda: None  # bez wątku - sterujemy zegarem ręcznie
+    assert probe.status()['ready'] is True  # pierwszy odczyt sprawdza od razu
+    probe.refresh()
+    assert probe.status()['ready'] is True
+    now[0] += 11
+    assert probe.status()['ready'] is False
+    assert probe.status()['error'] == 'last check is stale'
+
+    def failing():
+        raise RuntimeError("connection refused")
+    probe.check = failing
+    assert probe.refresh()['ready'] is False
+    assert 'connection refused' in probe.status()['error']
+
+
+# Test 28: Metryki Prometheusa dla żądań i bazy
+def test_prometheus_metrics(client):
+    """Test histogramów latencji, statusów i zapytań per endpoint"""
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    requests_before = sample('http_requests_total', endpoint='get_user', method='GET',
+                             status='404')
+    queries_before = sample('db_queries_per_request_sum', endpoint='users')
+    latency_before = sample('http_request_duration_seconds_count', endpoint='users',
+                            method='POST')
+
+    client.post('/users', json={"name": "Jan", "email": "jan@example.com"})
+    client.get('/users/999')
+
+    assert sample('http_request_duration_seconds_count', endpoint='users',
+                  method='POST') == latency_before + 1
+    assert sample('http_requests_total', endpoint='get_user', method='GET',
+                  status='404') == requests_before + 1
+    assert sample('db_queries_per_request_sum', endpoint='users') >= queries_before + 1
+    assert sample('db_time_per_request_seconds_count', endpoint='users') >= 1
+    assert sample('http_response_size_bytes_count', endpoint='users') >= 1
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert b'http_request_duration_seconds_bucket{endpoint="users"' in response.data
+
+
+# Test 29: Budżet zapytań, nagłówki profilowania i wykrywanie N+1
+def test_query_budget_and_profiling(client, query_budget, caplog, monkeypatch):
+    """Test budżetu zapytań per endpoint oraz trybu QUERY_PROFILING"""
+    user = client.post('/users', json={"name": "Jan", "email": "jan@example.com"}).get_json()
+    for i in range(4):
+        client.post('/tasks', json={"title": f"Zadanie {i}", "user_id": user['id']})
+
+    with query_budget(1):
+        client.get('/users?include=tasks')
+    with query_budget(2):
+        client.get(f'/users/{user["id"]}/tasks?completed=false')
+    with pytest.raises(AssertionError, match='query budget 0 exceeded'):
+        with query_budget(0):
+            client.get('/tasks')
+
+    # Przywrócenie progów globalnego profilera po teście
+    monkeypatch.setattr(profiler, 'slow_threshold_ms', profiler.slow_threshold_ms)
+    monkeypatch.setattr(profiler, 'n_plus_one_threshold', profiler.n_plus_one_threshold)
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'QUERY_PROFILING': True, 'QUERY_SLOW_MS': 0})
+    with app.app_context():
+        db.create_all()
+        user = User(name="Anna", email="anna@example.com")
+        db.session.add_all([user, *(Task(title=f"T{i}", user=user) for i in range(3))])
+        db.session.commit()
+    profiled = app.test_client()
+
+    response = profiled.get('/tasks')
+    assert response.headers['X-DB-Queries'] == '1'
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert any('Slow query' in r.message and 'src/app.py' in r.message for r in caplog.records)
+
+    # Leniwe ładowanie user w pętli - to samo zapytanie dla każdego zadania
+    with app.test_request_context(), profiler.capture() as profile:
+        for task in Task.query.all():
+            db.session.expire(task)
+            task.title
+    assert profile.count == 4
+    assert profile.repeated() and profile.repeated()[0][1] == 3
+
+
+# Test 30: Projekcja kolumn i wymienny dostawca JSON
+def test_column_projection_and_json_provider(client, test_app):
+    """Test zgodności list z to_dict() dla obu dostawców JSON"""
+    assert isinstance(test_app.json, OrjsonProvider)
+    user = client.post('/users', json={"name": "Zażółć", "email": "z@example.com"}).get_json()
+    client.post('/tasks', json={"title": "Gęślą jaźń", "user_id": user['id']})
+    client.post('/products', json={"name": "Monitor", "price": 899.99, "stock": 3})
+
+    with test_app.app_context():
+        expected = {
+            '/users': [u.to_dict() for u in User.query.all()],
+            '/tasks': [t.to_dict() for t in Task.query.all()],
+            '/products': [p.to_dict() for p in Product.query.all()],
+        }
+    for path, rows in expected.items():
+        response = client.get(path)
+        assert response.mimetype == 'application/json'
+        assert response.get_json() == rows
+        assert list(response.get_json()[0]) == list(rows[0])  # kolejność kolumn
+    assert 'Gęślą jaźń'.encode() in client.get('/tasks?stream=1').data
+
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'JSON_PROVIDER': 'default'})
+    assert type(app.json) is DefaultJSONProvider
+    with pytest.raises(ValueError):
+        create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'JSON_PROVIDER': 'x'})
+
+
+# Test 31: Rzadkie zestawy pól (?fields=)
+def test_sparse_fieldsets(client, test_app):
+    """Test zawężenia SELECT i odpowiedzi do wybranych pól"""
+    for i in range(3):
+        client.post('/products', json={"name": f"Produkt {i}", "price": 10.0 + i, "stock": i})
+    user = client.post('/users', json={"name": "Jan", "email": "jan@example.com"}).get_json()
+    client.post('/tasks', json={"title": "Zadanie", "user_id": user['id']})
+
+    queries = []
+    with test_app.app_context():
+        engine = db.engine
+    listener = lambda *args: queries.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/products?fields=name,id&limit=2')
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert response.get_json() == [{"id": 1, "name": "Produkt 0"}, {"id": 2, "name": "Produkt 1"}]
+    select_list = queries[0].split('FROM')[0]
+    assert 'price' not in select_list and 'stock' not in select_list
+
+    # Kursor działa także bez id w polach
+    page = client.get('/products?fields=name&limit=2')
+    assert page.get_json() == [{"name": "Produkt 0"}, {"name": "Produkt 1"}]
+    next_page = client.get('/products?' + page.headers['Link'].split('?')[1].split('>')[0])
+    assert next_page.get_json() == [{"name": "Produkt 2"}]
+
+    assert client.get('/tasks?fields=title&completed=false').get_json() == [{"title": "Zadanie"}]
+    assert client.get('/users?fields=name&include=tasks').get_json() == [
+        {"name": "Jan", "tasks": [{"id": 1, "title": "Zadanie", "completed": False,
+                                   "user_id": user['id']}]}
+    ]
+    assert client.get(f'/users/{user["id"]}?fields=email').get_json() == {
+        "email": "jan@example.com"
+    }
+    assert client.get('/products/1?fields=stock').get_json() == {"stock": 0}
+
+    response = client.get('/users?fields=name,password')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'unknown fields: password'
+
+
+# Test 32: Atomowa rezerwacja stanu magazynowego
+def test_stock_reservation(client, test_app):
+    """Test warunkowego UPDATE ... RETURNING dla jednego i wielu produktów"""
+    for name, stock in (("Laptop", 5), ("Mysz", 2)):
+        client.post('/products', json={"name": name, "price": 1.0, "stock": stock})
+    assert client.get('/products/1').get_json()['stock'] == 5  # trafia do cache
+
+    queries = []
+    with test_app.app_context():
+        engine = db.engine
+    listener = lambda *args: queries.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.post('/products/1/reserve', json={"quantity": 3})
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert response.get_json() == {"product_id": 1, "quantity": 3, "stock": 2}
+    assert len(queries) == 1 and queries[0].startswith('UPDATE')
+    assert client.get('/products/1').get_json()['stock'] == 2
+
+    response = client.post('/products/1/reserve', json={"quantity": 3})
+    assert response.status_code == 409
+    assert response.get_json()['available'] == 2
+    assert client.post('/products/9/reserve', json={"quantity": 1}).status_code == 404
+    assert client.post('/products/1/reserve', json={"quantity": 0}).status_code == 400
+
+    # Wszystko albo nic: Mysz ma za mało, więc Laptop też nie jest zdjęty
+    response = client.post('/products/reserve', json={"items": [
+        {"product_id": 1, "quantity": 1}, {"product_id": 2, "quantity": 2},
+        {"product_id": 2, "quantity": 1},
+    ]})
+    assert response.status_code == 409
+    assert response.get_json()['failed'] == [
+        {"product_id": 2, "error": "insufficient stock", "available": 2}
+    ]
+    assert client.get('/products/1').get_json()['stock'] == 2
+
+    response = client.post('/products/reserve', json={"items": [
+        {"product_id": 1, "quantity": 2}, {"product_id": 2, "quantity": 2},
+    ]})
+    assert response.status_code == 200
+    assert [r['stock'] for r in response.get_json()['reserved']] == [0, 0]
+    assert [p['stock'] for p in client.get('/products').get_json()] == [0, 0]
+    assert client.post('/products/reserve', json={"items": []}).status_code == 400
+
+
+# Test 33: Zbiorowa aktualizacja zadań (PATCH /tasks)
+def test_bulk_update_tasks(client, test_app):
+    """Test UPDATE po liście ID i po filtrze z unieważnieniem cache"""
+    anna = client.post('/users', json={"name": "Anna", "email": "anna@example.com"}).get_json()
+    jan = client.post('/users', json={"name": "Jan", "email": "jan@example.com"}).get_json()
+    client.post('/tasks/bulk', json=[{"title": f"A{i}", "user_id": anna['id']} for i in range(5)]
+                + [{"title": f"J{i}", "user_id": jan['id']} for i in range(3)])
+    assert client.get('/tasks/1').get_json()['completed'] is False  # trafia do cache
+
+    queries = []
+    with test_app.app_context():
+        engine = db.engine
+    listener = lambda *args: queries.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.patch(f'/tasks?user_id={anna["id"]}', json={"completed": True})
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert response.get_json() == {"updated": 5}
+    assert len(queries) == 1 and queries[0].startswith('UPDATE')
+    assert client.get('/tasks/1').get_json()['completed'] is True
+    assert len(client.get('/tasks?completed=true').get_json()) == 5
+
+    # Już zakończone zadania nie są przepisywane
+    response = client.patch('/tasks', json={"ids": [1, 2, 6, 999], "completed": True})
+    assert response.get_json() == {"updated": 1}
+    assert client.get('/tasks/6').get_json()['completed'] is True
+
+    response = client.patch('/tasks?completed=true', json={"ids": [1, 7], "completed": False})
+    assert response.get_json() == {"updated": 1}
+    assert client.get('/tasks/1').get_json()['completed'] is False
+
+    assert client.patch('/tasks', json={"completed": True}).status_code == 400
+    assert client.patch('/tasks', json={"ids": [1]}).status_code == 400
+    assert client.patch('/tasks', json={"ids": ["x"], "completed": True}).status_code == 400
+
+
+# Test 34: Zapis grupowy POST /tasks (TASK_WRITE_BEHIND)
+def test_task_write_behind(client, test_app, monkeypatch):
+    """Test łączenia równoległych INSERT-ów w partie z osobnym wynikiem dla każdego"""
+    monkeypatch.setitem(test_app.config, 'TASK_WRITE_BEHIND', True)
+    monkeypatch.setattr(test_app.extensions['task_writer'], 'max_delay', 0.05)
+    user = client.post('/users', json={"name": "Anna", "email": "anna@example.com"}).get_json()
+
+    commits = []
+    with test_app.app_context():
+        engine = db.engine
+    listener = lambda connection: commits.append(connection)
+    event.listen(engine, 'commit', listener)
+    barrier = threading.Barrier(20)
+
+    def post(i):
+        barrier.wait()
+        with test_app.test_client() as c:
+            body = {"title": f"T{i}", "user_id": user['id'] if i != 7 else 999}
+            return c.post('/tasks', json=body)
+
+    try:
+        with ThreadPoolExecutor(20) as pool:
+            responses = list(pool.map(post, range(20)))
+    finally:
+        event.remove(engine, 'commit', listener)
+
+    # Mniej transakcji niż zapisanych zadań - wiersze poszły partiami
+    created = [r.get_json() for r in responses if r.status_code == 201]
+    assert len(created) == 19 and len(commits) < 19
+    assert len({task['id'] for task in created}) == 19
+    assert responses[0].get_json() == {"id": responses[0].get_json()['id'], "title": "T0",
+                                       "completed": False, "user_id": user['id']}
+    assert responses[7].status_code == 400
+    assert responses[7].get_json() == {"error": "user_id 999 does not exist"}
+    assert len(client.get('/tasks').get_json()) == 19
+    writer_stats = client.get('/internal/pool').get_json()['task_writer']
+    assert writer_stats['rows'] >= 19 and writer_stats['batches'] < 19
+
+    # Walidacja przed kolejką: brak tytułu i zły typ to 400, nieznane pola są pomijane
+    assert client.post('/tasks', json={"completed": True}).status_code == 400
+    assert client.post('/tasks', json={"title": "X", "completed": 1}).status_code == 400
+    copy = client.post('/tasks', json={**created[0], "title": "Kopia"})
+    assert copy.status_code == 201 and copy.get_json()['id'] != created[0]['id']
+    # Bez zapisu grupowego POST działa jak dotąd - bez dodatkowej walidacji
+    monkeypatch.setitem(test_app.config, 'TASK_WRITE_BEHIND', False)
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.post('/tasks', json={"title": "X", "completed": 1,
+                                                "user_id": user['id']})
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert response.status_code == 201 and response.get_json()['completed'] is True
+    # Żadnego SELECT sprawdzającego user_id przed INSERT
+    assert statements[0].startswith("INSERT")
+    assert client.post('/tasks', json={**created[0], "title": "Kopia 2"}).status_code == 201
+
+    # close() zapisuje kolejkę przed zatrzymaniem; potem zapis idzie od razu
+    batches = []
+    writer = GroupCommitter(lambda rows: batches.append(rows) or list(rows), max_delay=10)
+    futures = [writer.submit(i) for i in range(3)]
+    writer.close()
+    assert [f.result(0) for f in futures] == [0, 1, 2] and batches == [[0, 1, 2]]
+    assert writer.submit(3).result(0) == 3 and batches[-1] == [3]
+
+    # Anulowany (po timeoucie) wiersz nie jest zapisywany
+    writer = GroupCommitter(lambda rows: batches.append(rows) or list(rows), max_delay=10)
+    cancelled, kept = writer.submit(4), writer.submit(5)
+    assert cancelled.cancel()
+    writer.close()
+    assert batches[-1] == [5] and kept.result(0) == 5
+
+
+# Test 35: Wyszukiwanie po nazwie (FTS5 na SQLite)
+def test_name_search(client, test_app):
+    """Test dopasowania podciągu z rankingiem prefiksu i indeksem FTS5"""
+    for name, price in [("Laptop Pro", 4999.0), ("Podstawka pod laptop", 99.0),
+                        ("Mysz", 49.0), ("100% Cotton", 10.0)]:
+        client.post('/products', json={"name": name, "price": price})
+    client.post('/users', json={"name": "Anna Nowak", "email": "anna@example.com"})
+    client.post('/users', json={"name": "Joanna Kowalska", "email": "joanna@example.com"})
+
+    response = client.get('/products/search?q=LAPTOP')
+    assert [p['name'] for p in response.get_json()] == ["Laptop Pro", "Podstawka pod laptop"]
+    assert response.get_json()[0] == {"id": 1, "name": "Laptop Pro", "price": 4999.0, "stock": 0}
+    assert [u['name'] for u in client.get('/users/search?q=anna').get_json()] == \
+        ["Anna Nowak", "Joanna Kowalska"]
+    assert client.get('/users/search?q=nna&fields=name&limit=1').get_json() == \
+        [{"name": "Anna Nowak"}]
+    assert client.get('/products/search?q=0%25 C').get_json()[0]['name'] == "100% Cotton"
+    assert client.get('/products/search?q="x"').get_json() == []
+
+    # Indeks nadąża za zmianami nazwy i usunięciem
+    with test_app.app_context():
+        db.session.get(Product, 3).name = "Mysz do laptopa"
+        db.session.delete(db.session.get(Product, 2))
+        db.session.commit()
+        plan = db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT rowid FROM products_fts WHERE products_fts MATCH 'lap'"
+        )).all()
+    assert any('VIRTUAL TABLE INDEX' in row[-1] for row in plan)
+    assert [p['name'] for p in client.get('/products/search?q=lapt').get_json()] == \
+        ["Laptop Pro", "Mysz do laptopa"]
+
+    assert client.get('/products/search?q=la').status_code == 400
+    assert client.get('/products/search').status_code == 400
+    assert client.get('/users/search?q=anna&fields=bogus').status_code == 400
+
+
+# Test 36: Statystyki utrzymywane przyrostowo (/stats)
+def test_incremental_stats(client, test_app):
+    """Test liczników aktualizowanych triggerami na każdej ścieżce zapisu"""
+    assert client.get('/stats').get_json()['tasks'] == 0
+    for i in range(3):
+        client.post('/users', json={"name": f"U{i}", "email": f"u{i}@example.com"})
+    client.post('/tasks', json={"title": "A", "user_id": 1})
+    client.post('/tasks/bulk', json=[{"title": f"B{i}", "user_id": 2} for i in range(4)]
+                + [{"title": "C", "completed": True, "user_id": 1}, {"title": "bez właściciela"}])
+    client.patch('/tasks?user_id=2', json={"ids": [2, 3], "completed": True})
+    client.put('/tasks/1', json={"completed": True})
+    client.post('/products', json={"name": "Laptop", "price": 1000.5, "stock": 3})
+    client.post('/products/bulk', json=[{"name": "Mysz", "price": 20.0, "stock": 10}])
+    client.post('/products/1/reserve', json={"quantity": 2})
+
+    expected = {"users": 3, "tasks": 7, "tasks_completed": 4, "completion_rate": 0.5714,
+                "products": 2, "stock_units": 11, "inventory_value": 1200.5}
+    assert client.get('/stats').get_json() == expected
+
+    response = client.get('/stats/users?limit=1')
+    assert response.get_json() == [
+        {"user_id": 1, "tasks": 2, "completed": 2, "completion_rate": 1.0}
+    ]
+    response = client.get(response.headers['Link'].split('<')[1].split('>')[0])
+    assert response.get_json() == [
+        {"user_id": 2, "tasks": 4, "completed": 2, "completion_rate": 0.5}
+    ]
+
+    # Przeniesienie i usunięcie zadania oraz zmiana ceny
+    with test_app.app_context():
+        db.session.get(Task, 4).user_id = 1
+        db.session.delete(db.session.get(Task, 5))
+        db.session.get(Product, 2).price = 10.0
+        db.session.commit()
+    data = client.get('/stats').get_json()
+    assert (data['tasks'], data['tasks_completed'], data['inventory_value']) == (6, 4, 1100.5)
+    assert [(u['user_id'], u['tasks'], u['completed'])
+            for u in client.get('/stats/users').get_json()] == [(1, 3, 2), (2, 2, 2)]
+
+    # Rozjazd (zapis z pominięciem triggerów) naprawia pełne przeliczenie
+    with test_app.app_context():
+        db.session.execute(db.text("UPDATE stats_totals SET tasks = 999"))
+        db.session.execute(db.text("DELETE FROM user_task_stats"))
+        db.session.commit()
+    result = test_app.test_cli_runner().invoke(args=['stats', 'rebuild'])
+    assert result.exit_code == 0 and 'Stats rebuilt' in result.output
+    assert client.get('/stats').get_json()['tasks'] == 6
+    assert len(client.get('/stats/users').get_json()) == 2
+
+
+# Test 37: Odczyty z repliki i powrót na bazę główną
+def test_read_replica_routing(tmp_path):
+    """Test round-robin replik, odczytu własnych zapisów i wyłączania awarii"""
+    primary_url = f"sqlite:///{tmp_path / 'primary.db'}"
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    broken_url = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    for url, name in ((primary_url, "Primary"), (replica_url, "Replica")):
+        engine = create_engine(url)
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(User.__table__.insert(), {"name": name, "email": "a@example.com"})
+            conn.execute(Product.__table__.insert(), {"name": name, "price": 1.0})
+            if name == "Replica":
+                conn.execute(Task.__table__.insert(), {"title": "Z repliki", "user_id": 1})
+        engine.dispose()
+
+    replica_app = create_app({'SQLALCHEMY_DATABASE_URI': primary_url,
+                              'DATABASE_REPLICA_URLS': [broken_url, replica_url],
+                              'REPLICA_EJECT_SECONDS': 60})
+    try:
+        client = replica_app.test_client()
+        # Pierwsza w kolejce jest niedziałająca replika - żądanie i tak się udaje
+        assert client.get('/users').get_json()[0]['name'] == "Replica"
+        replica_status = client.get('/internal/pool').get_json()['replicas']
+        assert replica_status['replica_0']['healthy'] is False
+        assert replica_status['replica_1']['healthy'] is True
+        for _ in range(3):
+            assert client.get('/users/1').get_json()['name'] == "Replica"
+            assert client.get('/users?fields=name').get_json() == [{"name": "Replica"}]
+
+        assert client.get('/users', headers={'X-Read-Primary': '1'}).get_json()[0]['name'] \
+            == "Primary"
+        # Strumień (partie selectinload po powrocie z widoku) też czyta z repliki
+        response = client.get('/users?include=tasks',
+                              headers={'Accept': 'application/x-ndjson'})
+        rows = [json.loads(line) for line in response.data.splitlines()]
+        assert [t['title'] for t in rows[0]['tasks']] == ["Z repliki"]
+        # Replika z kontrolą opóźnienia (max_lag) napełnia wspólny cache, a
+        # żądanie przypięte do bazy głównej go omija
+        assert client.get('/internal/cache').get_json()['fill_from_replicas'] is True
+        cached = len(replica_app.extensions['response_cache'])
+        entities = replica_app.extensions['entity_cache'].stats()['entries']
+        assert client.get('/products').get_json()[0]['name'] == "Replica"
+        assert client.get('/products/1').get_json()['name'] == "Replica"
+        assert len(replica_app.extensions['response_cache']) == cached + 2
+        assert replica_app.extensions['entity_cache'].stats()['entries'] == entities + 1
+        primary = {'X-Read-Primary': '1'}
+        assert client.get('/products', headers=primary).get_json()[0]['name'] == "Primary"
+        assert client.get('/users/1', headers=primary).get_json()['name'] == "Primary"
+        # Po zapisie klient czyta z bazy głównej (ciasteczko read_primary)
+        response = client.post('/users', json={"name": "Nowy", "email": "b@example.com"})
+        assert 'read_primary=1' in response.headers['Set-Cookie']
+        assert [u['name'] for u in client.get('/users').get_json()] == ["Primary", "Nowy"]
+        other = replica_app.test_client()
+        assert [u['name'] for u in other.get('/users').get_json()] == ["Replica"]
+
+        # Replika opóźniona ponad REPLICA_MAX_LAG_SECONDS jest pomijana
+        replica_set(replica_app).measure_lag = lambda engine: 60.0
+        replica_set(replica_app).lag_interval = 0
+        assert [u['name'] for u in other.get('/users').get_json()] == ["Primary", "Nowy"]
+        replica_status = other.get('/internal/pool').get_json()['replicas']
+        assert replica_status['replica_1']['lag_seconds'] == 60.0
+    finally:
+        with replica_app.app_context():
+            for engine in (*db.engines.values(), *replica_engines().values()):
+                engine.dispose()
+
+    # Bez kontroli opóźnienia odczyty z repliki nie trafiają do wspólnego cache
+    unbounded_app = create_app({'SQLALCHEMY_DATABASE_URI': primary_url,
+                                'DATABASE_REPLICA_URLS': [replica_url],
+                                'REPLICA_MAX_LAG_SECONDS': 0})
+    try:
+        client = unbounded_app.test_client()
+        assert client.get('/internal/cache').get_json()['fill_from_replicas'] is False
+        assert client.get('/products').get_json()[0]['name'] == "Replica"
+        assert client.get('/products/1').get_json()['name'] == "Replica"
+        assert len(unbounded_app.extensions['response_cache']) == 0
+        assert unbounded_app.extensions['entity_cache'].stats()['entries'] == 0
+    finally:
+        with unbounded_app.app_context():
+            for engine in (*db.engines.values(), *replica_engines().values()):
+                engine.dispose()
+
+
+# Test 38: Treść triggerów PostgreSQL (tabele przejściowe) i wiersze liczników
+def test_postgresql_stats_branches(tmp_path):
+    """Test każdej gałęzi funkcji triggerów PG na tabelach new_rows/old_rows"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    db.metadata.create_all(engine)
+    # Zmiany z innego połączenia (innego PID) trafiają do innego wiersza
+    pids = {'pid': 21}
+    event.listen(engine, 'connect', lambda conn, record: conn.create_function(
+        'pg_backend_pid', 0, lambda: pids['pid']))
+    engine.dispose()
+
+    def run(table, op, new_rows=(), old_rows=()):
+        branches, truncate = stats.postgresql_branches()[table]
+        with engine.begin() as conn:
+            for name, rows in (('new_rows', new_rows), ('old_rows', old_rows)):
+                conn.exec_driver_sql(f"CREATE TEMP TABLE {name} AS SELECT * FROM {table} WHERE 0")
+                for row in rows:
+                    conn.execute(db.text(f"INSERT INTO {name} ({', '.join(row)}) "
+                                         f"VALUES ({', '.join(':' + k for k in row)})"), row)
+            for statement in (branches.get(op) or truncate).split(';'):
+                if statement.strip():
+                    conn.exec_driver_sql(statement)
+            conn.exec_driver_sql("DROP TABLE new_rows")
+            conn.exec_driver_sql("DROP TABLE old_rows")
+
+    def task(id, user_id, completed):
+        return {"id": id, "title": f"T{id}", "user_id": user_id, "completed": completed}
+
+    def product(id, price, stock):
+        return {"id": id, "name": f"P{id}", "price": price, "stock": stock}
+
+    run('users', 'INSERT', new_rows=[{"id": 1, "name": "A", "email": "a@x"}])
+    run('tasks', 'INSERT', new_rows=[task(1, 1, True), task(2, 1, False), task(3, 2, False)])
+    pids['pid'] = 38
+    engine.dispose()
+    run('tasks', 'UPDATE', new_rows=[task(2, 2, True)], old_rows=[task(2, 1, False)])
+    run('tasks', 'DELETE', old_rows=[task(1, 1, True)])
+    run('products', 'INSERT', new_rows=[product(1, 10.0, 3), product(2, 2.5, 2)])
+    run('products', 'UPDATE', new_rows=[product(1, 10.0, 1)], old_rows=[product(1, 10.0, 3)])
+    run('products', 'DELETE', old_rows=[product(2, 2.5, 2)])
+    run('users', 'DELETE', old_rows=[{"id": 1, "name": "A", "email": "a@x"}])
+
+    with engine.connect() as conn:
+        assert stats.totals(conn) == {"users": 0, "tasks": 2, "tasks_completed": 1,
+                                      "products": 1, "stock_units": 1, "inventory_value": 10.0}
+        # Dwa połączenia - dwa różne wiersze liczników
+        touched = conn.exec_driver_sql("SELECT id FROM stats_totals WHERE tasks <> 0 "
+                                       "ORDER BY id").scalars().all()
+        assert touched == [21 % stats.SLOTS, 38 % stats.SLOTS]
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM stats_totals").scalar() == stats.SLOTS
+        assert conn.exec_driver_sql("SELECT user_id, tasks, completed FROM user_task_stats "
+                                    "ORDER BY user_id").all() == [(1, 0, 0), (2, 2, 1)]
+
+    run('tasks', 'TRUNCATE')
+    with engine.connect() as conn:
+        assert stats.totals(conn)["tasks"] == 0
+    engine.dispose()
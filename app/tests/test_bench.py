@@ -0,0 +1,49 @@
+import sys
+import os
+
+# Dodaj katalog nadrzędny do ścieżki
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+# Ustaw zmienną środowiskową PRZED importem
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from bench.common import percentile, summarize
+from bench.run_bench import SCENARIOS, compare, scenario_paths
+
+
+# Test 1: Podsumowanie czasów odpowiedzi
+def test_summarize_percentiles():
+    """Test percentyli i przepustowości z listy czasów"""
+    latencies = [i / 1000 for i in range(1, 101)]
+    result = summarize(latencies, errors=2, duration=2.0)
+    assert result['requests'] == 100
+    assert result['rps'] == 50.0
+    assert result['p50_ms'] == 51.0
+    assert result['p99_ms'] == 100.0
+    assert percentile([], 50) is None
+
+
+# Test 2: Scenariusze są powtarzalne
+def test_scenario_paths_are_deterministic():
+    """Test tych samych ścieżek dla tego samego ziarna"""
+    sizes = {'users': 10, 'tasks': 100, 'products': 5}
+    for name in SCENARIOS:
+        assert scenario_paths(name, sizes, 42) == scenario_paths(name, sizes, 42)
+    ids = {int(path.rsplit('/', 1)[1]) for path in scenario_paths('get_product', sizes, 42)}
+    assert ids <= set(range(1, 6))
+
+
+# Test 3: Porównanie z linią bazową
+def test_compare_with_baseline():
+    """Test wykrywania spadku przepustowości i wzrostu p95"""
+    base = {"scenario": "tasks", "concurrency": 8, "rps": 100.0, "p95_ms": 10.0, "errors": 0}
+    baseline = {"results": [base]}
+
+    assert compare([dict(base, rps=90.0, p95_ms=11.0)], baseline, 0.2) == []
+    regressions = compare([dict(base, rps=50.0, p95_ms=30.0, errors=1)], baseline, 0.2)
+    assert len(regressions) == 3
+    assert regressions[0].startswith('tasks c=8: p95')
+    # Scenariusz bez odpowiednika w linii bazowej nie jest regresją
+    assert compare([dict(base, scenario='products', rps=1.0)], baseline, 0.2) == []
@@ -0,0 +1,159 @@
+import pytest
+import sys
+import os
+
+# Dodaj katalog nadrzędny do ścieżki
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+# Ustaw zmienną środowiskową PRZED importem
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import create_engine, exc, text
+
+from src.app import create_app, db, User, Task, Product
+from src.schema import MIGRATIONS_DIR, upgrade_schema
+from seed.generator import plan_batches, task_rows, user_rows
+from seed.loader import load_scale
+from seed.run_seed import PRODUCTS, USERS, count_arg, demo_task_rows
+from seed.upsert import sync_rows, upsert
+
+
+# Test 1: Generator jest deterministyczny
+def test_generator_is_deterministic():
+    """Test powtarzalności danych dla tego samego ziarna"""
+    assert user_rows(42, 3, 301, 100) == user_rows(42, 3, 301, 100)
+    assert user_rows(42, 3, 301, 100) != user_rows(7, 3, 301, 100)
+
+    tasks = task_rows(42, 0, 1, 1000, user_count=50)
+    assert all(t[3] is None or 1 <= t[3] <= 50 for t in tasks)
+    # Rozkład z długim ogonem: pierwsze 10% użytkowników ma wyraźnie więcej zadań
+    head = sum(1 for t in tasks if t[3] is not None and t[3] <= 5)
+    assert head > len(tasks) * 0.3
+
+
+# Test 2: Podział na partie
+def test_plan_batches():
+    """Test pokrycia całego zakresu ID partiami"""
+    assert plan_batches(10, 4) == [(0, 1, 4), (1, 5, 4), (2, 9, 2)]
+    assert plan_batches(0, 4) == []
+    assert count_arg('1e3') == 1000
+
+
+# Test 3: Ładowanie w trybie skali
+def test_load_scale(app_context):
+    """Test ładowania syntetycznych danych partiami"""
+    totals = load_scale(db.engine, users=120, tasks=500, products=30,
+                        seed=1, batch_size=50, log=lambda message: None)
+    assert totals == {'users': 120, 'tasks': 500, 'products': 30}
+
+    assert User.query.count() == 120
+    assert Task.query.count() == 500
+    assert Product.query.count() == 30
+    assert len({u.email for u in User.query.all()}) == 120
+    assert Task.query.filter(Task.user_id > 120).count() == 0
+
+    # Sekwencja ID działa dalej po jawnych ID
+    db.session.add(User(name="Jan Kowalski", email="jan@example.com"))
+    db.session.commit()
+    assert User.query.filter_by(email="jan@example.com").one().id == 121
+
+
+# Test 4: Seedowanie przyrostowe (upsert po kluczu naturalnym)
+def test_incremental_upsert(app_context):
+    """Test liczników inserted/updated/unchanged i zachowania ID"""
+    with db.engine.begin() as conn:
+        counts = upsert(conn, User.__table__, 'email', USERS)
+    assert counts == {"inserted": 5, "updated": 0, "unchanged": 0}
+    jan_id = User.query.filter_by(email="jan@example.com").one().id
+
+    user_ids = {u.email: u.id for u in User.query.all()}
+    with db.engine.begin() as conn:
+        assert sync_rows(conn, Task.__table__, ['user_id', 'title'],
+                         demo_task_rows(user_ids))["inserted"] == 5
+
+    changed = [dict(u) for u in USERS]
+    changed[0]["name"] = "Jan Kowalski-Nowak"
+    with db.engine.begin() as conn:
+        counts = upsert(conn, User.__table__, 'email', changed)
+        assert counts == {"inserted": 0, "updated": 1, "unchanged": 4}
+        assert upsert(conn, Product.__table__, 'name', PRODUCTS)["inserted"] == 5
+        assert upsert(conn, Product.__table__, 'name', PRODUCTS)["unchanged"] == 5
+        assert sync_rows(conn, Task.__table__, ['user_id', 'title'],
+                         demo_task_rows(user_ids))["unchanged"] == 5
+
+    db.session.expire_all()
+    jan = db.session.get(User, jan_id)
+    assert jan.name == "Jan Kowalski-Nowak"
+    assert len(jan.tasks) == 2
+    assert User.query.count() == 5
+
+
+# Test 5: Migracje baz sprzed Alembica (migration_runner)
+def test_upgrade_legacy_databases(tmp_path):
+    """Test oznaczenia bazy z create_all() i usunięcia powtórzonych nazw produktów"""
+    # Schemat z migracji początkowej, bez unikalnej nazwy produktu
+    legacy_url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = create_engine(legacy_url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE products (id INTEGER PRIMARY KEY, "
+                          "name VARCHAR(100) NOT NULL, price FLOAT NOT NULL, stock INTEGER)"))
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(100) "
+                          "NOT NULL, email VARCHAR(100) NOT NULL UNIQUE)"))
+        conn.execute(text("CREATE TABLE tasks (id INTEGER PRIMARY KEY, title VARCHAR(200) "
+                          "NOT NULL, completed BOOLEAN, user_id INTEGER REFERENCES users(id))"))
+        conn.execute(text("INSERT INTO products (name, price, stock) VALUES "
+                          "('Mysz', 10, 1), ('Mysz', 12, 2), ('Laptop', 100, 1)"))
+
+    # Baza założona create_all() z aktualnych modeli
+    current_url = f"sqlite:///{tmp_path / 'current.db'}"
+    db.metadata.create_all(create_engine(current_url))
+
+    for url in (legacy_url, current_url):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+        with app.app_context():
+            upgrade_schema(db)
+            version = db.session.execute(text("SELECT version_num FROM alembic_version")).scalar()
+            assert version == 'b6e4d1a8c372'
+            db.session.remove()
+
+    with engine.connect() as conn:
+        names = conn.execute(text("SELECT name FROM products ORDER BY id")).scalars().all()
+        assert names == ['Mysz', 'Mysz #2', 'Laptop']
+        assert conn.execute(text("SELECT SUM(products) FROM stats_totals")).scalar() == 3
+    with pytest.raises(exc.IntegrityError):
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO products (name, price) VALUES ('Laptop', 1)"))
+
+
+# Test 6: Migracje liczników /stats - zamrożony SQL i powrót do jednego wiersza
+def test_stats_migrations_up_and_down(tmp_path):
+    """Test rewizji 9d3a6c2e8f15 (jeden wiersz) i b6e4d1a8c372 (wiersze per połączenie)"""
+    url = f"sqlite:///{tmp_path / 'stats.db'}"
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    with app.app_context():
+        def totals_rows():
+            return db.session.execute(text(
+                "SELECT id, tasks FROM stats_totals WHERE tasks <> 0 OR id IN (0, 1) ORDER BY id"
+            )).all()
+
+        def add_task():
+            db.session.execute(text("INSERT INTO tasks (title, completed) VALUES ('T', 1)"))
+            db.session.commit()
+
+        upgrade(directory=MIGRATIONS_DIR, revision='9d3a6c2e8f15')
+        add_task()
+        assert totals_rows() == [(1, 1)]
+
+        upgrade(directory=MIGRATIONS_DIR)
+        assert db.session.execute(text("SELECT COUNT(*) FROM stats_totals")).scalar() == 16
+        add_task()
+        assert totals_rows() == [(0, 2), (1, 0)]
+
+        downgrade(directory=MIGRATIONS_DIR, revision='9d3a6c2e8f15')
+        assert db.session.execute(text("SELECT COUNT(*) FROM stats_totals")).scalar() == 1
+        add_task()
+        assert totals_rows() == [(1, 3)]
+        db.session.remove()